@@ -10,41 +10,63 @@ current_dir = Path(__file__).parent
 parent_dir = current_dir.parent
 sys.path.append(str(parent_dir))
 
+from agents.agent_pool import FreshAgentPool
+from aws_clients import BEDROCK_CLIENT_CONFIG, BEDROCK_REGION, boto_session_lock, get_boto_session
+from bedrock_limiter import bedrock_guard, estimate_content_tokens
 from agents.agent_tools.analyze_image import analyze_image
 from agents.agent_tools.price_tool import recommend_price
 from agents.agent_tools.order_tools import place_order
-from agents.agent_tools.query_database import (
-    query_database, 
-    get_item_by_id, 
-    get_items_by_category, 
-    get_database_stats,
-    get_live_auctions,
-    get_auctions_by_ticket_cost,
-    get_high_ai_score_items
+from agents.agent_tools.similar_items import find_similar_items
+# Async (Motor) query tools: agents run via invoke_async/stream_async on the
+# app's event loop, so tool calls await MongoDB instead of holding a thread each
+from agents.agent_tools.query_database_async import (
+    query_database_async, 
+    get_item_by_id_async, 
+    get_items_by_category_async, 
+    get_database_stats_async,
+    get_live_auctions_async,
+    get_auctions_by_ticket_cost_async,
+    get_high_ai_score_items_async
 )
 
+class GuardedBedrockModel(BedrockModel):
+    """BedrockModel whose calls go through the process-wide Bedrock limiter and circuit breaker"""
+
+    async def stream(self, messages, tool_specs=None, system_prompt=None, **kwargs):
+        estimated_tokens = estimate_content_tokens(messages) + estimate_content_tokens(system_prompt or "", 0)
+        async with bedrock_guard.call_async(estimated_tokens):
+            async for event in super().stream(messages, tool_specs, system_prompt, **kwargs):
+                yield event
+
 # Create an agent with explicit configuration
 
 def create_agent(fresh_instance=False):
     try:
         # Try to create agent with default Bedrock model
-        bedrock_model = BedrockModel(
-            model_id="us.anthropic.claude-sonnet-4-20250514-v1:0",
-            region_name="us-west-2",
-        )
+        # Shared session (credentials resolved once) and tuned pool/retry config.
+        # BedrockModel won't take region_name alongside a session, so the
+        # session itself is the one for BEDROCK_REGION
+        boto_session = get_boto_session(BEDROCK_REGION)
+        with boto_session_lock:
+            bedrock_model = GuardedBedrockModel(
+                model_id="us.anthropic.claude-sonnet-4-20250514-v1:0",
+                boto_session=boto_session,
+                boto_client_config=BEDROCK_CLIENT_CONFIG,
+            )
         # Create the agent, giving it tools
         agent = Agent(
             model=bedrock_model,
             tools=[
                 http_request, 
                 recommend_price, 
-                query_database, 
-                get_item_by_id, 
-                get_items_by_category, 
-                get_database_stats,
-                get_live_auctions,
-                get_auctions_by_ticket_cost,
-                get_high_ai_score_items,
+                query_database_async, 
+                get_item_by_id_async, 
+                get_items_by_category_async, 
+                get_database_stats_async,
+                get_live_auctions_async,
+                get_auctions_by_ticket_cost_async,
+                get_high_ai_score_items_async,
+                find_similar_items,
                 analyze_image, 
                 place_order
             ],
@@ -84,11 +106,13 @@ def create_agent(fresh_instance=False):
                 6. **Tool Use Guidelines**
                 - You have access to the following tools:
                     - **query_database**: Search auction items using natural language (e.g., "iPhone under 100 tickets", "live electronics auctions", "high AI score items")
-                    - **get_item_by_id**: Get specific auction item details by ID
+                    - **get_item_by_id**: Get specific auction item details by ID, including the full description (search and listing results only carry its first few sentences)
                     - **get_items_by_category**: Get all items in a category
                     - **get_live_auctions**: Get currently active auctions
                     - **get_auctions_by_ticket_cost**: Find items in specific ticket cost ranges
                     - **get_high_ai_score_items**: Find high-quality verified items
+                    - **recommend_price**: Typical ticket goal, ticket cost and sell-through ranges for a product, from past listings in its category and condition
+                    - **find_similar_items**: Find listings similar to a description or item, with their ticket cost, goal and sell-through (useful for pricing and comparisons)
                     - **get_database_stats**: Get database statistics
                     - **analyze_image**: Analyze product images for auction items
                     - **place_order**: Handle auction participation (only after confirmation)
@@ -133,12 +157,23 @@ def create_agent(fresh_instance=False):
         print("Please set up AWS credentials or use a different model provider")
         return None
 
+# Pre-built single-use agents so image analysis doesn't pay construction per request
+fresh_agent_pool = FreshAgentPool(
+    lambda: create_agent(fresh_instance=True),
+    size=int(os.getenv("FRESH_AGENT_POOL_SIZE", "3")),
+)
+
 def create_fresh_agent():
     """
     Create a fresh agent instance with cleared memory.
     Use this for image analysis to prevent context overflow and cross-contamination.
+    Instances come from the pre-warmed pool and are never handed out twice.
     """
-    return create_agent(fresh_instance=True)
+    return fresh_agent_pool.get()
+
+def prewarm_fresh_agents():
+    """Start building pooled fresh agents in the background"""
+    fresh_agent_pool.start()
 
 # Initialize the default agent for general use
 def initialize_default_agent():
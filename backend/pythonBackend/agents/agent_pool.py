@@ -0,0 +1,259 @@
+"""
+Agent pooling.
+
+AgentPool gives each chat session its own Strands Agent so users never share a
+conversation, and caps concurrent Bedrock calls process-wide.
+
+FreshAgentPool keeps a few pre-built, never-used agents ready for one-off work
+such as image analysis, so agent construction happens off the request path.
+"""
+import asyncio
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, Optional
+
+
+class SessionEntry:
+    """A pooled agent plus the bookkeeping needed to evict it."""
+
+    def __init__(self, session_id: str, agent: Any):
+        self.session_id = session_id
+        self.agent = agent
+        self.lock = asyncio.Lock()  # Strands agents handle one turn at a time
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.in_use = 0
+
+    def touch(self):
+        self.last_used = time.monotonic()
+
+
+class AgentPool:
+    """
+    Session-keyed LRU of agent instances with idle-time eviction.
+
+    Args:
+        factory: Callable returning a new agent (or None on failure)
+        max_sessions: Maximum number of live session agents kept in memory
+        idle_ttl: Seconds a session may stay unused before it is evicted
+        max_concurrent_calls: Cap on agent turns running against Bedrock at once
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Any],
+        max_sessions: int = 100,
+        idle_ttl: float = 1800,
+        max_concurrent_calls: int = 8,
+    ):
+        self.factory = factory
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.max_concurrent_calls = max_concurrent_calls
+        self._sessions: "OrderedDict[str, SessionEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._call_slots = asyncio.Semaphore(max_concurrent_calls)
+        self._stats = {"created": 0, "evicted_idle": 0, "evicted_lru": 0, "calls": 0}
+
+    @staticmethod
+    def new_session_id() -> str:
+        return uuid.uuid4().hex
+
+    def _evict_idle(self, now: float):
+        expired = [
+            sid for sid, entry in self._sessions.items()
+            if entry.in_use == 0 and now - entry.last_used > self.idle_ttl
+        ]
+        for sid in expired:
+            del self._sessions[sid]
+            self._stats["evicted_idle"] += 1
+
+    def _evict_lru(self):
+        # Oldest entries first; never drop an agent that is mid-turn
+        for sid in list(self._sessions):
+            if len(self._sessions) < self.max_sessions:
+                break
+            if self._sessions[sid].in_use == 0:
+                del self._sessions[sid]
+                self._stats["evicted_lru"] += 1
+
+    def _checkout_existing(self, session_id: str) -> Optional[SessionEntry]:
+        with self._lock:
+            self._evict_idle(time.monotonic())
+            entry = self._sessions.get(session_id)
+            if entry is not None:
+                self._sessions.move_to_end(session_id)
+                entry.in_use += 1
+                entry.touch()
+            return entry
+
+    def _create(self, session_id: str) -> Optional[SessionEntry]:
+        # Build outside the lock: agent construction is slow
+        agent = self.factory()
+        if agent is None:
+            return None
+
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                self._evict_lru()
+                entry = SessionEntry(session_id, agent)
+                self._sessions[session_id] = entry
+                self._stats["created"] += 1
+            else:
+                # Another request for the same session won the race
+                self._sessions.move_to_end(session_id)
+            entry.in_use += 1
+            entry.touch()
+            return entry
+
+    def _checkin(self, entry: SessionEntry):
+        with self._lock:
+            entry.in_use -= 1
+            entry.touch()
+
+    async def acquire(self, session_id: str) -> Optional[SessionEntry]:
+        """Check out the session's agent, creating it off the event loop if needed."""
+        entry = self._checkout_existing(session_id)
+        if entry is None:
+            entry = await asyncio.to_thread(self._create, session_id)
+        return entry
+
+    def release(self, entry: SessionEntry):
+        self._checkin(entry)
+
+    @asynccontextmanager
+    async def session(self, session_id: str):
+        """Hold a session's agent under the per-session lock and the call cap."""
+        entry = await self.acquire(session_id)
+        if entry is None:
+            raise RuntimeError("Failed to initialize AI agent")
+        try:
+            async with entry.lock:
+                async with self._call_slots:
+                    self._stats["calls"] += 1
+                    yield entry.agent
+        finally:
+            self.release(entry)
+
+    async def run(self, session_id: str, prompt: str):
+        """Run one agent turn for a session and return the final result."""
+        async with self.session(session_id) as agent:
+            return await agent.invoke_async(prompt)
+
+    async def stream(self, session_id: str, prompt: str):
+        """Run one agent turn for a session, yielding Strands events as they arrive."""
+        async with self.session(session_id) as agent:
+            async for event in agent.stream_async(prompt):
+                yield event
+
+    def reset(self, session_id: str) -> bool:
+        """Drop a session's agent so its next turn starts with an empty conversation."""
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None or entry.in_use:
+                return False
+            del self._sessions[session_id]
+            return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "active_sessions": len(self._sessions),
+                "busy_sessions": sum(1 for e in self._sessions.values() if e.in_use),
+                "max_sessions": self.max_sessions,
+                "idle_ttl_seconds": self.idle_ttl,
+                "max_concurrent_calls": self.max_concurrent_calls,
+                **self._stats,
+            }
+
+
+def create_session_pool(factory: Callable[[], Any]) -> AgentPool:
+    """Build the chat session pool from environment configuration."""
+    return AgentPool(
+        factory,
+        max_sessions=int(os.getenv("AGENT_POOL_MAX_SESSIONS", "100")),
+        idle_ttl=float(os.getenv("AGENT_POOL_IDLE_TTL", "1800")),
+        max_concurrent_calls=int(os.getenv("AGENT_POOL_MAX_CONCURRENT_CALLS", "8")),
+    )
+
+
+class FreshAgentPool:
+    """
+    Pre-warmed pool of single-use agents.
+
+    Agents are built in a background thread and handed out exactly once, so every
+    caller still gets an instance with empty conversation state. When the pool is
+    empty the caller builds one inline, exactly as before.
+
+    Args:
+        factory: Callable returning a new agent (or None on failure)
+        size: Number of ready agents to keep on hand
+    """
+
+    def __init__(self, factory: Callable[[], Any], size: int = 3):
+        self.factory = factory
+        self.size = size
+        self._ready: "queue.Queue[Any]" = queue.Queue(maxsize=max(size, 1))
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "built": 0, "build_failures": 0}
+
+    def start(self):
+        """Start the background refill thread (idempotent)."""
+        if self.size <= 0:
+            return
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._refill_loop, name="fresh-agent-pool", daemon=True)
+            self._thread.start()
+        self._wakeup.set()
+
+    def _refill_loop(self):
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            while not self._ready.full():
+                agent = self.factory()
+                if agent is None:
+                    # Bedrock/credentials problem: back off instead of spinning
+                    self._count("build_failures")
+                    time.sleep(30)
+                    break
+                self._count("built")
+                try:
+                    self._ready.put_nowait(agent)
+                except queue.Full:
+                    break
+
+    def _count(self, key: str):
+        # The refill thread and request handlers' threads update these concurrently
+        with self._stats_lock:
+            self._stats[key] += 1
+
+    def get(self) -> Any:
+        """Hand out a never-used agent, falling back to building one inline."""
+        self.start()
+        try:
+            agent = self._ready.get_nowait()
+            self._count("hits")
+        except queue.Empty:
+            agent = None
+            self._count("misses")
+        self._wakeup.set()
+        if agent is None:
+            agent = self.factory()
+        return agent
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            counters = dict(self._stats)
+        return {"ready": self._ready.qsize(), "target_size": self.size, **counters}
@@ -2,6 +2,7 @@
 from .analyze_image import analyze_image
 from .price_tool import recommend_price
 from .order_tools import place_order
+from .similar_items import find_similar_items
 from .query_database import (
     query_database, 
     get_item_by_id, 
@@ -11,16 +12,33 @@ from .query_database import (
     get_auctions_by_ticket_cost,
     get_high_ai_score_items
 )
+from .query_database_async import (
+    query_database_async, 
+    get_item_by_id_async, 
+    get_items_by_category_async, 
+    get_database_stats_async,
+    get_live_auctions_async,
+    get_auctions_by_ticket_cost_async,
+    get_high_ai_score_items_async
+)
 
 __all__ = [
     'analyze_image', 
     'recommend_price', 
     'place_order', 
+    'find_similar_items',
     'query_database', 
     'get_item_by_id', 
     'get_items_by_category', 
     'get_database_stats',
     'get_live_auctions',
     'get_auctions_by_ticket_cost',
-    'get_high_ai_score_items'
+    'get_high_ai_score_items',
+    'query_database_async', 
+    'get_item_by_id_async', 
+    'get_items_by_category_async', 
+    'get_database_stats_async',
+    'get_live_auctions_async',
+    'get_auctions_by_ticket_cost_async',
+    'get_high_ai_score_items_async'
 ]
@@ -0,0 +1,166 @@
+# tools/analysis_cache.py
+"""
+Two-tier cache for Bedrock image analyses.
+
+Entries are keyed by the image's SHA-256 plus an analysis version (model id and
+prompt fingerprint), so identical photos are analyzed once and a prompt change
+automatically misses. Tier 1 is an in-process LRU, tier 2 a MongoDB collection
+with a TTL index so entries survive restarts and are shared across workers.
+"""
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+# Add parent directory to path for imports
+current_dir = Path(__file__).parent
+parent_dir = current_dir.parent.parent
+sys.path.append(str(parent_dir))
+
+from db_connection import get_sync_db
+
+ANALYSIS_CACHE_COLLECTION = "image_analysis_cache"
+ANALYSIS_CACHE_TTL = int(os.getenv("ANALYSIS_CACHE_TTL", str(7 * 24 * 3600)))
+ANALYSIS_CACHE_SIZE = int(os.getenv("ANALYSIS_CACHE_SIZE", "512"))
+
+
+class AnalysisCache:
+    def __init__(self, collection_name: str = ANALYSIS_CACHE_COLLECTION,
+                 ttl_seconds: int = ANALYSIS_CACHE_TTL, max_entries: int = ANALYSIS_CACHE_SIZE):
+        self.collection_name = collection_name
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._indexes_ready = False
+        self._stats = {"memory_hits": 0, "mongo_hits": 0, "misses": 0, "stores": 0, "errors": 0}
+
+    @staticmethod
+    def _key(image_hash: str, version: str) -> str:
+        return f"{version}:{image_hash}"
+
+    def _collection(self):
+        collection = get_sync_db()[self.collection_name]
+        if not self._indexes_ready:
+            # Mongo's TTL monitor removes expired documents in the background
+            collection.create_index("expiresAt", expireAfterSeconds=0)
+            collection.create_index([("imageHash", 1), ("version", 1)])
+            self._indexes_ready = True
+        return collection
+
+    def _count(self, key: str):
+        # get/put run concurrently from the analysis thread pool
+        with self._lock:
+            self._stats[key] += 1
+
+    def _remember(self, key: str, value: Any, expires_at: float):
+        with self._lock:
+            self._memory[key] = (expires_at, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, image_hash: str, version: str) -> Optional[Any]:
+        key = self._key(image_hash, version)
+        now = time.time()
+
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached is not None:
+                if cached[0] > now:
+                    self._memory.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    return cached[1]
+                del self._memory[key]
+
+        try:
+            doc = self._collection().find_one({"_id": key})
+        except Exception as e:
+            print(f"Analysis cache lookup failed: {e}")
+            self._count("errors")
+            doc = None
+
+        if doc is not None:
+            expires_at = doc["expiresAt"].replace(tzinfo=timezone.utc).timestamp()
+            # The TTL monitor runs about once a minute, so double-check expiry
+            if expires_at > now:
+                self._remember(key, doc["analysis"], expires_at)
+                self._count("mongo_hits")
+                return doc["analysis"]
+
+        self._count("misses")
+        return None
+
+    def put(self, image_hash: str, version: str, analysis: Any):
+        key = self._key(image_hash, version)
+        expires = datetime.now(timezone.utc) + timedelta(seconds=self.ttl_seconds)
+        self._remember(key, analysis, expires.timestamp())
+        self._count("stores")
+        try:
+            self._collection().replace_one(
+                {"_id": key},
+                {
+                    "_id": key,
+                    "imageHash": image_hash,
+                    "version": version,
+                    "analysis": analysis,
+                    "createdAt": datetime.now(timezone.utc),
+                    "expiresAt": expires,
+                },
+                upsert=True,
+            )
+        except Exception as e:
+            print(f"Analysis cache store failed: {e}")
+            self._count("errors")
+
+    def invalidate(self, image_hash: Optional[str] = None, version: Optional[str] = None) -> int:
+        """
+        Drop cached analyses. With no arguments everything is cleared; otherwise
+        only entries matching the given image hash and/or version.
+
+        Returns:
+            Number of MongoDB documents removed
+        """
+        with self._lock:
+            for key in list(self._memory):
+                entry_version, _, entry_hash = key.rpartition(":")
+                if (image_hash is None or entry_hash == image_hash) and (version is None or entry_version == version):
+                    del self._memory[key]
+
+        query: Dict[str, Any] = {}
+        if image_hash is not None:
+            query["imageHash"] = image_hash
+        if version is not None:
+            query["version"] = version
+        try:
+            return self._collection().delete_many(query).deleted_count
+        except Exception as e:
+            print(f"Analysis cache invalidation failed: {e}")
+            self._count("errors")
+            return 0
+
+    def purge_other_versions(self, *current_versions: str) -> int:
+        """Delete entries written by any model/prompt version not listed."""
+        with self._lock:
+            for key in list(self._memory):
+                if key.rpartition(":")[0] not in current_versions:
+                    del self._memory[key]
+        try:
+            return self._collection().delete_many({"version": {"$nin": list(current_versions)}}).deleted_count
+        except Exception as e:
+            print(f"Analysis cache purge failed: {e}")
+            self._count("errors")
+            return 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            size = len(self._memory)
+            counters = dict(self._stats)
+        return {"memory_entries": size, "max_entries": self.max_entries, "ttl_seconds": self.ttl_seconds, **counters}
+
+
+analysis_cache = AnalysisCache()
@@ -1,53 +1,24 @@
 # tools/analyze_image.py
 from strands import tool
 import base64
-from io import BytesIO
-from PIL import Image
-import requests
-import boto3
 import json
 from botocore.exceptions import ClientError
+import hashlib
 import os
+import time
 from dotenv import load_dotenv
 
+from .analysis_cache import analysis_cache
+from aws_clients import get_bedrock_runtime, download_bytes, track
+from bedrock_limiter import bedrock_guard, estimate_content_tokens
+from .blob_registry import blob_registry
+from .image_preprocess import preprocess_image, preprocess_images, PREPROCESS_MAX_EDGE, PREPROCESS_MAX_BYTES
+
 load_dotenv()
 
+ANALYSIS_MODEL_ID = "anthropic.claude-3-5-sonnet-20241022-v2:0"
 
-def analyze_with_bedrock_claude(image_base64: str) -> str:
-    """
-    Use AWS Bedrock Claude 3.5 Sonnet for image analysis
-    Fresh model instance for each request - no memory persistence
-    """
-    try:
-        # Create fresh Bedrock client for each request to reset model state
-        bedrock_runtime = boto3.client(
-            service_name='bedrock-runtime',
-            region_name=os.getenv('AWS_DEFAULT_REGION', 'us-west-2')
-        )
-        
-        # Generate unique session ID to ensure model reset
-        import time
-        session_id = f"session_{int(time.time() * 1000000)}"
-        
-        claude_body = {
-            "anthropic_version": "bedrock-2023-05-31",
-            "max_tokens": 10000,
-            "system": f"You are a completely fresh AI model with no memory. Session ID: {session_id}. Each request is completely independent. Do not reference, remember, or use any information from previous requests. Analyze only the current image provided. Return only valid JSON as requested.",
-            "messages": [
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "image",
-                            "source": {
-                                "type": "base64",
-                                "media_type": "image/jpeg",
-                                "data": image_base64
-                            }
-                        },
-                        {
-                            "type": "text",
-                            "text": """Analyze this product image for auction quality assessment.
+ANALYSIS_PROMPT = """Analyze this product image for auction quality assessment.
 
                             Never include markdown, code blocks, or explanations.
                             Always return valid JSON (double quotes, proper commas, no trailing commas).
@@ -73,22 +44,96 @@ def analyze_with_bedrock_claude(image_base64: str) -> str:
                                 "ticket_goal": calculate the ticket goal based on the item's value,
                             
                             """
-                        }
-                    ]
-                }
-            ]
-        }
-        
+
+# Cache entries are only reused for the same model, prompt text and preprocessing limits
+ANALYSIS_CACHE_VERSION = (
+    f"{ANALYSIS_MODEL_ID}:{hashlib.sha256(ANALYSIS_PROMPT.encode()).hexdigest()[:12]}"
+    f":{PREPROCESS_MAX_EDGE}x{PREPROCESS_MAX_BYTES}"
+)
+
+BATCH_ANALYSIS_PROMPT = """You are a balanced auction verifier. The images above are all photos of ONE auction listing.
+Start cautiously (the seller might use stock/AI images) but remain fair and evidence-driven.
+Check lighting, background, watermarks, editing artifacts and whether the photos are consistent with each other (same item, same setting); use the EXIF signals listed with each image.
+Ticket Goal is the goal of the auction and ticket cost is the cost per ticket. Ticket Cost can go as low as $1 but never over 50% of the item's value (ticket goal). 1$ = 1 ticket.
+
+Never include markdown, code blocks, or explanations.
+Always return one valid JSON object (double quotes, proper commas, no trailing commas) with these fields:
+    "ai_verification_score": number 1-10,
+    "category": list of one or many from ['Electronics', 'Gaming', 'Sports', 'Collectibles', 'Furniture', 'Toys', 'Gadgets', 'Audio', 'Wearables', 'Arts & Crafts', 'Beauty', 'Fragrance', 'Other', 'Home', 'Clothing', 'Books'],
+    "title": title for the auction listing,
+    "description": description for the auction listing,
+    "ticket_price": ticket price based on the item's value,
+    "ticket_goal": ticket goal based on the item's value,
+    "auction_quality": {"authenticity": 0-100, "clarity": 0-100, "technical_quality": 0-100, "overall": 0-100},
+    "images": list with one entry per image in order: {"index": number, "authenticity_notes": string, "suspicious": boolean},
+    "justification": short justification,
+    "recommended_action": one of "accept", "manual_review", "reject", "request_better_images"
+
+If the images look too polished or reused, recommend manual_review or reject.
+"""
+
+BATCH_ANALYSIS_VERSION = (
+    f"batch:{ANALYSIS_MODEL_ID}:{hashlib.sha256(BATCH_ANALYSIS_PROMPT.encode()).hexdigest()[:12]}"
+    f":{PREPROCESS_MAX_EDGE}x{PREPROCESS_MAX_BYTES}"
+)
+
+
+def _invoke_claude(content: list) -> str:
+    """Send one user message to the analysis model and return its text reply."""
+    # Shared long-lived client; invoke_model is stateless, so isolation
+    # comes from each request carrying its own messages, not a new client
+    bedrock_runtime = get_bedrock_runtime()
+    
+    # Generate unique session ID to ensure model reset
+    session_id = f"session_{int(time.time() * 1000000)}"
+    
+    claude_body = {
+        "anthropic_version": "bedrock-2023-05-31",
+        "max_tokens": 10000,
+        "system": f"You are a completely fresh AI model with no memory. Session ID: {session_id}. Each request is completely independent. Do not reference, remember, or use any information from previous requests. Analyze only the current image provided. Return only valid JSON as requested.",
+        "messages": [
+            {
+                "role": "user",
+                "content": content
+            }
+        ]
+    }
+    
+    # Paced by the process-wide limiter shared with the agents; while Bedrock
+    # is throttling the breaker raises BedrockUnavailableError instead
+    with bedrock_guard.call(estimate_content_tokens(claude_body["messages"])), track("bedrock"):
         response = bedrock_runtime.invoke_model(
-            modelId="anthropic.claude-3-5-sonnet-20241022-v2:0",
+            modelId=ANALYSIS_MODEL_ID,
             body=json.dumps(claude_body)
         )
-        
-        response_body = json.loads(response['body'].read())
-        analysis_text = response_body['content'][0]['text']
-        
+    
+    response_body = json.loads(response['body'].read())
+    return response_body['content'][0]['text']
+
+def _image_block(image_base64: str, media_type: str) -> dict:
+    return {
+        "type": "image",
+        "source": {
+            "type": "base64",
+            "media_type": media_type,
+            "data": image_base64
+        }
+    }
+
+def analyze_with_bedrock_claude(image_base64: str, media_type: str = "image/jpeg") -> str:
+    """
+    Use AWS Bedrock Claude 3.5 Sonnet for image analysis
+    Fresh model instance for each request - no memory persistence
+    """
+    try:
         # Return the raw text response from LLM
-        return analysis_text
+        return _invoke_claude([
+            _image_block(image_base64, media_type),
+            {
+                "type": "text",
+                "text": ANALYSIS_PROMPT
+            }
+        ])
         
     except ClientError as e:
         print(f"Bedrock error: {e}")
@@ -97,6 +142,103 @@ def analyze_with_bedrock_claude(image_base64: str) -> str:
         print(f"Analysis error: {e}")
         return {"error": f"Analysis failed: {str(e)}"}
 
+def analyze_image_bytes(image_bytes: bytes) -> dict:
+    """
+    Analyze raw image bytes, reusing a cached result for identical content.
+    
+    Returns:
+        Dict with "analysis" (the model's JSON text, or an error dict like
+        analyze_with_bedrock_claude), "cached" and "preprocessing" (size savings
+        and EXIF signals; None on a cache hit, where nothing was sent).
+    """
+    image_hash = hashlib.sha256(image_bytes).hexdigest()
+    cached = analysis_cache.get(image_hash, ANALYSIS_CACHE_VERSION)
+    if cached is not None:
+        return {"analysis": cached, "cached": True, "preprocessing": None}
+    
+    # Downscale, strip metadata and detect the real media type before sending
+    prepared = preprocess_image(image_bytes)
+    image_base64 = base64.b64encode(prepared.pop("data")).decode('utf-8')
+    ai_analysis = analyze_with_bedrock_claude(image_base64, prepared["media_type"])
+    
+    # Only cache well-formed answers so errors and malformed output are retried
+    if isinstance(ai_analysis, str):
+        try:
+            json.loads(ai_analysis)
+            analysis_cache.put(image_hash, ANALYSIS_CACHE_VERSION, ai_analysis)
+        except json.JSONDecodeError:
+            pass
+    return {"analysis": ai_analysis, "cached": False, "preprocessing": prepared}
+
+def analyze_images_batch(images: list, filenames: list = None, title: str = "",
+                         description: str = "", condition: str = "") -> dict:
+    """
+    Analyze all photos of one listing in a single Bedrock request.
+    
+    Replaces the agent's per-image analyze_image calls (N model round-trips plus
+    the agent's own reasoning turns) with one multi-image invoke_model call that
+    returns one structured verdict for the listing.
+    
+    Args:
+        images: Raw image bytes, one entry per photo
+        filenames: Optional filenames, same order as images
+        title, description, condition: Optional seller-provided context
+    
+    Returns:
+        Dict with "status", "analysis" (parsed JSON, or raw text if the model
+        did not return JSON), "cached" and per-image "preprocessing" details.
+        Images that can't be decoded are left out of the request and show up
+        in "preprocessing" as {"filename", "error"}.
+    """
+    filenames = filenames or [f"image_{i + 1}" for i in range(len(images))]
+    context = f"Seller title: {title}\nSeller description: {description}\nSeller condition: {condition}"
+    
+    # Same photos with the same seller context always produce the same request
+    batch_hash = hashlib.sha256()
+    for data in images:
+        batch_hash.update(hashlib.sha256(data).digest())
+    batch_hash.update(context.encode())
+    batch_key = batch_hash.hexdigest()
+    
+    cached = analysis_cache.get(batch_key, BATCH_ANALYSIS_VERSION)
+    if cached is not None:
+        return {"status": "success", "analysis": json.loads(cached), "cached": True, "preprocessing": None}
+    
+    # A truncated or non-image upload is dropped instead of failing the listing
+    prepared = []
+    usable = []
+    for index, (filename, item) in enumerate(zip(filenames, preprocess_images(images, return_exceptions=True)), start=1):
+        if isinstance(item, Exception):
+            prepared.append({"filename": filename, "error": f"Could not read image: {item}"})
+        else:
+            prepared.append(item)
+            usable.append((index, filename, item))
+    if not usable:
+        return {"status": "failed", "analysis": {"error": "None of the images could be read"}, "cached": False, "preprocessing": prepared}
+    
+    content = []
+    for index, filename, item in usable:
+        content.append({
+            "type": "text",
+            "text": f"Image {index} ({filename}) EXIF signals: {json.dumps(item['exif'])}"
+        })
+        content.append(_image_block(base64.b64encode(item.pop("data")).decode('utf-8'), item["media_type"]))
+    content.append({"type": "text", "text": f"{BATCH_ANALYSIS_PROMPT}\n{context}"})
+    
+    try:
+        analysis_text = _invoke_claude(content)
+    except Exception as e:
+        print(f"Batch analysis error: {e}")
+        return {"status": "failed", "analysis": {"error": f"AI analysis failed: {str(e)}"}, "cached": False, "preprocessing": prepared}
+    
+    try:
+        analysis = json.loads(analysis_text)
+    except json.JSONDecodeError:
+        return {"status": "unparsed", "analysis": analysis_text, "cached": False, "preprocessing": prepared}
+    
+    analysis_cache.put(batch_key, BATCH_ANALYSIS_VERSION, analysis_text)
+    return {"status": "success", "analysis": analysis, "cached": False, "preprocessing": prepared}
+
 @tool
 def analyze_image(image_url: str) -> dict:
     """
@@ -105,27 +247,33 @@ def analyze_image(image_url: str) -> dict:
     Output: Detailed product analysis with auction quality score and recommendations.
     """
     try:
-        # Download image from URL
-        response = requests.get(image_url)
-        response.raise_for_status()
-        
-        # Open image and get basic properties
-        image = Image.open(BytesIO(response.content))
-        width, height = image.size
-        file_size_kb = round(len(response.content) / 1024, 2)
-        
-        # Convert image to base64 for Bedrock
-        image_base64 = base64.b64encode(response.content).decode('utf-8')
+        # Use bytes the server already holds for this URL, else download
+        image_bytes = blob_registry.resolve(image_url)
+        if image_bytes is None:
+            image_bytes = download_bytes(image_url)
         
-        # Get AI analysis from Bedrock
-        ai_analysis = analyze_with_bedrock_claude(image_base64)
+        # Get AI analysis from Bedrock (or the analysis cache for identical images)
+        result = analyze_image_bytes(image_bytes)
+        ai_analysis = result["analysis"]
+        prepared = result["preprocessing"]
         
         # Parse the JSON response and add the image URL
         try:
             analysis_dict = json.loads(ai_analysis)
             analysis_dict["images"] = [image_url]
+            if prepared:
+                analysis_dict["exif_signals"] = prepared["exif"]
+                analysis_dict["preprocessing"] = {
+                    "media_type": prepared["media_type"],
+                    "original_bytes": prepared["original_bytes"],
+                    "sent_bytes": prepared["processed_bytes"],
+                    "bytes_saved": prepared["bytes_saved"],
+                    "original_size": [prepared["original_width"], prepared["original_height"]],
+                    "sent_size": [prepared["width"], prepared["height"]],
+                }
+            analysis_dict["analysis_cached"] = result["cached"]
             return json.dumps(analysis_dict)
-        except json.JSONDecodeError:
+        except (json.JSONDecodeError, TypeError):
             # If not valid JSON, return the raw analysis with image URL added
             return ai_analysis
         
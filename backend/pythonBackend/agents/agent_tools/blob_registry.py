@@ -0,0 +1,93 @@
+# tools/blob_registry.py
+"""
+In-memory registry of image bytes the server already holds.
+
+analyze_images uploads each file to S3 and then asks the agent to analyze the
+S3 URL. Registering the uploaded bytes under that URL for the duration of the
+request lets analyze_image use them directly instead of downloading the same
+object back from S3. The URL is still what the agent and the response see.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+BLOB_REGISTRY_MAX_BYTES = int(os.getenv("BLOB_REGISTRY_MAX_BYTES", str(256 * 1024 * 1024)))
+BLOB_REGISTRY_TTL = float(os.getenv("BLOB_REGISTRY_TTL", "900"))
+
+
+class _Blob:
+    __slots__ = ("data", "refs", "expires_at")
+
+    def __init__(self, data: bytes, expires_at: float):
+        self.data = data
+        self.refs = 0
+        self.expires_at = expires_at
+
+
+class BlobRegistry:
+    def __init__(self, max_bytes: int = BLOB_REGISTRY_MAX_BYTES, ttl: float = BLOB_REGISTRY_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl  # safety net in case a scope is never released
+        self._blobs: Dict[str, _Blob] = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "rejected": 0}
+
+    def _expire(self, now: float):
+        for url in [u for u, b in self._blobs.items() if b.expires_at <= now]:
+            self._total_bytes -= len(self._blobs.pop(url).data)
+
+    def register(self, url: str, data: bytes) -> bool:
+        """Hold bytes for a URL; returns False if the registry is full."""
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            blob = self._blobs.get(url)
+            if blob is None:
+                if self._total_bytes + len(data) > self.max_bytes:
+                    self._stats["rejected"] += 1
+                    return False
+                blob = _Blob(data, now + self.ttl)
+                self._blobs[url] = blob
+                self._total_bytes += len(data)
+            blob.refs += 1
+            blob.expires_at = now + self.ttl
+            return True
+
+    def release(self, url: str):
+        with self._lock:
+            blob = self._blobs.get(url)
+            if blob is None:
+                return
+            blob.refs -= 1
+            if blob.refs <= 0:
+                del self._blobs[url]
+                self._total_bytes -= len(blob.data)
+
+    def resolve(self, url: str) -> Optional[bytes]:
+        with self._lock:
+            blob = self._blobs.get(url)
+            if blob is None or blob.expires_at <= time.monotonic():
+                self._stats["misses"] += 1
+                return None
+            self._stats["hits"] += 1
+            return blob.data
+
+    @contextmanager
+    def scope(self, blobs: Dict[str, bytes]):
+        """Register blobs for the duration of a request."""
+        registered = [url for url, data in blobs.items() if self.register(url, data)]
+        try:
+            yield
+        finally:
+            for url in registered:
+                self.release(url)
+
+    def stats(self):
+        with self._lock:
+            return {"blobs": len(self._blobs), "bytes": self._total_bytes, "max_bytes": self.max_bytes, **self._stats}
+
+
+blob_registry = BlobRegistry()
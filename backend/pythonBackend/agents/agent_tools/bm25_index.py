@@ -0,0 +1,395 @@
+# tools/bm25_index.py
+"""
+In-process BM25 inverted index over items, used by query_database to rank
+keyword searches.
+
+Terms are counted per field with boosts (title > category > description), so
+a title hit outweighs the same word buried in a description. Posting lists
+live in one compact CSR segment: a term id indexes into an offsets array, and
+the postings are parallel int32 row / float32 term-frequency arrays. Items that
+change after a build go to a small dict-backed delta segment (their main
+postings are masked out), and once the delta grows past BM25_MERGE_THRESHOLD
+the index is rebuilt in the background.
+
+Query terms also match by prefix ("lapt" -> laptop) and with one typo
+("labtop" -> laptop) through a deletion-neighbourhood table, at a discount.
+"""
+import math
+import os
+import re
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+# Add parent directory to path for imports
+current_dir = Path(__file__).parent
+parent_dir = current_dir.parent.parent
+sys.path.append(str(parent_dir))
+
+from db_connection import get_sync_db
+from .item_changes import item_changes
+
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+BM25_MERGE_THRESHOLD = int(os.getenv("BM25_MERGE_THRESHOLD", "5000"))
+FIELD_BOOSTS = {"title": 3.0, "category": 2.0, "description": 1.0}
+
+PREFIX_MIN_LENGTH = 3
+PREFIX_MAX_EXPANSIONS = 20
+PREFIX_WEIGHT = 0.8
+FUZZY_MIN_LENGTH = 4
+FUZZY_WEIGHT = 0.6
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_PROJECTION = {"title": 1, "category": 1, "description": 1}
+# Everything a rebuild replaces
+_STATE = (
+    "_keys", "_rows", "_doc_terms", "_doc_len", "_in_main", "_df", "_total_len", "_live_count",
+    "_vocab", "_sorted_terms", "_offsets", "_post_rows", "_post_tf", "_deletes",
+    "_delta", "_delta_rows", "_new_terms",
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _deletions(term: str) -> Set[str]:
+    return {term[:i] + term[i + 1:] for i in range(len(term))}
+
+
+def _one_edit_apart(a: str, b: str) -> bool:
+    """Levenshtein distance of at most one, or one adjacent transposition."""
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) == len(b):
+        diff = [i for i in range(len(a)) if a[i] != b[i]]
+        return len(diff) <= 1 or (len(diff) == 2 and diff[1] == diff[0] + 1
+                                  and a[diff[0]] == b[diff[1]] and a[diff[1]] == b[diff[0]])
+    shorter, longer = (a, b) if len(a) < len(b) else (b, a)
+    return any(longer[:i] + longer[i + 1:] == shorter for i in range(len(longer)))
+
+
+def _item_terms(doc: Dict[str, Any]) -> Dict[str, float]:
+    """Boosted term frequencies for one item."""
+    category = doc.get("category") or []
+    fields = {
+        "title": doc.get("title") or "",
+        "category": " ".join(category) if isinstance(category, list) else str(category),
+        "description": doc.get("description") or "",
+    }
+    terms: Dict[str, float] = defaultdict(float)
+    for field, text in fields.items():
+        for term in tokenize(text):
+            terms[term] += FIELD_BOOSTS[field]
+    return dict(terms)
+
+
+class BM25Index:
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.ready = False
+        self._lock = threading.RLock()
+        self._loading = False
+        # Changes seen while a rebuild is reading the collection, replayed after the swap
+        self._pending: Dict[str, Tuple[Any, Optional[Dict[str, Any]]]] = {}
+        self._stats = {"builds": 0, "upserts": 0, "removals": 0, "queries": 0, "query_ms_total": 0.0}
+        self._clear()
+
+    def _clear(self):
+        # Documents: row -> item _id, per-row boosted terms and length
+        self._keys: List[Any] = []
+        self._rows: Dict[str, int] = {}
+        self._doc_terms: List[Optional[Dict[str, float]]] = []
+        self._doc_len = np.zeros(1024, dtype=np.float32)
+        self._in_main = np.zeros(1024, dtype=bool)
+        self._df: Dict[str, int] = {}
+        self._total_len = 0.0
+        self._live_count = 0
+        # Main segment: term -> id -> postings[offsets[id]:offsets[id + 1]]
+        self._vocab: Dict[str, int] = {}
+        self._sorted_terms: List[str] = []
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._post_rows = np.zeros(0, dtype=np.int32)
+        self._post_tf = np.zeros(0, dtype=np.float32)
+        self._deletes: Dict[str, List[str]] = {}
+        # Delta segment: term -> {row: tf} for rows changed since the build
+        self._delta: Dict[str, Dict[int, float]] = {}
+        self._delta_rows: Set[int] = set()
+        self._new_terms: Set[str] = set()
+
+    # ---- maintenance -----------------------------------------------------
+
+    def _grow(self, rows: int):
+        capacity = self._doc_len.shape[0]
+        if rows <= capacity:
+            return
+        while capacity < rows:
+            capacity *= 2
+        for name in ("_doc_len", "_in_main"):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[: old.shape[0]] = old
+            setattr(self, name, new)
+
+    def _drop_row(self, row: int):
+        terms = self._doc_terms[row]
+        if terms is None:
+            return
+        for term in terms:
+            self._df[term] -= 1
+            if not self._df[term]:
+                del self._df[term]
+                self._new_terms.discard(term)
+            postings = self._delta.get(term)
+            if postings is not None:
+                postings.pop(row, None)
+                if not postings:
+                    del self._delta[term]
+        self._total_len -= float(self._doc_len[row])
+        self._doc_len[row] = 0
+        self._in_main[row] = False
+        self._doc_terms[row] = None
+        self._delta_rows.discard(row)
+        self._live_count -= 1
+
+    def _add(self, key: Any, doc: Dict[str, Any]):
+        item_id = str(key)
+        row = self._rows.get(item_id)
+        if row is None:
+            row = len(self._keys)
+            self._grow(row + 1)
+            self._keys.append(key)
+            self._doc_terms.append(None)
+            self._rows[item_id] = row
+        else:
+            self._drop_row(row)
+
+        terms = _item_terms(doc)
+        self._doc_terms[row] = terms
+        self._doc_len[row] = sum(terms.values())
+        self._total_len += float(self._doc_len[row])
+        self._live_count += 1
+        for term, tf in terms.items():
+            self._df[term] = self._df.get(term, 0) + 1
+            self._delta.setdefault(term, {})[row] = tf
+            if term not in self._vocab:
+                self._new_terms.add(term)
+        self._delta_rows.add(row)
+
+    def _compact(self):
+        """Fold everything into a fresh main segment (renumbers rows)."""
+        live = [(key, terms) for key, terms in zip(self._keys, self._doc_terms) if terms is not None]
+        self._keys = [key for key, _ in live]
+        self._doc_terms = [terms for _, terms in live]
+        self._rows = {str(key): row for row, key in enumerate(self._keys)}
+        self._doc_len = np.zeros(max(1024, len(live)), dtype=np.float32)
+        self._in_main = np.zeros(self._doc_len.shape[0], dtype=bool)
+
+        postings: Dict[str, List[Tuple[int, float]]] = defaultdict(list)
+        for row, terms in enumerate(self._doc_terms):
+            self._doc_len[row] = sum(terms.values())
+            for term, tf in terms.items():
+                postings[term].append((row, tf))
+        self._in_main[: len(live)] = True
+
+        self._sorted_terms = sorted(postings)
+        self._vocab = {term: i for i, term in enumerate(self._sorted_terms)}
+        lengths = np.fromiter((len(postings[t]) for t in self._sorted_terms), dtype=np.int64,
+                              count=len(self._sorted_terms))
+        self._offsets = np.zeros(len(self._sorted_terms) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=self._offsets[1:])
+        self._post_rows = np.empty(int(self._offsets[-1]), dtype=np.int32)
+        self._post_tf = np.empty(int(self._offsets[-1]), dtype=np.float32)
+        for i, term in enumerate(self._sorted_terms):
+            rows, tfs = zip(*postings[term])
+            self._post_rows[self._offsets[i]:self._offsets[i + 1]] = rows
+            self._post_tf[self._offsets[i]:self._offsets[i + 1]] = tfs
+
+        deletes: Dict[str, List[str]] = defaultdict(list)
+        for term in self._sorted_terms:
+            if len(term) >= FUZZY_MIN_LENGTH:
+                for variant in _deletions(term):
+                    deletes[variant].append(term)
+        self._deletes = dict(deletes)
+        self._df = {term: len(postings[term]) for term in self._sorted_terms}
+        self._total_len = float(self._doc_len[: len(live)].sum())
+        self._live_count = len(live)
+        self._delta = {}
+        self._delta_rows = set()
+        self._new_terms = set()
+
+    def upsert(self, doc: Dict[str, Any]):
+        with self._lock:
+            if self._loading:
+                self._pending[str(doc["_id"])] = (doc["_id"], doc)
+            self._add(doc["_id"], doc)
+            self._stats["upserts"] += 1
+            rebuild = len(self._delta_rows) > BM25_MERGE_THRESHOLD and not self._loading
+        if rebuild:
+            threading.Thread(target=self.load, name="bm25-rebuild", daemon=True).start()
+
+    def remove(self, key: Any):
+        with self._lock:
+            if self._loading:
+                self._pending[str(key)] = (key, None)
+            row = self._rows.pop(str(key), None)
+            if row is None:
+                return
+            self._drop_row(row)
+            self._stats["removals"] += 1
+
+    def load(self):
+        """(Re)build the index from the items collection."""
+        with self._lock:
+            if self._loading:
+                return
+            self._loading = True
+            self._pending = {}
+        try:
+            fresh = BM25Index(self.k1, self.b)
+            docs = get_sync_db()["items"].find({}, _PROJECTION)
+            for doc in docs:
+                fresh._add(doc["_id"], doc)
+            fresh._compact()
+            with self._lock:
+                for name in _STATE:
+                    setattr(self, name, getattr(fresh, name))
+                self._loading = False
+                for item_id, (key, doc) in self._pending.items():
+                    if doc is None:
+                        self.remove(key)
+                    else:
+                        self.upsert(doc)
+                self._pending = {}
+                self.ready = True
+                self._stats["builds"] += 1
+            print(f"✅ BM25 search index built ({fresh._live_count} items, {len(fresh._vocab)} terms)")
+        except Exception as e:
+            print(f"❌ BM25 search index build failed: {e}")
+        finally:
+            with self._lock:
+                self._loading = False
+
+    def on_change(self, change: Dict[str, Any]):
+        operation = change.get("operationType")
+        if operation in ("insert", "update", "replace"):
+            doc = change.get("fullDocument")
+            if doc is not None:
+                self.upsert(doc)
+        elif operation == "delete":
+            self.remove(change["documentKey"]["_id"])
+        else:
+            # reset / drop / invalidate: changes may have been missed
+            threading.Thread(target=self.load, name="bm25-rebuild", daemon=True).start()
+
+    def start(self):
+        item_changes.subscribe(self.on_change)
+        threading.Thread(target=self.load, name="bm25-build", daemon=True).start()
+
+    # ---- queries ---------------------------------------------------------
+
+    def _expand(self, term: str) -> Iterable[Tuple[str, float]]:
+        """Index terms a query term matches, with their weight."""
+        matches = {}
+        if term in self._df:
+            matches[term] = 1.0
+        if len(term) >= PREFIX_MIN_LENGTH:
+            prefixed = []
+            i = bisect_left(self._sorted_terms, term)
+            while i < len(self._sorted_terms) and self._sorted_terms[i].startswith(term):
+                prefixed.append(self._sorted_terms[i])
+                i += 1
+            prefixed.extend(t for t in self._new_terms if t.startswith(term))
+            prefixed.sort(key=lambda t: -self._df.get(t, 0))
+            for candidate in prefixed[:PREFIX_MAX_EXPANSIONS]:
+                matches.setdefault(candidate, PREFIX_WEIGHT)
+        if term not in self._df and len(term) >= FUZZY_MIN_LENGTH:
+            variants = _deletions(term)
+            candidates = set(self._deletes.get(term, ()))
+            for variant in variants:
+                candidates.update(self._deletes.get(variant, ()))
+                if variant in self._vocab:
+                    candidates.add(variant)
+            candidates = {t for t in candidates if _one_edit_apart(term, t)}
+            candidates.update(t for t in self._new_terms if _one_edit_apart(term, t))
+            for candidate in candidates:
+                matches.setdefault(candidate, FUZZY_WEIGHT)
+        return matches.items()
+
+    def _postings(self, term: str) -> Iterable[Tuple[np.ndarray, np.ndarray]]:
+        i = self._vocab.get(term)
+        if i is not None:
+            start, end = self._offsets[i], self._offsets[i + 1]
+            rows = self._post_rows[start:end]
+            live = self._in_main[rows]
+            yield rows[live], self._post_tf[start:end][live]
+        delta = self._delta.get(term)
+        if delta:
+            yield (np.fromiter(delta.keys(), dtype=np.int32, count=len(delta)),
+                   np.fromiter(delta.values(), dtype=np.float32, count=len(delta)))
+
+    def search(self, terms: List[str], limit: Optional[int] = 100) -> List[Tuple[Any, float]]:
+        """
+        Rank items for the query terms.
+
+        Args:
+            terms: Query terms (already free of stopwords)
+            limit: Maximum number of hits (None for all of them)
+
+        Returns:
+            [(item _id, score)] best first
+        """
+        started = time.perf_counter()
+        with self._lock:
+            rows = len(self._keys)
+            if not self._live_count or not terms:
+                return []
+            avg_len = self._total_len / self._live_count
+            scores = np.zeros(rows, dtype=np.float32)
+            for query_term in {t for term in terms for t in tokenize(term)}:
+                # Best match per query term, so "lap" hitting laptop and lapel counts once
+                best = np.zeros(rows, dtype=np.float32)
+                for term, weight in self._expand(query_term):
+                    df = self._df.get(term)
+                    if not df:
+                        continue
+                    idf = math.log(1 + (self._live_count - df + 0.5) / (df + 0.5))
+                    for hit_rows, tf in self._postings(term):
+                        norm = self.k1 * (1 - self.b + self.b * self._doc_len[hit_rows] / avg_len)
+                        contribution = (weight * idf) * tf * (self.k1 + 1) / (tf + norm)
+                        best[hit_rows] = np.maximum(best[hit_rows], contribution)
+                scores += best
+
+            hits = np.flatnonzero(scores)
+            if limit is not None and len(hits) > limit:
+                hits = hits[np.argpartition(-scores[hits], limit - 1)[:limit]]
+            hits = hits[np.argsort(-scores[hits], kind="stable")]
+            results = [(self._keys[row], float(scores[row])) for row in hits]
+            self._stats["queries"] += 1
+            self._stats["query_ms_total"] += (time.perf_counter() - started) * 1000
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            queries = self._stats["queries"]
+            return {
+                "ready": self.ready,
+                "items": self._live_count,
+                "terms": len(self._df),
+                "postings": int(self._post_rows.shape[0]),
+                "delta_items": len(self._delta_rows),
+                "postings_mb": round((self._post_rows.nbytes + self._post_tf.nbytes + self._offsets.nbytes) / 1e6, 1),
+                "avg_query_ms": round(self._stats["query_ms_total"] / queries, 3) if queries else 0,
+                **{key: value for key, value in self._stats.items() if key != "query_ms_total"},
+            }
+
+
+bm25_index = BM25Index()
@@ -0,0 +1,126 @@
+# tools/db_stats.py
+"""
+Cheap database statistics for get_database_stats.
+
+Counts come from collection metadata ($collStats, falling back to
+estimated_document_count), never from scanning documents. All collections are
+probed concurrently, and the snapshot is cached for DB_STATS_TTL seconds so
+repeated agent calls don't touch MongoDB at all.
+"""
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from pymongo.errors import OperationFailure
+
+# Add parent directory to path for imports
+current_dir = Path(__file__).parent
+parent_dir = current_dir.parent.parent
+sys.path.append(str(parent_dir))
+
+from db_connection import DATABASE_NAME, get_sync_db
+
+DB_STATS_TTL = float(os.getenv("DB_STATS_TTL", "60"))
+DB_STATS_WORKERS = int(os.getenv("DB_STATS_WORKERS", "8"))
+
+# Field layout of the collections the agent works with (mirrors server/models)
+COLLECTION_SCHEMAS: Dict[str, Dict[str, str]] = {
+    "items": {
+        "_id": "ObjectId",
+        "sellerId": "ObjectId (users)",
+        "title": "string",
+        "description": "string",
+        "condition": "string",
+        "images": "string[] (URLs)",
+        "category": "string[]",
+        "aiVerificationScore": "number",
+        "ticketCost": "number",
+        "ticketGoal": "number",
+        "ticketsSold": "number",
+        "participants": "{userId: ObjectId, ticketsSpent: number, joinedAt: date}[]",
+        "status": "live | goal_met | goal_met_grace_period | ended | not_met | "
+                  "not_met_pending_decision | awaiting_confirmation | cancelled",
+        "winnerId": "ObjectId (users) | null",
+        "confirmationDeadline": "date | null",
+        "sellerConfirmed": "boolean | null",
+        "endDate": "date",
+        "charityOverflow": "number",
+        "createdAt": "date",
+    },
+    "users": {
+        "_id": "ObjectId",
+        "email": "string",
+        "role": "seller | buyer",
+        "ticketBalance": "number",
+        "totalRevenue": "number",
+        "totalSpent": "number",
+        "createdAt": "date",
+    },
+}
+
+
+def _probe(db, name: str) -> Dict[str, Any]:
+    collection = db[name]
+    try:
+        storage = next(collection.aggregate([{"$collStats": {"storageStats": {}}}]))["storageStats"]
+        return {
+            "document_count": storage.get("count", 0),
+            "size_bytes": storage.get("size"),
+            "avg_document_bytes": storage.get("avgObjSize"),
+            "index_count": storage.get("nindexes"),
+        }
+    except (OperationFailure, StopIteration, KeyError):
+        # $collStats isn't allowed everywhere (views, some shared tiers)
+        return {"document_count": collection.estimated_document_count()}
+
+
+class DatabaseStats:
+    def __init__(self, ttl_seconds: float = DB_STATS_TTL):
+        self.ttl_seconds = ttl_seconds
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._taken_at = 0.0
+        # One refresh at a time; concurrent callers wait and reuse it
+        self._refresh_lock = threading.Lock()
+
+    def _take_snapshot(self) -> Dict[str, Any]:
+        db = get_sync_db()
+        names = sorted(db.list_collection_names())
+        with ThreadPoolExecutor(max_workers=max(1, min(DB_STATS_WORKERS, len(names)))) as pool:
+            probes = dict(zip(names, pool.map(lambda name: _probe(db, name), names)))
+
+        collections = {}
+        for name, stats in probes.items():
+            collections[name] = stats
+            if name in COLLECTION_SCHEMAS:
+                collections[name]["schema"] = COLLECTION_SCHEMAS[name]
+        return collections
+
+    def cached(self) -> Optional[Dict[str, Any]]:
+        """The snapshot if it is still fresh, else None (never touches MongoDB)."""
+        if self._snapshot is None or time.monotonic() - self._taken_at > self.ttl_seconds:
+            return None
+        return self._describe()
+
+    def _describe(self) -> Dict[str, Any]:
+        return {
+            "database": DATABASE_NAME,
+            "collections": self._snapshot,
+            "counts_are_estimates": True,
+            "snapshot_age_seconds": round(time.monotonic() - self._taken_at, 1),
+        }
+
+    def get(self) -> Dict[str, Any]:
+        """The cached snapshot, refreshed when older than ttl_seconds."""
+        if self._snapshot is None or time.monotonic() - self._taken_at > self.ttl_seconds:
+            with self._refresh_lock:
+                if self._snapshot is None or time.monotonic() - self._taken_at > self.ttl_seconds:
+                    self._snapshot = self._take_snapshot()
+                    self._taken_at = time.monotonic()
+        return self._describe()
+
+
+database_stats = DatabaseStats()
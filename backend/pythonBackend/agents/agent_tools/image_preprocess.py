@@ -0,0 +1,132 @@
+# tools/image_preprocess.py
+"""
+Image preprocessing before Bedrock analysis.
+
+Phone photos are often 4000px+ and several MB, which inflates the request
+payload, image-token cost and latency without improving the analysis. Each
+image is decoded, EXIF signals are extracted, then it is downscaled to a capped
+longest edge, stripped of metadata and re-encoded under a byte budget. The
+real media type is detected instead of assuming JPEG.
+
+Pillow work is CPU-bound and holds the GIL, so it runs in a process pool. The
+worker code lives in the top-level image_worker module so spawned workers only
+import Pillow, not this package; prewarm_pool() starts them at app startup.
+"""
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Dict, List
+
+# Add parent directory to path for imports
+current_dir = Path(__file__).parent
+parent_dir = current_dir.parent.parent
+sys.path.append(str(parent_dir))
+
+import image_worker
+
+# Claude downsizes anything larger than ~1568px on the long edge anyway
+PREPROCESS_MAX_EDGE = int(os.getenv("PREPROCESS_MAX_EDGE", "1568"))
+# Bedrock caps images at 5MB after base64 (4/3 inflation)
+PREPROCESS_MAX_BYTES = int(os.getenv("PREPROCESS_MAX_BYTES", str(3_750_000)))
+PREPROCESS_WORKERS = int(os.getenv("PREPROCESS_WORKERS", "2"))
+
+_pool = None
+_pool_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {"images": 0, "original_bytes": 0, "processed_bytes": 0, "bytes_saved": 0, "inline_fallbacks": 0}
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: forking a process that runs event-loop and client threads is unsafe
+            _pool = ProcessPoolExecutor(
+                max_workers=PREPROCESS_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def prewarm_pool():
+    """Spawn the worker processes now (they import Pillow) so the first request doesn't wait for it."""
+    if PREPROCESS_WORKERS > 0:
+        pool = _get_pool()
+        for _ in range(PREPROCESS_WORKERS):
+            pool.submit(image_worker.warm)
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        _pool = None
+
+
+def _record(result: Dict[str, Any]):
+    with _stats_lock:
+        _stats["images"] += 1
+        _stats["original_bytes"] += result["original_bytes"]
+        _stats["processed_bytes"] += result["processed_bytes"]
+        _stats["bytes_saved"] += result["bytes_saved"]
+
+
+def _run_inline(data: bytes) -> Dict[str, Any]:
+    return image_worker.preprocess(data, PREPROCESS_MAX_EDGE, PREPROCESS_MAX_BYTES)
+
+
+def _outcome(run, return_exceptions: bool):
+    try:
+        return run()
+    except BrokenProcessPool:
+        raise
+    except Exception as e:
+        if not return_exceptions:
+            raise
+        return e
+
+
+def preprocess_images(images: List[bytes], return_exceptions: bool = False) -> List[Any]:
+    """
+    Downscale, strip and re-encode several images in parallel.
+
+    Args:
+        images: Raw image bytes
+        return_exceptions: Put the exception in place of an image that can't be
+            decoded (truncated upload, not an image) instead of raising it
+
+    Returns:
+        One dict per image, in input order, with the bytes to send ("data"), the
+        detected "media_type", dimensions, EXIF signals and
+        "original_bytes"/"processed_bytes"/"bytes_saved".
+    """
+    if PREPROCESS_WORKERS > 0:
+        try:
+            pool = _get_pool()
+            futures = [pool.submit(image_worker.preprocess, data, PREPROCESS_MAX_EDGE, PREPROCESS_MAX_BYTES) for data in images]
+            results = [_outcome(f.result, return_exceptions) for f in futures]
+        except BrokenProcessPool:
+            _reset_pool()
+            with _stats_lock:
+                _stats["inline_fallbacks"] += 1
+            results = [_outcome(lambda data=data: _run_inline(data), return_exceptions) for data in images]
+    else:
+        results = [_outcome(lambda data=data: _run_inline(data), return_exceptions) for data in images]
+
+    for result in results:
+        if isinstance(result, dict):
+            _record(result)
+    return results
+
+
+def preprocess_image(data: bytes) -> Dict[str, Any]:
+    """Preprocess a single image; see preprocess_images."""
+    return preprocess_images([data])[0]
+
+
+def preprocess_stats() -> Dict[str, Any]:
+    with _stats_lock:
+        return dict(_stats)
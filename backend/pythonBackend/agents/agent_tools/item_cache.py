@@ -0,0 +1,108 @@
+# tools/item_cache.py
+"""
+Read-through cache for hot item query tools (live auctions, category browsing).
+
+Results are keyed by tool name plus normalized arguments. Any change on the
+items collection, delivered by the change feed, clears the cache. Entries also
+expire: after ITEM_CACHE_TTL while the change feed is live, or after the much
+shorter ITEM_CACHE_FALLBACK_TTL when change streams aren't available.
+"""
+import copy
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from .item_changes import item_changes
+
+ITEM_CACHE_TTL = float(os.getenv("ITEM_CACHE_TTL", "300"))
+ITEM_CACHE_FALLBACK_TTL = float(os.getenv("ITEM_CACHE_FALLBACK_TTL", "15"))
+ITEM_CACHE_SIZE = int(os.getenv("ITEM_CACHE_SIZE", "256"))
+
+
+class ItemQueryCache:
+    def __init__(self, max_entries: int = ITEM_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped on every invalidation so a query that raced a change isn't stored
+        self._generation = 0
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0, "stale_skipped": 0}
+
+    @staticmethod
+    def _key(tool_name: str, args: Dict[str, Any]) -> Tuple:
+        return (tool_name,) + tuple(sorted(args.items()))
+
+    def _ttl(self) -> float:
+        return ITEM_CACHE_TTL if item_changes.available else ITEM_CACHE_FALLBACK_TTL
+
+    def _lookup(self, key: Tuple) -> Tuple[Optional[Dict[str, Any]], int]:
+        now = time.monotonic()
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None and cached[0] > now:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return copy.deepcopy(cached[1]), self._generation
+            self._stats["misses"] += 1
+            return None, self._generation
+
+    def _store(self, key: Tuple, generation: int, result: Dict[str, Any]):
+        if result.get("status") != "success":
+            return
+        with self._lock:
+            if generation != self._generation:
+                self._stats["stale_skipped"] += 1
+                return
+            self._entries[key] = (time.monotonic() + self._ttl(), copy.deepcopy(result))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_load(self, tool_name: str, args: Dict[str, Any], load: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Return the cached result for (tool_name, args), or call load() and cache it.
+        Only results with status "success" are cached.
+        """
+        key = self._key(tool_name, args)
+        cached, generation = self._lookup(key)
+        if cached is not None:
+            return cached
+        result = load()
+        self._store(key, generation, result)
+        return result
+
+    async def get_or_load_async(self, tool_name: str, args: Dict[str, Any],
+                                load: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """get_or_load for async loaders; shares entries with the sync tools."""
+        key = self._key(tool_name, args)
+        cached, generation = self._lookup(key)
+        if cached is not None:
+            return cached
+        result = await load()
+        self._store(key, generation, result)
+        return result
+
+    def invalidate(self, change: Dict[str, Any] = None):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+            self._stats["invalidations"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            size = len(self._entries)
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            "entries": size,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self._ttl(),
+            "hit_rate": round(self._stats["hits"] / lookups, 3) if lookups else 0,
+            "change_feed": item_changes.stats(),
+            **self._stats,
+        }
+
+
+item_query_cache = ItemQueryCache()
+item_changes.subscribe(item_query_cache.invalidate)
@@ -0,0 +1,121 @@
+# tools/item_changes.py
+"""
+Change feed for the items collection.
+
+A daemon thread follows a MongoDB change stream on items and hands every change
+event to the registered subscribers (caches and in-memory indexes). After a
+reconnect, subscribers get a synthetic {"operationType": "reset"} event because
+changes may have been missed; they should rebuild or drop their state.
+
+Change streams need a replica set. On a standalone server the feed reports
+available=False and subscribers fall back to their own expiry. For local
+testing, a single-node replica set is enough:
+
+    mongod --replSet rs0 --dbpath /tmp/rs0 && mongosh --eval "rs.initiate()"
+"""
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+# Add parent directory to path for imports
+current_dir = Path(__file__).parent
+parent_dir = current_dir.parent.parent
+sys.path.append(str(parent_dir))
+
+from db_connection import get_sync_db
+
+# Server error codes meaning "change streams are not supported here"
+_UNSUPPORTED_CODES = {40573, 40324, 20}
+_RECONNECT_DELAY = 5
+
+
+class ItemChangeFeed:
+    def __init__(self, collection_name: str = "items"):
+        self.collection_name = collection_name
+        self.available = False
+        self._subscribers: List[Callable[[Dict[str, Any]], None]] = []
+        self._resume_token = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._stats = {"events": 0, "reconnects": 0, "subscriber_errors": 0}
+        self._last_error: Optional[str] = None
+
+    def subscribe(self, callback: Callable[[Dict[str, Any]], None]):
+        """Call callback(change_event) for every change. Callbacks run on the feed thread."""
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._follow, name="item-change-feed", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _publish(self, change: Dict[str, Any]):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(change)
+            except Exception as e:
+                self._stats["subscriber_errors"] += 1
+                print(f"Item change subscriber failed: {e}")
+
+    def _follow(self):
+        first_connect = True
+        while not self._stop.is_set():
+            try:
+                collection = get_sync_db()[self.collection_name]
+                with collection.watch(
+                    full_document="updateLookup",
+                    resume_after=self._resume_token,
+                    max_await_time_ms=1000,
+                ) as stream:
+                    self.available = True
+                    if not first_connect:
+                        # Anything between the drop and now may be missing
+                        self._stats["reconnects"] += 1
+                        self._publish({"operationType": "reset"})
+                    first_connect = False
+                    while not self._stop.is_set() and stream.alive:
+                        change = stream.try_next()
+                        self._resume_token = stream.resume_token
+                        if change is not None:
+                            self._stats["events"] += 1
+                            self._publish(change)
+            except OperationFailure as e:
+                self.available = False
+                self._last_error = str(e)
+                if e.code in _UNSUPPORTED_CODES:
+                    print(f"Item change feed unavailable (needs a replica set): {e}")
+                    return
+                if e.code == 286:
+                    # Resume point fell off the oplog; start fresh
+                    self._resume_token = None
+                print(f"Item change feed error: {e}")
+            except PyMongoError as e:
+                self.available = False
+                self._last_error = str(e)
+                print(f"Item change feed error: {e}")
+            self._stop.wait(_RECONNECT_DELAY)
+        self.available = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "available": self.available,
+            "subscribers": len(self._subscribers),
+            "last_error": self._last_error,
+            **self._stats,
+        }
+
+
+item_changes = ItemChangeFeed()
@@ -0,0 +1,140 @@
+# tools/item_queries.py
+"""
+Query shapes shared by the item query tools.
+
+query_database.py (pymongo) and query_database_async.py (Motor) take their
+filters, sorts, projections and result dicts from here and differ only in how
+they run the query; indexes.py explains these same shapes against the indexes.
+
+A listing is one of the fixed item queries (live auctions, a category, ...):
+{"key": result field, "filter", "sort", "context": fields echoed in the result,
+"cache_key": arguments that identify it in the item query cache}.
+"""
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+
+# Add parent directory to path for imports
+current_dir = Path(__file__).parent
+parent_dir = current_dir.parent.parent
+sys.path.append(str(parent_dir))
+
+from pagination import clamp_limit
+from serialization import to_jsonable
+from .projections import projection_for
+from .query_planner import category_values
+from .text_search import SCORE_SORT, ranked_filter
+
+
+def item_profile(collection_name: str, profile: str) -> str:
+    """Item profiles trim fields server-side; other collections return whole documents"""
+    return profile if collection_name == "items" else "admin"
+
+
+def id_filter(item_id: str) -> Dict[str, Any]:
+    """Match on _id when item_id is an ObjectId, otherwise on the string "id" field"""
+    if ObjectId.is_valid(item_id):
+        return {"_id": ObjectId(item_id)}
+    return {"id": item_id}
+
+
+def _listing(key: str, query_filter: Dict[str, Any], sort: Optional[List[Tuple[str, int]]],
+             cache_key: Optional[Dict[str, Any]] = None, **context) -> Dict[str, Any]:
+    return {"key": key, "filter": query_filter, "sort": sort, "context": context, "cache_key": cache_key or {}}
+
+
+def category_listing(category: str) -> Dict[str, Any]:
+    # Exact spellings rather than a regex so the category index is used
+    return _listing("items", {'category': {'$in': category_values(category)}}, None,
+                    cache_key={"category": category.strip().lower()}, category=category)
+
+
+def live_listing() -> Dict[str, Any]:
+    # Ending soonest first, served by the status/endDate index
+    return _listing("live_auctions", {'status': 'live'}, [('endDate', 1)])
+
+
+def ticket_cost_listing(min_tickets: int, max_tickets: int) -> Dict[str, Any]:
+    return _listing("items", {'ticketCost': {'$gte': min_tickets, '$lte': max_tickets}}, [('ticketCost', 1)],
+                    ticket_range=f"{min_tickets}-{max_tickets}")
+
+
+def high_ai_score_listing(min_score: float) -> Dict[str, Any]:
+    return _listing("high_quality_items", {'aiVerificationScore': {'$gte': min_score}}, [('aiVerificationScore', -1)],
+                    min_ai_score=min_score)
+
+
+def cache_args(listing: Dict[str, Any], limit: int, profile: str, cursor: str) -> Dict[str, Any]:
+    return {**listing["cache_key"], "limit": limit, "profile": profile, "cursor": cursor}
+
+
+def find_spec(query: Dict[str, Any], limit: int, profile: str) -> Tuple[str, Dict[str, Any], Optional[Dict[str, Any]], Any]:
+    """
+    How to run a query built by build_text_query.
+
+    Returns:
+        (mode, filter, projection, sort), where mode is "page" (a keyset page
+        through fetch_page), "ranked" (fetch the ranked_batches until there are
+        clamp_limit(limit) documents, then order_by_rank)
+        or "top" (one page sorted by text score, limited to clamp_limit(limit))
+    """
+    projection = projection_for(profile, query["projection"])
+    if query["backend"] == "bm25":
+        if query["sort"]:
+            # Explicit order ("cheapest") over the relevant items pages as usual
+            return "page", ranked_filter(query), projection, query["sort"]
+        # Relevance order comes from the index, so ranked searches are a single page
+        return "ranked", query["filter"], projection, None
+    if query["sort"] == SCORE_SORT:
+        # Relevance scores can't be used as a keyset, so ranked keyword searches are a single page
+        return "top", query["filter"], projection, query["sort"]
+    return "page", query["filter"], projection, query["sort"]
+
+
+def page_result(listing: Dict[str, Any], results: List[Dict[str, Any]], next_cursor: Optional[str]) -> Dict[str, Any]:
+    # ObjectIds (incl. sellerId/winnerId) and dates to JSON types in one pass
+    results = to_jsonable(results)
+    return {
+        "status": "success",
+        **listing["context"],
+        "total_results": len(results),
+        listing["key"]: results,
+        "next_cursor": next_cursor
+    }
+
+
+def search_context(query_prompt: str, collection_name: str) -> Dict[str, Any]:
+    return {"query_prompt": query_prompt, "collection": collection_name}
+
+
+def search_result(query_prompt: str, collection_name: str, query: Dict[str, Any],
+                  results: List[Dict[str, Any]], next_cursor: Optional[str]) -> Dict[str, Any]:
+    results = to_jsonable(results)
+    return {
+        "status": "success",
+        **search_context(query_prompt, collection_name),
+        "total_results": len(results),
+        "results": results,
+        "next_cursor": next_cursor,
+        "query_filter_used": to_jsonable(query["filter"]),
+        "sort_used": query["sort"],
+        "search_backend": query["backend"]
+    }
+
+
+def item_result(item_id: str, item: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        "status": "success",
+        "item": to_jsonable(item),
+        "item_id": item_id
+    }
+
+
+def error_result(error: Exception, **context) -> Dict[str, Any]:
+    return {
+        "status": "error",
+        "error": str(error),
+        **context
+    }
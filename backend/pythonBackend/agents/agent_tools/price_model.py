@@ -0,0 +1,191 @@
+# tools/price_model.py
+"""
+Price model behind recommend_price.
+
+A background thread periodically aggregates finished listings (goal met or
+not) in the items collection (ticketGoal, ticketCost, ticketsSold and
+sell-through) by category and condition, and
+stores percentile tables in one NumPy array. A lookup is a dict hit plus an
+array row, so recommend_price answers without querying MongoDB.
+
+Sparse groups fall back to broader ones: category + condition, then category,
+then condition, then every item.
+"""
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Add parent directory to path for imports
+current_dir = Path(__file__).parent
+parent_dir = current_dir.parent.parent
+sys.path.append(str(parent_dir))
+
+from db_connection import get_sync_db
+
+PRICE_MODEL_REFRESH = float(os.getenv("PRICE_MODEL_REFRESH", "3600"))
+PRICE_MODEL_MIN_SAMPLES = int(os.getenv("PRICE_MODEL_MIN_SAMPLES", "5"))
+
+PERCENTILES = (10, 25, 50, 75, 90)
+METRICS = ("ticketGoal", "ticketCost", "ticketsSold", "sell_through")
+ANY = "*"
+
+# One row per (category tag, condition). Only finished listings: live ones have
+# a partial ticketsSold and cancelled ones say nothing about price
+_PIPELINE = [
+    {"$match": {"status": {"$in": ["goal_met", "not_met"]}, "ticketGoal": {"$gt": 0}}},
+    {"$unwind": {"path": "$category", "preserveNullAndEmptyArrays": True}},
+    {"$project": {
+        "_id": 0,
+        "category": {"$toLower": {"$ifNull": ["$category", ""]}},
+        "condition": {"$toLower": {"$ifNull": ["$condition", ""]}},
+        "ticketGoal": {"$ifNull": ["$ticketGoal", 0]},
+        "ticketCost": {"$ifNull": ["$ticketCost", 0]},
+        "ticketsSold": {"$ifNull": ["$ticketsSold", 0]},
+    }},
+]
+
+
+class PriceModel:
+    def __init__(self, refresh_seconds: float = PRICE_MODEL_REFRESH):
+        self.refresh_seconds = refresh_seconds
+        # (category, condition) -> row; ANY stands for "all categories/conditions"
+        self._groups: Dict[Tuple[str, str], int] = {}
+        # [group, metric, percentile]
+        self._table = np.zeros((0, len(METRICS), len(PERCENTILES)), dtype=np.float32)
+        self._counts = np.zeros(0, dtype=np.int32)
+        self._built_at: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._last_error: Optional[str] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._built_at is not None
+
+    def _rows(self) -> Iterable[Dict[str, Any]]:
+        return get_sync_db()["items"].aggregate(_PIPELINE, batchSize=5000)
+
+    def refresh(self):
+        """Rebuild the percentile tables from the items collection."""
+        categories: List[str] = []
+        conditions: List[str] = []
+        values: List[Tuple[float, float, float]] = []
+        for row in self._rows():
+            categories.append(row["category"])
+            conditions.append(row["condition"])
+            values.append((row["ticketGoal"], row["ticketCost"], row["ticketsSold"]))
+        if not values:
+            # Nothing to learn from yet: built, but empty, so recommend_price
+            # uses its fallback pricing instead of waiting for a build
+            self._groups, self._table, self._counts = (
+                {}, np.zeros((0, len(METRICS), len(PERCENTILES)), dtype=np.float32), np.zeros(0, dtype=np.int32)
+            )
+            self._built_at = time.time()
+            return
+
+        data = np.asarray(values, dtype=np.float64)
+        data = np.column_stack([data, data[:, 2] / data[:, 0]])
+        categories = np.asarray(categories, dtype=object)
+        conditions = np.asarray(conditions, dtype=object)
+
+        groups: Dict[Tuple[str, str], int] = {}
+        tables, counts = [], []
+
+        def add_groups(keys: List[Tuple[str, str]], members: np.ndarray):
+            # members[i] is the group id of data row i; one sort then contiguous slices
+            order = np.argsort(members, kind="stable")
+            bounds = np.flatnonzero(np.diff(members[order])) + 1
+            for chunk in np.split(order, bounds):
+                key = keys[members[chunk[0]]]
+                if key[0] == "" or key[1] == "":
+                    continue
+                groups[key] = len(tables)
+                tables.append(np.percentile(data[chunk], PERCENTILES, axis=0).T)
+                counts.append(len(chunk))
+
+        pair_keys = list(zip(categories, conditions))
+        for key_of in (lambda i: pair_keys[i], lambda i: (categories[i], ANY), lambda i: (ANY, conditions[i])):
+            ids: Dict[Tuple[str, str], int] = {}
+            members = np.fromiter((ids.setdefault(key_of(i), len(ids)) for i in range(len(data))),
+                                  dtype=np.int64, count=len(data))
+            add_groups(list(ids), members)
+        # Unwinding counts multi-tag items once per tag; fine for percentiles
+        groups[(ANY, ANY)] = len(tables)
+        tables.append(np.percentile(data, PERCENTILES, axis=0).T)
+        counts.append(len(data))
+
+        # Swap in one step; readers see either the old or the new tables
+        self._groups, self._table, self._counts = (
+            groups, np.asarray(tables, dtype=np.float32), np.asarray(counts, dtype=np.int32)
+        )
+        self._built_at = time.time()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+                self._last_error = None
+            except Exception as e:
+                self._last_error = str(e)
+                print(f"❌ Price model refresh failed: {e}")
+            self._stop.wait(self.refresh_seconds)
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="price-model", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def has_category(self, category: str) -> bool:
+        return (category, ANY) in self._groups
+
+    def estimate(self, category: Optional[str], condition: Optional[str]) -> Optional[Dict[str, Any]]:
+        """
+        Percentile ranges for the most specific group with enough samples.
+
+        Args:
+            category: Category tag (any case), or None
+            condition: Item condition (any case), or None
+
+        Returns:
+            Dict with "basis", "sample_size" and one percentile dict per metric,
+            or None before the first refresh and while there are no listings
+        """
+        groups, table, counts = self._groups, self._table, self._counts
+        category = (category or "").strip().lower() or ANY
+        condition = (condition or "").strip().lower() or ANY
+        for key in ((category, condition), (category, ANY), (ANY, condition), (ANY, ANY)):
+            row = groups.get(key)
+            if row is None or (counts[row] < PRICE_MODEL_MIN_SAMPLES and key != (ANY, ANY)):
+                continue
+            return {
+                "basis": {"category": None if key[0] == ANY else key[0],
+                          "condition": None if key[1] == ANY else key[1]},
+                "sample_size": int(counts[row]),
+                **{
+                    metric: {f"p{p}": round(float(value), 3 if metric == "sell_through" else 2)
+                             for p, value in zip(PERCENTILES, table[row, m])}
+                    for m, metric in enumerate(METRICS)
+                },
+            }
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "groups": len(self._groups),
+            "age_seconds": round(time.time() - self._built_at, 1) if self._built_at else None,
+            "last_error": self._last_error,
+        }
+
+
+price_model = PriceModel()
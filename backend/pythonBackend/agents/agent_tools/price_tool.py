@@ -1,17 +1,71 @@
 # tools/price_tool.py
+import re
+from typing import Any, Dict
+
 from strands import tool
 
+from .price_model import price_model
+
+# Used while there are no past listings to learn from
+FALLBACK_TICKET_GOAL = 500
+FALLBACK_CONDITION_FACTORS = {
+    "new": 1.0,
+    "used": 0.7,
+    "refurbished": 0.85
+}
+
+
+def _category_for(product_name: str) -> str:
+    """First word of the product name (or its singular) that is a known category tag."""
+    for word in re.findall(r"[a-z0-9]+", product_name.lower()):
+        for candidate in (word, word[:-1] if word.endswith("s") else None):
+            if candidate and price_model.has_category(candidate):
+                return candidate
+    return ""
+
+
 @tool
-def recommend_price(product_name: str, condition: str) -> float:
+def recommend_price(product_name: str, condition: str, category: str = "") -> Dict[str, Any]:
     """
-    Recommend a fair price based on condition.
-    Returns a numeric price estimate.
+    Recommend a fair ticket goal and ticket cost for a product, based on past
+    listings in the same category and condition.
+
+    Args:
+        product_name: Product name, e.g. "MacBook Pro laptop"
+        condition: Item condition (new, used, refurbished, ...)
+        category: Category tag (e.g. "Electronics"); guessed from the product name if empty
+
+    Returns:
+        Dictionary with the recommended ticket goal (median), and 10th-90th
+        percentile ranges for ticketGoal, ticketCost, ticketsSold and
+        sell_through among comparable listings. With no past listings at all,
+        a flat condition-based ticket goal with "fallback": True
     """
-    base_prices = {
-        "new": 1.0,
-        "used": 0.7,
-        "refurbished": 0.85
+    category = category or _category_for(product_name)
+    estimate = price_model.estimate(category, condition)
+    if estimate is None and price_model.ready:
+        factor = FALLBACK_CONDITION_FACTORS.get(condition.strip().lower(), 1.0)
+        return {
+            "status": "success",
+            "product_name": product_name,
+            "condition": condition,
+            "recommended_ticket_goal": FALLBACK_TICKET_GOAL * factor,
+            "recommended_ticket_cost": None,
+            "basis": None,
+            "sample_size": 0,
+            "fallback": True
+        }
+    if estimate is None:
+        return {
+            "status": "error",
+            "error": "Price model has not been built yet, try again shortly",
+            "product_name": product_name
+        }
+    return {
+        "status": "success",
+        "product_name": product_name,
+        "condition": condition,
+        "recommended_ticket_goal": estimate["ticketGoal"]["p50"],
+        "recommended_ticket_cost": estimate["ticketCost"]["p50"],
+        **estimate
     }
-    condition_factor = base_prices.get(condition.lower(), 1.0)
-    base_price = 500  # fallback average
-    return base_price * condition_factor
@@ -0,0 +1,59 @@
+# tools/projections.py
+"""
+Named field projections for the item query tools.
+
+Applied in the MongoDB query itself so unused fields (above all the unbounded
+participants array) are never transferred or decoded:
+
+- card:   what a listing tile and the agent's summaries need, with the
+          description cut to CARD_DESCRIPTION_CHARS (default)
+- detail: the full listing without participants, plus a participant count
+- admin:  the raw document, participants included
+"""
+from typing import Any, Dict, Optional
+
+DEFAULT_PROFILE = "card"
+# Enough of the description for the agent to describe an item in a summary
+CARD_DESCRIPTION_CHARS = 200
+
+_CARD_FIELDS = [
+    "title", "condition", "category", "status", "ticketCost", "ticketGoal",
+    "ticketsSold", "aiVerificationScore", "endDate", "createdAt",
+]
+
+_DETAIL_FIELDS = _CARD_FIELDS + [
+    "description", "images", "sellerId", "winnerId", "confirmationDeadline",
+    "sellerConfirmed", "charityOverflow",
+]
+
+PROJECTIONS: Dict[str, Optional[Dict[str, Any]]] = {
+    "card": {
+        **{field: 1 for field in _CARD_FIELDS},
+        # Cover image only
+        "images": {"$slice": 1},
+        # Cut server-side, in characters rather than UTF-8 bytes
+        "description": {"$substrCP": [{"$ifNull": ["$description", ""]}, 0, CARD_DESCRIPTION_CHARS]},
+    },
+    "detail": {
+        **{field: 1 for field in _DETAIL_FIELDS},
+        "participantCount": {"$size": {"$ifNull": ["$participants", []]}},
+    },
+    "admin": None,
+}
+
+
+def projection_for(profile: Optional[str] = None, extra: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Projection document for a profile, optionally merged with extra fields
+    (e.g. the text relevance score).
+
+    Raises:
+        ValueError: Unknown profile name
+    """
+    profile = profile or DEFAULT_PROFILE
+    if profile not in PROJECTIONS:
+        raise ValueError(f"Unknown profile '{profile}', expected one of: {', '.join(PROJECTIONS)}")
+    base = PROJECTIONS[profile]
+    if base is None:
+        return dict(extra) if extra else None
+    return {**base, **(extra or {})}
@@ -1,7 +1,6 @@
 # tools/query_database.py
 from strands import tool
-import re
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 import sys
 from pathlib import Path
 
@@ -11,9 +10,22 @@ parent_dir = current_dir.parent.parent
 sys.path.append(str(parent_dir))
 
 from db_connection import get_sync_db
+from pagination import clamp_limit, fetch_page
+from pymongo.errors import OperationFailure
+from .db_stats import database_stats
+from .item_cache import item_query_cache
+from .item_queries import (
+    cache_args, category_listing, error_result, find_spec, high_ai_score_listing, id_filter, item_profile,
+    item_result, live_listing, page_result, search_context, search_result, ticket_cost_listing
+)
+from .projections import projection_for
+from .query_planner import plan_query
+from .text_search import (
+    build_text_query, forget_text_index, is_missing_text_index, order_by_rank, ranked_batches, regex_filter
+)
 
 @tool
-def query_database(query_prompt: str, collection_name: str = "items", limit: int = 50) -> Dict[str, Any]:
+def query_database(query_prompt: str, collection_name: str = "items", limit: int = 50, profile: str = "card", cursor: str = "") -> Dict[str, Any]:
     """
     Query the MongoDB database based on a natural language prompt.
     
@@ -30,41 +42,55 @@ def query_database(query_prompt: str, collection_name: str = "items", limit: int
         query_prompt: Natural language description of what to search for
         collection_name: MongoDB collection to search (default: "items")
         limit: Maximum number of results to return (default: 50)
+        profile: Fields to return for items: "card" (summary with a shortened
+            description, default), "detail" (full listing without participants)
+            or "admin" (everything)
+        cursor: "next_cursor" from a previous call with the same prompt, to get the next page
     
     Returns:
-        Dictionary containing search results and metadata
+        Dictionary containing search results, metadata and "next_cursor"
+        (None on the last page, and for keyword searches ranked by relevance)
     """
     try:
         db = get_sync_db()
         collection = db[collection_name]
         
-        # Parse the query prompt to build MongoDB query
-        query_filter = _parse_query_prompt(query_prompt)
+        # Plan the prompt into one filter covering every constraint it mentions;
+        # leftover keywords are ranked by the BM25 index (or the weighted text index)
+        plan = plan_query(query_prompt)
+        query = build_text_query(collection, plan["text_terms"], plan["filter"], plan["sort"])
+        profile = item_profile(collection_name, profile)
         
         # Execute the query
-        results = list(collection.find(query_filter).limit(limit))
-        
-        # Convert ObjectId to string for JSON serialization
-        for result in results:
-            if '_id' in result:
-                result['_id'] = str(result['_id'])
+        try:
+            results, next_cursor = _run_find(collection, query, limit, profile, cursor)
+        except OperationFailure as e:
+            if query["backend"] != "text" or not is_missing_text_index(e):
+                raise
+            # Index was dropped since we last looked; retry with the regex fallback
+            forget_text_index(collection)
+            query = build_text_query(collection, plan["text_terms"], plan["filter"], plan["sort"])
+            results, next_cursor = _run_find(collection, query, limit, profile, cursor)
         
-        return {
-            "status": "success",
-            "query_prompt": query_prompt,
-            "collection": collection_name,
-            "total_results": len(results),
-            "results": results,
-            "query_filter_used": query_filter
-        }
+        return search_result(query_prompt, collection_name, query, results, next_cursor)
         
     except Exception as e:
-        return {
-            "status": "error",
-            "error": str(e),
-            "query_prompt": query_prompt,
-            "collection": collection_name
-        }
+        return error_result(e, **search_context(query_prompt, collection_name))
+
+def _run_find(collection, query: Dict[str, Any], limit: int, profile: str,
+              cursor: str = "") -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    mode, query_filter, projection, sort = find_spec(query, limit, profile)
+    if mode == "ranked":
+        limit = clamp_limit(limit)
+        docs = []
+        for batch_filter in ranked_batches(query, limit):
+            docs.extend(collection.find(batch_filter, projection))
+            if len(docs) >= limit:
+                break
+        return order_by_rank(docs, query, limit), None
+    if mode == "top":
+        return list(collection.find(query_filter, projection).sort(sort).limit(clamp_limit(limit))), None
+    return fetch_page(collection, query_filter, projection, sort, limit, cursor)
 
 def _parse_query_prompt(prompt: str) -> Dict[str, Any]:
     """
@@ -76,268 +102,103 @@ def _parse_query_prompt(prompt: str) -> Dict[str, Any]:
     Returns:
         MongoDB query filter dictionary
     """
-    query_filter = {}
-    prompt_lower = prompt.lower()
-    
-    # Ticket cost range detection
-    ticket_patterns = [
-        (r'under (\d+)\s*tickets?', 'lt'),
-        (r'below (\d+)\s*tickets?', 'lt'),
-        (r'less than (\d+)\s*tickets?', 'lt'),
-        (r'over (\d+)\s*tickets?', 'gt'),
-        (r'above (\d+)\s*tickets?', 'gt'),
-        (r'more than (\d+)\s*tickets?', 'gt'),
-        (r'between (\d+)\s*and (\d+)\s*tickets?', 'between'),
-        (r'from (\d+)\s*to (\d+)\s*tickets?', 'between'),
-        (r'(\d+)\s*-\s*(\d+)\s*tickets?', 'between')
-    ]
-    
-    for pattern, operator in ticket_patterns:
-        match = re.search(pattern, prompt_lower)
-        if match:
-            if operator == 'between':
-                min_tickets = int(match.group(1))
-                max_tickets = int(match.group(2))
-                query_filter['ticketCost'] = {'$gte': min_tickets, '$lte': max_tickets}
-            else:
-                tickets = int(match.group(1))
-                if operator == 'lt':
-                    query_filter['ticketCost'] = {'$lt': tickets}
-                elif operator == 'gt':
-                    query_filter['ticketCost'] = {'$gt': tickets}
-            break
-    
-    # Status detection
-    status_keywords = ['live', 'active', 'ended', 'completed', 'goal met', 'not met', 'failed']
-    for status in status_keywords:
-        if status in prompt_lower:
-            if status in ['live', 'active']:
-                query_filter['status'] = 'live'
-            elif status in ['ended', 'completed', 'goal met']:
-                query_filter['status'] = 'goal_met'
-            elif status in ['not met', 'failed']:
-                query_filter['status'] = 'not_met'
-            break
-    
-    # Category detection
-    category_keywords = ['electronics', 'phone', 'laptop', 'tablet', 'headphones', 'camera', 'watch', 'shoes', 'clothing', 'accessories', 'gaming', 'books', 'furniture']
-    for category in category_keywords:
-        if category in prompt_lower:
-            query_filter['category'] = {'$in': [{'$regex': category, '$options': 'i'}]}
-            break
-    
-    # Condition detection
-    condition_keywords = ['new', 'used', 'refurbished', 'damaged', 'excellent', 'good', 'fair', 'mint']
-    for condition in condition_keywords:
-        if condition in prompt_lower:
-            query_filter['condition'] = {'$regex': condition, '$options': 'i'}
-            break
-    
-    # AI verification score detection
-    ai_score_patterns = [
-        (r'ai score (over|above) (\d+)', 'gt'),
-        (r'ai score (under|below) (\d+)', 'lt'),
-        (r'high ai score', 'high'),
-        (r'low ai score', 'low')
-    ]
-    
-    for pattern, operator in ai_score_patterns:
-        match = re.search(pattern, prompt_lower)
-        if match:
-            if operator == 'gt':
-                score = int(match.group(2))
-                query_filter['aiVerificationScore'] = {'$gt': score}
-            elif operator == 'lt':
-                score = int(match.group(2))
-                query_filter['aiVerificationScore'] = {'$lt': score}
-            elif operator == 'high':
-                query_filter['aiVerificationScore'] = {'$gte': 8}
-            elif operator == 'low':
-                query_filter['aiVerificationScore'] = {'$lte': 5}
-            break
-    
-    # Popularity/participation detection
-    if 'popular' in prompt_lower or 'many participants' in prompt_lower:
-        query_filter['ticketsSold'] = {'$gt': 10}
-    elif 'new' in prompt_lower and 'auction' in prompt_lower:
-        query_filter['ticketsSold'] = {'$lt': 5}
-    
-    # General text search across multiple fields
-    if not query_filter:  # If no specific patterns found, do general text search
-        search_terms = prompt.split()
-        if search_terms:
-            # Create a text search across title, description, and category fields
-            text_query = {
-                '$or': [
-                    {'title': {'$regex': '|'.join(search_terms), '$options': 'i'}},
-                    {'description': {'$regex': '|'.join(search_terms), '$options': 'i'}},
-                    {'category': {'$in': [{'$regex': '|'.join(search_terms), '$options': 'i'}]}}
-                ]
-            }
-            query_filter.update(text_query)
-    
+    plan = plan_query(prompt)
+    query_filter = plan["filter"]
+    if plan["text_terms"]:
+        query_filter.update(regex_filter(plan["text_terms"]))
     return query_filter
 
 @tool
-def get_item_by_id(item_id: str, collection_name: str = "items") -> Dict[str, Any]:
+def get_item_by_id(item_id: str, collection_name: str = "items", profile: str = "detail") -> Dict[str, Any]:
     """
     Get a specific auction item by its ID.
     
     Args:
         item_id: The ID of the item to retrieve
         collection_name: MongoDB collection to search (default: "items")
+        profile: "card", "detail" (default, no participants) or "admin" (everything)
     
     Returns:
         Dictionary containing the item information
     """
     try:
-        from bson import ObjectId
         db = get_sync_db()
         collection = db[collection_name]
         
-        # Try to find by ObjectId first, then by string ID
-        try:
-            item = collection.find_one({"_id": ObjectId(item_id)})
-        except:
-            item = collection.find_one({"id": item_id})
+        # By ObjectId when the ID is one, otherwise by string ID
+        item = collection.find_one(id_filter(item_id), projection_for(item_profile(collection_name, profile)))
         
-        if item and '_id' in item:
-            item['_id'] = str(item['_id'])
-        
-        return {
-            "status": "success",
-            "item": item,
-            "item_id": item_id
-        }
+        return item_result(item_id, item)
         
     except Exception as e:
-        return {
-            "status": "error",
-            "error": str(e),
-            "item_id": item_id
-        }
+        return error_result(e, item_id=item_id)
 
 @tool
-def get_items_by_category(category: str, limit: int = 20) -> Dict[str, Any]:
+def get_items_by_category(category: str, limit: int = 20, profile: str = "card", cursor: str = "") -> Dict[str, Any]:
     """
     Get all auction items in a specific category.
     
     Args:
         category: Item category to search for
         limit: Maximum number of results to return
+        profile: "card" (default), "detail" or "admin" (includes participants)
+        cursor: "next_cursor" from the previous page, or empty for the first page
     
     Returns:
         Dictionary containing items in the category
     """
-    try:
-        db = get_sync_db()
-        collection = db["items"]
-        
-        query_filter = {
-            'category': {'$in': [{'$regex': category, '$options': 'i'}]}
-        }
-        
-        results = list(collection.find(query_filter).limit(limit))
-        
-        # Convert ObjectId to string
-        for result in results:
-            if '_id' in result:
-                result['_id'] = str(result['_id'])
-        
-        return {
-            "status": "success",
-            "category": category,
-            "total_results": len(results),
-            "items": results
-        }
-        
-    except Exception as e:
-        return {
-            "status": "error",
-            "error": str(e),
-            "category": category
-        }
+    listing = category_listing(category)
+    # Served from the read-through cache; item changes invalidate it
+    return item_query_cache.get_or_load(
+        "get_items_by_category",
+        cache_args(listing, limit, profile, cursor),
+        lambda: _list_items(listing, limit, profile, cursor),
+    )
 
 @tool
 def get_database_stats() -> Dict[str, Any]:
     """
     Get statistics about the database collections and data.
     
+    Document counts are estimates from collection metadata, and the snapshot
+    is cached for a short time, so this never scans the database.
+    
     Returns:
-        Dictionary containing database statistics
+        Dictionary containing per-collection counts and sizes, plus the field
+        schema of the items and users collections
     """
     try:
-        db = get_sync_db()
-        
-        # Get collection names
-        collections = db.list_collection_names()
-        
-        stats = {}
-        for collection_name in collections:
-            collection = db[collection_name]
-            count = collection.count_documents({})
-            stats[collection_name] = {
-                "document_count": count
-            }
-            
-            # Get sample document structure for products collection
-            if collection_name == "products" and count > 0:
-                sample = collection.find_one()
-                if sample:
-                    stats[collection_name]["sample_fields"] = list(sample.keys())
-        
         return {
             "status": "success",
-            "database": "hackmidwest",
-            "collections": stats
+            **database_stats.get()
         }
         
     except Exception as e:
-        return {
-            "status": "error",
-            "error": str(e)
-        }
+        return error_result(e)
 
 @tool
-def get_live_auctions(limit: int = 20) -> Dict[str, Any]:
+def get_live_auctions(limit: int = 20, profile: str = "card", cursor: str = "") -> Dict[str, Any]:
     """
     Get all currently live auction items.
     
     Args:
         limit: Maximum number of results to return
+        profile: "card" (default), "detail" or "admin" (includes participants)
+        cursor: "next_cursor" from the previous page, or empty for the first page
     
     Returns:
         Dictionary containing live auction items
     """
-    try:
-        db = get_sync_db()
-        collection = db["items"]
-        
-        query_filter = {
-            'status': 'live'
-        }
-        
-        results = list(collection.find(query_filter).limit(limit))
-        
-        # Convert ObjectId to string
-        for result in results:
-            if '_id' in result:
-                result['_id'] = str(result['_id'])
-        
-        return {
-            "status": "success",
-            "total_results": len(results),
-            "live_auctions": results
-        }
-        
-    except Exception as e:
-        return {
-            "status": "error",
-            "error": str(e)
-        }
+    listing = live_listing()
+    # Served from the read-through cache; item changes invalidate it
+    return item_query_cache.get_or_load(
+        "get_live_auctions",
+        cache_args(listing, limit, profile, cursor),
+        lambda: _list_items(listing, limit, profile, cursor),
+    )
 
 @tool
-def get_auctions_by_ticket_cost(min_tickets: int, max_tickets: int, limit: int = 20) -> Dict[str, Any]:
+def get_auctions_by_ticket_cost(min_tickets: int, max_tickets: int, limit: int = 20, profile: str = "card", cursor: str = "") -> Dict[str, Any]:
     """
     Get auction items within a specific ticket cost range.
     
@@ -345,76 +206,35 @@ def get_auctions_by_ticket_cost(min_tickets: int, max_tickets: int, limit: int =
         min_tickets: Minimum ticket cost
         max_tickets: Maximum ticket cost
         limit: Maximum number of results to return
+        profile: "card" (default), "detail" or "admin" (includes participants)
+        cursor: "next_cursor" from the previous page, or empty for the first page
     
     Returns:
         Dictionary containing items in the ticket cost range
     """
-    try:
-        db = get_sync_db()
-        collection = db["items"]
-        
-        query_filter = {
-            'ticketCost': {'$gte': min_tickets, '$lte': max_tickets}
-        }
-        
-        results = list(collection.find(query_filter).limit(limit))
-        
-        # Convert ObjectId to string
-        for result in results:
-            if '_id' in result:
-                result['_id'] = str(result['_id'])
-        
-        return {
-            "status": "success",
-            "ticket_range": f"{min_tickets}-{max_tickets}",
-            "total_results": len(results),
-            "items": results
-        }
-        
-    except Exception as e:
-        return {
-            "status": "error",
-            "error": str(e),
-            "ticket_range": f"{min_tickets}-{max_tickets}"
-        }
+    return _list_items(ticket_cost_listing(min_tickets, max_tickets), limit, profile, cursor)
 
 @tool
-def get_high_ai_score_items(min_score: float = 8.0, limit: int = 20) -> Dict[str, Any]:
+def get_high_ai_score_items(min_score: float = 8.0, limit: int = 20, profile: str = "card", cursor: str = "") -> Dict[str, Any]:
     """
     Get auction items with high AI verification scores.
     
     Args:
         min_score: Minimum AI verification score (default: 8.0)
         limit: Maximum number of results to return
+        profile: "card" (default), "detail" or "admin" (includes participants)
+        cursor: "next_cursor" from the previous page, or empty for the first page
     
     Returns:
         Dictionary containing high-quality verified items
     """
+    return _list_items(high_ai_score_listing(min_score), limit, profile, cursor)
+
+def _list_items(listing: Dict[str, Any], limit: int, profile: str, cursor: str) -> Dict[str, Any]:
     try:
-        db = get_sync_db()
-        collection = db["items"]
-        
-        query_filter = {
-            'aiVerificationScore': {'$gte': min_score}
-        }
-        
-        results = list(collection.find(query_filter).limit(limit))
-        
-        # Convert ObjectId to string
-        for result in results:
-            if '_id' in result:
-                result['_id'] = str(result['_id'])
-        
-        return {
-            "status": "success",
-            "min_ai_score": min_score,
-            "total_results": len(results),
-            "high_quality_items": results
-        }
+        collection = get_sync_db()["items"]
+        results, next_cursor = fetch_page(collection, listing["filter"], projection_for(profile), listing["sort"], limit, cursor)
+        return page_result(listing, results, next_cursor)
         
     except Exception as e:
-        return {
-            "status": "error",
-            "error": str(e),
-            "min_ai_score": min_score
-        }
+        return error_result(e, **listing["context"])
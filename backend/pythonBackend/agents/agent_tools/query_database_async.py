@@ -0,0 +1,170 @@
+# tools/query_database_async.py
+"""
+Async (Motor) versions of the query_database tools.
+
+Same names, arguments and results as the tools in query_database.py, but they
+run on get_async_db() and await their cursors, so an agent running on the
+FastAPI event loop (invoke_async / stream_async) doesn't hold a worker thread
+for every MongoDB round-trip. The synchronous tools remain for scripts and
+agents driven from a plain thread.
+
+Filters, sorts and result dicts come from item_queries.py and the docstrings
+(the tool descriptions the model sees) from the synchronous tools, so the two
+variants only differ in how they await the database.
+"""
+from strands import tool
+from typing import Dict, List, Any, Optional, Tuple
+import asyncio
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+current_dir = Path(__file__).parent
+parent_dir = current_dir.parent.parent
+sys.path.append(str(parent_dir))
+
+from db_connection import get_async_db
+from pagination import clamp_limit, fetch_page_async
+from pymongo.errors import OperationFailure
+from .db_stats import database_stats
+from .item_cache import item_query_cache
+from .item_queries import (
+    cache_args, category_listing, error_result, find_spec, high_ai_score_listing, id_filter, item_profile,
+    item_result, live_listing, page_result, search_context, search_result, ticket_cost_listing
+)
+from .projections import projection_for
+from .query_database import (
+    query_database, get_item_by_id, get_items_by_category, get_database_stats, get_live_auctions,
+    get_auctions_by_ticket_cost, get_high_ai_score_items
+)
+from .query_planner import plan_query
+from .text_search import (
+    build_text_query, forget_text_index, has_text_index_async, is_missing_text_index, order_by_rank, ranked_batches
+)
+
+
+def _doc_from(sync_tool):
+    """Give the async tool the same description as its synchronous twin"""
+    def apply(func):
+        func.__doc__ = sync_tool.__doc__
+        return func
+    return apply
+
+
+async def _build_query(collection, plan: Dict[str, Any]) -> Dict[str, Any]:
+    use_text_index = await has_text_index_async(collection) if plan["text_terms"] else False
+    return build_text_query(collection, plan["text_terms"], plan["filter"], plan["sort"], use_text_index)
+
+
+async def _run_find(collection, query: Dict[str, Any], limit: int, profile: str,
+                    cursor: str = "") -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    mode, query_filter, projection, sort = find_spec(query, limit, profile)
+    if mode == "ranked":
+        limit = clamp_limit(limit)
+        docs = []
+        for batch_filter in ranked_batches(query, limit):
+            docs.extend([doc async for doc in collection.find(batch_filter, projection)])
+            if len(docs) >= limit:
+                break
+        return order_by_rank(docs, query, limit), None
+    if mode == "top":
+        return [doc async for doc in collection.find(query_filter, projection).sort(sort).limit(clamp_limit(limit))], None
+    return await fetch_page_async(collection, query_filter, projection, sort, limit, cursor)
+
+
+async def _list_items(listing: Dict[str, Any], limit: int, profile: str, cursor: str) -> Dict[str, Any]:
+    try:
+        results, next_cursor = await fetch_page_async(
+            get_async_db()["items"], listing["filter"], projection_for(profile), listing["sort"], limit, cursor
+        )
+        return page_result(listing, results, next_cursor)
+
+    except Exception as e:
+        return error_result(e, **listing["context"])
+
+
+@tool(name="query_database")
+@_doc_from(query_database)
+async def query_database_async(query_prompt: str, collection_name: str = "items", limit: int = 50, profile: str = "card", cursor: str = "") -> Dict[str, Any]:
+    try:
+        collection = get_async_db()[collection_name]
+
+        plan = plan_query(query_prompt)
+        query = await _build_query(collection, plan)
+        profile = item_profile(collection_name, profile)
+
+        try:
+            results, next_cursor = await _run_find(collection, query, limit, profile, cursor)
+        except OperationFailure as e:
+            if query["backend"] != "text" or not is_missing_text_index(e):
+                raise
+            # Index was dropped since we last looked; retry with the regex fallback
+            forget_text_index(collection)
+            query = await _build_query(collection, plan)
+            results, next_cursor = await _run_find(collection, query, limit, profile, cursor)
+
+        return search_result(query_prompt, collection_name, query, results, next_cursor)
+
+    except Exception as e:
+        return error_result(e, **search_context(query_prompt, collection_name))
+
+
+@tool(name="get_item_by_id")
+@_doc_from(get_item_by_id)
+async def get_item_by_id_async(item_id: str, collection_name: str = "items", profile: str = "detail") -> Dict[str, Any]:
+    try:
+        collection = get_async_db()[collection_name]
+        item = await collection.find_one(id_filter(item_id), projection_for(item_profile(collection_name, profile)))
+        return item_result(item_id, item)
+
+    except Exception as e:
+        return error_result(e, item_id=item_id)
+
+
+@tool(name="get_items_by_category")
+@_doc_from(get_items_by_category)
+async def get_items_by_category_async(category: str, limit: int = 20, profile: str = "card", cursor: str = "") -> Dict[str, Any]:
+    listing = category_listing(category)
+    return await item_query_cache.get_or_load_async(
+        "get_items_by_category",
+        cache_args(listing, limit, profile, cursor),
+        lambda: _list_items(listing, limit, profile, cursor),
+    )
+
+
+@tool(name="get_database_stats")
+@_doc_from(get_database_stats)
+async def get_database_stats_async() -> Dict[str, Any]:
+    try:
+        # Only an expired snapshot needs a (threaded, concurrent) metadata refresh
+        snapshot = database_stats.cached() or await asyncio.to_thread(database_stats.get)
+        return {
+            "status": "success",
+            **snapshot
+        }
+
+    except Exception as e:
+        return error_result(e)
+
+
+@tool(name="get_live_auctions")
+@_doc_from(get_live_auctions)
+async def get_live_auctions_async(limit: int = 20, profile: str = "card", cursor: str = "") -> Dict[str, Any]:
+    listing = live_listing()
+    return await item_query_cache.get_or_load_async(
+        "get_live_auctions",
+        cache_args(listing, limit, profile, cursor),
+        lambda: _list_items(listing, limit, profile, cursor),
+    )
+
+
+@tool(name="get_auctions_by_ticket_cost")
+@_doc_from(get_auctions_by_ticket_cost)
+async def get_auctions_by_ticket_cost_async(min_tickets: int, max_tickets: int, limit: int = 20, profile: str = "card", cursor: str = "") -> Dict[str, Any]:
+    return await _list_items(ticket_cost_listing(min_tickets, max_tickets), limit, profile, cursor)
+
+
+@tool(name="get_high_ai_score_items")
+@_doc_from(get_high_ai_score_items)
+async def get_high_ai_score_items_async(min_score: float = 8.0, limit: int = 20, profile: str = "card", cursor: str = "") -> Dict[str, Any]:
+    return await _list_items(high_ai_score_listing(min_score), limit, profile, cursor)
@@ -0,0 +1,208 @@
+# tools/query_planner.py
+"""
+Natural-language query planner for query_database.
+
+A single compiled regex walks the prompt once and collects every constraint it
+recognizes (ticket cost range, status, categories, condition, AI score,
+popularity, ordering); whatever is left becomes free-text search terms. Plans
+are cached per normalized prompt, so repeated chat queries skip parsing.
+"""
+import copy
+import os
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+QUERY_PLAN_CACHE_SIZE = int(os.getenv("QUERY_PLAN_CACHE_SIZE", "1024"))
+
+# Phrases only match as whole words (\b on both sides), so "liverpool" or
+# "popularity" stay search terms instead of turning into status/popularity filters
+_TOKEN_RE = re.compile(r"""
+    \b(?:
+      (?P<between>(?:between|from)\s+(?P<between_lo>\d+)\s*(?:and|to|-)\s*(?P<between_hi>\d+)\s*tickets?)
+    | (?P<range>(?P<range_lo>\d+)\s*-\s*(?P<range_hi>\d+)\s*tickets?)
+    | (?P<below>(?:under|below|less\s+than|at\s+most)\s+(?P<below_n>\d+)\s*tickets?)
+    | (?P<above>(?:over|above|more\s+than|at\s+least)\s+(?P<above_n>\d+)\s*tickets?)
+    | (?P<score_cmp>ai\s+(?:verification\s+)?score\s+(?P<score_op>over|above|under|below)\s+(?P<score_n>\d+(?:\.\d+)?))
+    | (?P<score_level>(?P<score_level_word>high|low)\s+ai\s+(?:verification\s+)?scores?)
+    | (?P<sort>cheapest|lowest\s+(?:price|cost)|most\s+expensive|highest\s+(?:price|cost)
+              |newest|latest|most\s+recent|ending\s+soon|most\s+popular|best\s+verified)
+    | (?P<status>not\s+met|goal\s+met|live|active|ended|completed|failed)
+    | (?P<popular>popular|many\s+participants)
+    | (?P<new_auction>new\s+(?:auctions?|listings?))
+    )\b
+    | (?P<word>[a-z0-9][a-z0-9'+]*)
+""", re.VERBOSE)
+
+_STATUS = {
+    "live": "live",
+    "active": "live",
+    "ended": "goal_met",
+    "completed": "goal_met",
+    "goal met": "goal_met",
+    "not met": "not_met",
+    "failed": "not_met",
+}
+
+_SORTS = {
+    "cheapest": ("ticketCost", 1),
+    "lowest price": ("ticketCost", 1),
+    "lowest cost": ("ticketCost", 1),
+    "most expensive": ("ticketCost", -1),
+    "highest price": ("ticketCost", -1),
+    "highest cost": ("ticketCost", -1),
+    "newest": ("createdAt", -1),
+    "latest": ("createdAt", -1),
+    "most recent": ("createdAt", -1),
+    "ending soon": ("endDate", 1),
+    "most popular": ("ticketsSold", -1),
+    "best verified": ("aiVerificationScore", -1),
+}
+
+# Items are tagged from this fixed list (see the analyze_image prompt)
+CATEGORY_TAGS = (
+    "Electronics", "Gaming", "Sports", "Collectibles", "Furniture", "Toys", "Gadgets", "Audio",
+    "Wearables", "Arts & Crafts", "Beauty", "Fragrance", "Other", "Home", "Clothing", "Books",
+)
+_TAGS_BY_NAME = {tag.lower(): tag for tag in CATEGORY_TAGS}
+
+# Prompt words that name a tag. Product nouns ("laptop", "watch") are not tags and
+# stay free-text terms; "home" and "other" are too vague to act as filters.
+CATEGORY_KEYWORDS = {
+    "electronics": "Electronics", "electronic": "Electronics",
+    "gaming": "Gaming",
+    "sports": "Sports", "sport": "Sports",
+    "collectibles": "Collectibles", "collectible": "Collectibles",
+    "furniture": "Furniture",
+    "toys": "Toys", "toy": "Toys",
+    "gadgets": "Gadgets", "gadget": "Gadgets",
+    "audio": "Audio",
+    "wearables": "Wearables", "wearable": "Wearables",
+    "arts": "Arts & Crafts", "crafts": "Arts & Crafts",
+    "beauty": "Beauty",
+    "fragrance": "Fragrance", "fragrances": "Fragrance",
+    "clothing": "Clothing", "clothes": "Clothing",
+    "books": "Books", "book": "Books",
+}
+
+CONDITION_KEYWORDS = frozenset(["new", "used", "refurbished", "damaged", "excellent", "good", "fair", "mint"])
+
+# Filler that would otherwise turn into text search terms
+_STOPWORDS = frozenset("""
+    a an the and or of for to in on at by with without from that this these those is are be
+    me my i we you show find get give list search looking look want need any some all
+    item items auction auctions listing listings product products thing things stuff
+    ticket tickets score ai please can could would there which what first top
+""".split())
+
+
+def category_values(keyword: str) -> List[str]:
+    """
+    Stored values to match for a category: the tag itself when keyword names one
+    of CATEGORY_TAGS ("audio" -> ["Audio"]), else the spellings a free-form tag may
+    be stored under ("laptop", "Laptop", "LAPTOPS", ...). Matching exact values
+    with $in keeps the lookup on the category index instead of a regex scan.
+    """
+    keyword = keyword.strip().lower()
+    tag = _TAGS_BY_NAME.get(keyword) or CATEGORY_KEYWORDS.get(keyword)
+    if tag:
+        return [tag]
+    if keyword.endswith("s"):
+        forms = {keyword}
+    else:
+        forms = {keyword, keyword + ("es" if keyword.endswith(("ch", "sh", "x")) else "s")}
+    return sorted({variant for form in forms for variant in (form, form.capitalize(), form.title(), form.upper())})
+
+
+def _normalize(prompt: str) -> str:
+    return " ".join(prompt.lower().split())
+
+
+@lru_cache(maxsize=QUERY_PLAN_CACHE_SIZE)
+def _compile_plan(prompt: str) -> Dict[str, Any]:
+    bounds: Dict[str, Dict[str, float]] = {}
+    statuses: List[str] = []
+    categories: List[str] = []
+    conditions: List[str] = []
+    terms: List[str] = []
+    sort: Optional[Tuple[str, int]] = None
+    popularity: Optional[Dict[str, int]] = None
+
+    for match in _TOKEN_RE.finditer(prompt):
+        kind = match.lastgroup
+        if kind in ("between", "range"):
+            low, high = sorted((int(match.group(kind + "_lo")), int(match.group(kind + "_hi"))))
+            bounds.setdefault("ticketCost", {}).update({"$gte": low, "$lte": high})
+        elif kind == "below":
+            bounds.setdefault("ticketCost", {})["$lt"] = int(match.group("below_n"))
+        elif kind == "above":
+            bounds.setdefault("ticketCost", {})["$gt"] = int(match.group("above_n"))
+        elif kind == "score_cmp":
+            op = "$gt" if match.group("score_op") in ("over", "above") else "$lt"
+            bounds.setdefault("aiVerificationScore", {})[op] = float(match.group("score_n"))
+        elif kind == "score_level":
+            if match.group("score_level_word") == "high":
+                bounds.setdefault("aiVerificationScore", {})["$gte"] = 8
+            else:
+                bounds.setdefault("aiVerificationScore", {})["$lte"] = 5
+        elif kind == "sort":
+            phrase = " ".join(match.group("sort").split())
+            sort = _SORTS[phrase]
+            if phrase == "most popular":
+                popularity = {"$gt": 10}
+        elif kind == "status":
+            status = _STATUS[" ".join(match.group("status").split())]
+            if status not in statuses:
+                statuses.append(status)
+        elif kind == "popular":
+            popularity = {"$gt": 10}
+        elif kind == "new_auction":
+            popularity = popularity or {"$lt": 5}
+        else:
+            word = match.group("word")
+            tag = CATEGORY_KEYWORDS.get(word)
+            if tag:
+                if tag not in categories:
+                    categories.append(tag)
+            elif word in CONDITION_KEYWORDS:
+                if word not in conditions:
+                    conditions.append(word)
+            elif word not in _STOPWORDS and not word.isdigit() and len(word) > 1:
+                terms.append(word)
+
+    query_filter: Dict[str, Any] = {}
+    if statuses:
+        query_filter["status"] = statuses[0] if len(statuses) == 1 else {"$in": statuses}
+    if categories:
+        query_filter["category"] = {"$in": categories}
+    query_filter.update(bounds)
+    if popularity:
+        query_filter["ticketsSold"] = popularity
+    if conditions:
+        query_filter["condition"] = {"$regex": "|".join(conditions), "$options": "i"}
+
+    return {
+        "filter": query_filter,
+        "sort": [sort] if sort else None,
+        "text_terms": terms,
+    }
+
+
+def plan_query(prompt: str) -> Dict[str, Any]:
+    """
+    Turn a natural-language search into a MongoDB query plan.
+
+    Args:
+        prompt: e.g. "used laptop under 100 tickets with high AI score"
+
+    Returns:
+        Dict with "filter" (structured constraints only), "sort" (list of
+        (field, direction) pairs, or None) and "text_terms" (leftover keywords
+        for free-text search). The result is a private copy and safe to modify.
+    """
+    return copy.deepcopy(_compile_plan(_normalize(prompt)))
+
+
+def plan_cache_stats() -> Dict[str, Any]:
+    info = _compile_plan.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "size": info.currsize, "max_size": info.maxsize}
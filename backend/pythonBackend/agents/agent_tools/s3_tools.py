@@ -1,31 +1,118 @@
-import boto3
-import uuid
-from botocore.exceptions import NoCredentialsError
+import asyncio
+import hashlib
+import mimetypes
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List
+from botocore.exceptions import ClientError, NoCredentialsError
 from dotenv import load_dotenv
 import os
+
+# Add parent directory to path for imports
+current_dir = Path(__file__).parent
+parent_dir = current_dir.parent.parent
+sys.path.append(str(parent_dir))
+
+from aws_clients import get_s3_client, track
 load_dotenv()
 
 AWS_REGION = os.getenv("AWS_DEFAULT_REGION", "us-west-2")
 S3_BUCKET = os.getenv("S3_BUCKET", "").strip()
+S3_UPLOAD_WORKERS = int(os.getenv("S3_UPLOAD_WORKERS", "8"))
 
 if not S3_BUCKET:
     raise Exception("S3_BUCKET environment variable is required")
 
-s3 = boto3.client("s3", region_name=AWS_REGION)
+s3 = get_s3_client()
 
-def upload_to_s3(file, filename: str):
-    """Upload file-like object to S3 and return its URL."""
+# Bounded pool so a large upload batch can't starve the event loop's default executor
+_upload_executor = ThreadPoolExecutor(max_workers=S3_UPLOAD_WORKERS, thread_name_prefix="s3-upload")
+
+def _object_url(key: str) -> str:
+    return f"https://{S3_BUCKET}.s3.{AWS_REGION}.amazonaws.com/{key}"
+
+def content_key(data: bytes, filename: str):
+    """Content-addressed key: identical bytes always map to the same object."""
+    digest = hashlib.sha256(data).hexdigest()
+    ext = os.path.splitext(filename or "")[1].lower()
+    if not re.fullmatch(r"\.[a-z0-9]{1,5}", ext):
+        ext = ""
+    return digest, f"uploads/{digest}{ext}"
+
+def _object_exists(key: str) -> bool:
+    """
+    True only when HEAD confirms the object is there. Any other answer (404, or
+    403 for roles that may PutObject but not GetObject/ListBucket) means
+    "unknown", and the caller uploads as it would without dedup.
+    """
+    try:
+        s3.head_object(Bucket=S3_BUCKET, Key=key)
+        return True
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") not in ("404", "NoSuchKey", "NotFound"):
+            print(f"S3 HEAD failed for {key}, uploading anyway: {e}")
+        return False
+
+def upload_bytes_to_s3(data: bytes, filename: str, content_type: str = None) -> Dict[str, Any]:
+    """
+    Store bytes under their SHA-256 and return where they live.
+    
+    Skips the PUT when an object with the same content already exists, so
+    re-submitted photos and retried requests cost one HEAD instead of an upload.
+    
+    Returns:
+        Dict with "url", "key", "sha256" and "deduplicated" (True if the PUT was skipped)
+    """
     try:
-        # Generate unique key
-        key = f"uploads/{uuid.uuid4()}_{filename}"
+        digest, key = content_key(data, filename)
+        url = _object_url(key)
+        
+        if _object_exists(key):
+            print(f"S3 object already exists, skipping upload: {url}")
+            return {"url": url, "key": key, "sha256": digest, "deduplicated": True}
+        
         print(f"Uploading to S3: bucket={S3_BUCKET}, region={AWS_REGION}, key={key}")
+        content_type = content_type or mimetypes.guess_type(filename or "")[0] or "application/octet-stream"
         
         # Upload without ACL (bucket policy handles public access)
-        s3.upload_fileobj(file, S3_BUCKET, key)
-        url = f"https://{S3_BUCKET}.s3.{AWS_REGION}.amazonaws.com/{key}"
+        with track("s3"):
+            s3.put_object(Bucket=S3_BUCKET, Key=key, Body=data, ContentType=content_type)
         print(f"Upload successful: {url}")
-        return url
+        return {"url": url, "key": key, "sha256": digest, "deduplicated": False}
     except NoCredentialsError:
         raise Exception("AWS credentials not found.")
     except Exception as e:
         raise Exception(f"S3 upload failed: {str(e)}")
+
+def upload_to_s3(file, filename: str):
+    """Upload file-like object to S3 and return its URL."""
+    return upload_bytes_to_s3(file.read(), filename)["url"]
+
+def _upload_outcome(data: bytes, filename: str, content_type: str = None) -> Dict[str, Any]:
+    """Upload one in-memory file and describe the result instead of raising."""
+    try:
+        stored = upload_bytes_to_s3(data, filename, content_type)
+        return {"filename": filename, "content_type": content_type, "status": "uploaded", **stored}
+    except Exception as e:
+        print(f"Failed to upload {filename}: {e}")
+        return {"filename": filename, "content_type": content_type, "status": "failed", "error": str(e)}
+
+async def upload_many_to_s3_async(files: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Upload several files concurrently without blocking the event loop.
+    
+    Args:
+        files: Dicts with "filename", "data" (bytes) and optional "content_type"
+    
+    Returns:
+        One outcome per file, in input order, with status "uploaded" (plus "url",
+        "sha256" and "deduplicated") or "failed" (plus "error").
+    """
+    loop = asyncio.get_running_loop()
+    futures = [
+        loop.run_in_executor(_upload_executor, _upload_outcome, f["data"], f["filename"], f.get("content_type"))
+        for f in files
+    ]
+    return await asyncio.gather(*futures)
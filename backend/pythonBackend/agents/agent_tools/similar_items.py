@@ -0,0 +1,407 @@
+# tools/similar_items.py
+"""
+In-memory similarity index over items, and the find_similar_items tool.
+
+Each listing is embedded locally (no external service) as hashed TF-IDF over
+title, category and description tokens: every token (and word pair) hashes to
+a bucket, and a listing is its L2-normalized sparse vector of bucket weights.
+Scores are exact cosine similarities, computed through inverted posting lists,
+so a query only touches listings that share a token with it.
+
+Postings live in one compact CSR segment built at load time, with IDF taken
+from the same snapshot. Items that change afterwards go to a small delta
+segment weighted with that IDF (their main postings are masked out), and once
+the delta grows past SIMILARITY_REBUILD_AFTER the index is rebuilt in the
+background, which recomputes IDF for everything.
+
+The index loads in a background thread at startup and then follows the items
+change feed. A feed reset (missed changes) triggers a full reload.
+"""
+import os
+import re
+import sys
+import threading
+import time
+import zlib
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from strands import tool
+
+# Add parent directory to path for imports
+current_dir = Path(__file__).parent
+parent_dir = current_dir.parent.parent
+sys.path.append(str(parent_dir))
+
+from db_connection import get_sync_db
+from .item_changes import item_changes
+
+SIMILARITY_BUCKETS = 1 << int(os.getenv("SIMILARITY_BUCKET_BITS", "18"))
+SIMILARITY_REBUILD_AFTER = int(os.getenv("SIMILARITY_REBUILD_AFTER", "2000"))
+# Listings below this cosine similarity are not reported as similar
+SIMILARITY_MIN_SCORE = float(os.getenv("SIMILARITY_MIN_SCORE", "0.05"))
+FIELD_WEIGHTS = {"title": 3.0, "category": 2.0, "description": 1.0}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_PROJECTION = {
+    "title": 1, "description": 1, "category": 1, "condition": 1, "status": 1,
+    "ticketCost": 1, "ticketGoal": 1, "ticketsSold": 1,
+}
+# Everything a rebuild replaces
+_STATE = (
+    "_keys", "_rows", "_meta", "_terms", "_alive", "_in_main", "_is_live_status", "_doc_freq", "_idf",
+    "_offsets", "_post_rows", "_post_weights", "_delta", "_delta_rows",
+)
+
+Terms = Tuple[np.ndarray, np.ndarray]
+
+
+def _tokens(text: str) -> List[str]:
+    words = [w[:-1] if len(w) > 3 and w.endswith("s") else w for w in _TOKEN_RE.findall(text.lower())]
+    return words + [f"{a}_{b}" for a, b in zip(words, words[1:])]
+
+
+def _bucket(token: str) -> int:
+    return zlib.crc32(token.encode()) & (SIMILARITY_BUCKETS - 1)
+
+
+def _as_terms(counts: Counter) -> Terms:
+    buckets = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+    tf = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+    return buckets, tf
+
+
+def _item_terms(doc: Dict[str, Any]) -> Terms:
+    """Weighted bucket counts for one item's text fields, as (buckets, tf) arrays."""
+    counts: Counter = Counter()
+    category = doc.get("category") or []
+    fields = {
+        "title": doc.get("title") or "",
+        "category": " ".join(category) if isinstance(category, list) else str(category),
+        "description": doc.get("description") or "",
+    }
+    for field, text in fields.items():
+        for token in _tokens(text):
+            counts[_bucket(token)] += FIELD_WEIGHTS[field]
+    return _as_terms(counts)
+
+
+def _economics(doc: Dict[str, Any]) -> Dict[str, Any]:
+    goal = doc.get("ticketGoal") or 0
+    sold = doc.get("ticketsSold") or 0
+    category = doc.get("category") or []
+    return {
+        "item_id": str(doc["_id"]),
+        "title": doc.get("title"),
+        "category": category if isinstance(category, list) else [category],
+        "condition": doc.get("condition"),
+        "status": doc.get("status"),
+        "ticketCost": doc.get("ticketCost"),
+        "ticketGoal": goal,
+        "ticketsSold": sold,
+        "sell_through": round(sold / goal, 3) if goal else None,
+    }
+
+
+class SimilarityIndex:
+    def __init__(self, buckets: int = SIMILARITY_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.RLock()
+        self.ready = False
+        self._loading = False
+        # Changes seen while a reload is reading the collection, replayed after the swap
+        self._pending: Dict[str, Optional[Dict[str, Any]]] = {}
+        self._stats = {"loads": 0, "upserts": 0, "removals": 0, "queries": 0, "query_ms_total": 0.0}
+        self._clear()
+
+    def _clear(self):
+        # Documents: row -> item id, metadata and raw bucket counts
+        self._keys: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._meta: List[Optional[Dict[str, Any]]] = []
+        self._terms: List[Optional[Terms]] = []
+        self._alive = np.zeros(1024, dtype=bool)
+        self._in_main = np.zeros(1024, dtype=bool)
+        self._is_live_status = np.zeros(1024, dtype=bool)
+        # Current document frequencies, and the IDF snapshot every vector is weighted with
+        self._doc_freq = np.zeros(self.buckets, dtype=np.int32)
+        self._idf = np.ones(self.buckets, dtype=np.float32)
+        # Main segment: bucket -> (row, weight) pairs at postings[offsets[b]:offsets[b + 1]]
+        self._offsets = np.zeros(self.buckets + 1, dtype=np.int64)
+        self._post_rows = np.zeros(0, dtype=np.int32)
+        self._post_weights = np.zeros(0, dtype=np.float32)
+        # Delta segment: bucket -> {row: weight} for rows changed since the build
+        self._delta: Dict[int, Dict[int, float]] = {}
+        self._delta_rows = set()
+
+    # ---- embedding -------------------------------------------------------
+
+    def _weights(self, terms: Terms) -> np.ndarray:
+        """Unit-length TF-IDF weights for a (buckets, tf) pair."""
+        buckets, tf = terms
+        weights = np.log1p(tf) * self._idf[buckets]
+        norm = float(np.linalg.norm(weights))
+        return weights / norm if norm else weights
+
+    # ---- maintenance -----------------------------------------------------
+
+    def _grow(self, rows: int):
+        capacity = self._alive.shape[0]
+        if rows <= capacity:
+            return
+        while capacity < rows:
+            capacity *= 2
+        for name in ("_alive", "_in_main", "_is_live_status"):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[: old.shape[0]] = old
+            setattr(self, name, new)
+
+    def _drop_row(self, row: int):
+        terms = self._terms[row]
+        if terms is None:
+            return
+        buckets = terms[0]
+        np.subtract.at(self._doc_freq, buckets, 1)
+        if row in self._delta_rows:
+            for bucket in buckets.tolist():
+                postings = self._delta.get(bucket)
+                if postings is not None:
+                    postings.pop(row, None)
+                    if not postings:
+                        del self._delta[bucket]
+            self._delta_rows.discard(row)
+        self._alive[row] = False
+        self._in_main[row] = False
+        self._is_live_status[row] = False
+        self._meta[row] = None
+        self._terms[row] = None
+
+    def _add(self, doc: Dict[str, Any]):
+        """Put one item in the delta segment (replacing any earlier version of it)."""
+        item_id = str(doc["_id"])
+        terms = _item_terms(doc)
+        row = self._rows.get(item_id)
+        if row is None:
+            row = len(self._keys)
+            self._grow(row + 1)
+            self._keys.append(item_id)
+            self._meta.append(None)
+            self._terms.append(None)
+            self._rows[item_id] = row
+        else:
+            self._drop_row(row)
+
+        np.add.at(self._doc_freq, terms[0], 1)
+        for bucket, weight in zip(terms[0].tolist(), self._weights(terms).tolist()):
+            self._delta.setdefault(bucket, {})[row] = weight
+        self._delta_rows.add(row)
+        self._terms[row] = terms
+        self._alive[row] = True
+        self._is_live_status[row] = doc.get("status") == "live"
+        self._meta[row] = _economics(doc)
+
+    def _build(self, docs: List[Dict[str, Any]]):
+        """Fresh main segment for docs, with IDF recomputed from them."""
+        self._clear()
+        self._grow(len(docs))
+        for row, doc in enumerate(docs):
+            item_id = str(doc["_id"])
+            self._keys.append(item_id)
+            self._rows[item_id] = row
+            self._terms.append(_item_terms(doc))
+            self._meta.append(_economics(doc))
+            self._is_live_status[row] = doc.get("status") == "live"
+        self._alive[: len(docs)] = True
+        self._in_main[: len(docs)] = True
+        if not docs:
+            return
+
+        buckets = np.concatenate([terms[0] for terms in self._terms])
+        rows = np.repeat(np.arange(len(docs), dtype=np.int32), [len(terms[0]) for terms in self._terms])
+        self._doc_freq = np.bincount(buckets, minlength=self.buckets).astype(np.int32)
+        self._idf = (np.log((len(docs) + 1) / (self._doc_freq + 1)) + 1.0).astype(np.float32)
+        weights = np.concatenate([self._weights(terms) for terms in self._terms]).astype(np.float32)
+
+        order = np.argsort(buckets, kind="stable")
+        self._post_rows = rows[order]
+        self._post_weights = weights[order]
+        np.cumsum(self._doc_freq, out=self._offsets[1:])
+
+    def upsert(self, doc: Dict[str, Any]):
+        with self._lock:
+            if self._loading:
+                self._pending[str(doc["_id"])] = doc
+            self._add(doc)
+            self._stats["upserts"] += 1
+            rebuild = len(self._delta_rows) > SIMILARITY_REBUILD_AFTER and not self._loading
+        if rebuild:
+            threading.Thread(target=self.load, name="similarity-rebuild", daemon=True).start()
+
+    def remove(self, item_id: str):
+        with self._lock:
+            if self._loading:
+                self._pending[item_id] = None
+            row = self._rows.pop(item_id, None)
+            if row is None:
+                return
+            self._drop_row(row)
+            self._stats["removals"] += 1
+
+    def load(self):
+        """(Re)build the index from the items collection."""
+        with self._lock:
+            if self._loading:
+                return
+            self._loading = True
+            self._pending = {}
+        try:
+            fresh = SimilarityIndex(self.buckets)
+            docs = list(get_sync_db()["items"].find({}, _PROJECTION))
+            fresh._build(docs)
+            with self._lock:
+                for name in _STATE:
+                    setattr(self, name, getattr(fresh, name))
+                self._loading = False
+                for item_id, doc in self._pending.items():
+                    if doc is None:
+                        self.remove(item_id)
+                    else:
+                        self.upsert(doc)
+                self._pending = {}
+                self.ready = True
+                self._stats["loads"] += 1
+            print(f"✅ Similarity index loaded ({len(docs)} items)")
+        except Exception as e:
+            print(f"❌ Similarity index load failed: {e}")
+        finally:
+            with self._lock:
+                self._loading = False
+
+    def on_change(self, change: Dict[str, Any]):
+        operation = change.get("operationType")
+        if operation in ("insert", "update", "replace"):
+            doc = change.get("fullDocument")
+            if doc is not None:
+                self.upsert(doc)
+        elif operation == "delete":
+            self.remove(str(change["documentKey"]["_id"]))
+        else:
+            # reset / drop / invalidate: changes may have been missed
+            threading.Thread(target=self.load, name="similarity-reload", daemon=True).start()
+
+    def start(self):
+        item_changes.subscribe(self.on_change)
+        threading.Thread(target=self.load, name="similarity-load", daemon=True).start()
+
+    # ---- queries ---------------------------------------------------------
+
+    def _scores(self, buckets: np.ndarray, weights: np.ndarray, count: int) -> np.ndarray:
+        """Cosine similarity of every row with a unit query vector."""
+        scores = np.zeros(count, dtype=np.float32)
+        for bucket, weight in zip(buckets.tolist(), weights.tolist()):
+            start, end = self._offsets[bucket], self._offsets[bucket + 1]
+            if start != end:
+                # A row appears at most once per bucket, so plain fancy indexing is safe
+                scores[self._post_rows[start:end]] += weight * self._post_weights[start:end]
+        # Changed and removed rows only count through the delta segment
+        scores *= self._in_main[:count]
+        for bucket, weight in zip(buckets.tolist(), weights.tolist()):
+            postings = self._delta.get(bucket)
+            if postings:
+                rows = np.fromiter(postings.keys(), dtype=np.int64, count=len(postings))
+                values = np.fromiter(postings.values(), dtype=np.float32, count=len(postings))
+                scores[rows] += weight * values
+        return scores
+
+    def similar(self, text: str = "", item_id: str = "", k: int = 10, live_only: bool = False) -> List[Dict[str, Any]]:
+        """
+        Top-k listings most similar to a text or to an indexed item.
+
+        Raises:
+            KeyError: item_id is not in the index
+        """
+        started = time.perf_counter()
+        with self._lock:
+            count = len(self._keys)
+            if item_id:
+                exclude = self._rows[item_id]
+                buckets, tf = self._terms[exclude]
+            else:
+                exclude = None
+                buckets, tf = _as_terms(Counter(_bucket(t) for t in _tokens(text)))
+            # Tokens no listing contains say nothing about similarity
+            known = self._doc_freq[buckets] > 0
+            if count == 0 or not known.any():
+                return []
+            # Unknown tokens still count towards the query's norm; they just match nothing
+            weights = self._weights((buckets, tf))
+            scores = self._scores(buckets[known], weights[known], count)
+            if live_only:
+                scores[~self._is_live_status[:count]] = 0
+            if exclude is not None:
+                scores[exclude] = 0
+
+            k = max(1, k)
+            hits = np.flatnonzero(scores >= max(SIMILARITY_MIN_SCORE, 1e-6))
+            if len(hits) > k:
+                hits = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+            hits = hits[np.argsort(-scores[hits], kind="stable")]
+            results = [{**self._meta[row], "similarity": round(float(scores[row]), 4)} for row in hits]
+            self._stats["queries"] += 1
+            self._stats["query_ms_total"] += (time.perf_counter() - started) * 1000
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            queries = self._stats["queries"]
+            return {
+                "ready": self.ready,
+                "items": len(self._rows),
+                "postings": int(self._post_rows.shape[0]),
+                "delta_items": len(self._delta_rows),
+                "postings_mb": round((self._post_rows.nbytes + self._post_weights.nbytes + self._offsets.nbytes) / 1e6, 1),
+                "avg_query_ms": round(self._stats["query_ms_total"] / queries, 3) if queries else 0,
+                **{key: value for key, value in self._stats.items() if key != "query_ms_total"},
+            }
+
+
+similarity_index = SimilarityIndex()
+
+
+@tool
+def find_similar_items(query: str = "", item_id: str = "", k: int = 10, live_only: bool = False) -> Dict[str, Any]:
+    """
+    Find listings similar to a description or to an existing item, from a local
+    similarity index over item titles, categories and descriptions.
+
+    Use this to compare an item with comparable listings (e.g. for pricing or
+    authenticity checks) instead of keyword searches.
+
+    Args:
+        query: Free-text description, e.g. "apple macbook pro 2021 laptop"
+        item_id: Use this item's listing as the query instead (excluded from results)
+        k: Number of similar listings to return (default: 10)
+        live_only: Only return currently live auctions
+
+    Returns:
+        Dictionary with the top-k similar listings and their ticket economics
+        (ticketCost, ticketGoal, ticketsSold, sell_through, status)
+    """
+    if not query and not item_id:
+        return {"status": "error", "error": "Provide a query or an item_id"}
+    if not similarity_index.ready:
+        return {"status": "error", "error": "Similarity index is still loading, try again shortly"}
+    try:
+        results = similarity_index.similar(query, item_id, k, live_only)
+    except KeyError:
+        return {"status": "error", "error": f"Item {item_id} is not in the similarity index", "item_id": item_id}
+    return {
+        "status": "success",
+        "query": query or None,
+        "item_id": item_id or None,
+        "total_results": len(results),
+        "similar_items": results
+    }
@@ -0,0 +1,116 @@
+import time
+
+import pytest
+
+import agents.agent_tools.bm25_index as bm25
+from agents.agent_tools.bm25_index import BM25Index
+
+DOCS = [
+    {"_id": 1, "title": "Gaming laptop", "category": ["Electronics"], "description": "Fast laptop with RGB keyboard"},
+    {"_id": 2, "title": "Leather jacket", "category": ["Clothing"], "description": "Barely worn"},
+    {"_id": 3, "title": "Office chair", "category": ["Furniture"], "description": "Ergonomic, pairs with a laptop stand"},
+    {"_id": 4, "title": "Wireless headphones", "category": ["Audio", "Electronics"], "description": "Noise cancelling"},
+    {"_id": 5, "title": "Vintage camera", "category": ["Collectibles"], "description": "Film camera in working order"},
+]
+
+
+class FakeCollection:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, query, projection=None):
+        return iter(list(self.docs))
+
+
+def _built(docs):
+    index = BM25Index()
+    for doc in docs:
+        index._add(doc["_id"], doc)
+    index._compact()
+    index.ready = True
+    return index
+
+
+def _ranking(index, *terms):
+    return [(key, round(score, 4)) for key, score in index.search(list(terms))]
+
+
+def test_title_hits_outrank_description_hits():
+    index = _built(DOCS)
+    assert [key for key, _ in index.search(["laptop"])] == [1, 3]
+
+
+def test_update_moves_item_to_its_new_terms():
+    index = _built(DOCS)
+    index.upsert({"_id": 2, "title": "Retro camera bag", "category": ["Clothing"], "description": ""})
+
+    assert [key for key, _ in index.search(["jacket"])] == []
+    assert 2 in [key for key, _ in index.search(["camera"])]
+    assert index.stats()["delta_items"] == 1
+    assert index.stats()["items"] == len(DOCS)
+
+
+def test_remove_drops_item_and_its_terms():
+    index = _built(DOCS)
+    index.remove(5)
+
+    assert index.search(["camera"]) == []
+    assert "camera" not in index._df
+    assert index.stats()["items"] == len(DOCS) - 1
+    # Removing an unknown or already removed item is a no-op
+    index.remove(5)
+    index.remove(99)
+    assert index.stats()["items"] == len(DOCS) - 1
+
+
+def test_new_items_match_by_prefix_and_typo_before_a_merge():
+    index = _built(DOCS)
+    index.upsert({"_id": 6, "title": "Mechanical keyboard", "category": ["Electronics"], "description": ""})
+
+    assert [key for key, _ in index.search(["mechan"])] == [6]
+    assert [key for key, _ in index.search(["mechanicla"])] == [6]
+
+
+def test_merge_gives_the_same_ranking_as_incremental_updates():
+    index = _built(DOCS)
+    index.upsert({"_id": 6, "title": "Laptop sleeve", "category": ["Electronics"], "description": "Fits a 15 inch laptop"})
+    index.upsert({"_id": 1, "title": "Gaming laptop", "category": ["Electronics", "Gaming"], "description": "Refurbished"})
+    index.remove(3)
+    incremental = _ranking(index, "laptop", "electronics")
+
+    index._compact()
+
+    assert _ranking(index, "laptop", "electronics") == incremental
+    assert index.stats()["delta_items"] == 0
+    # And matches an index built from scratch on the final documents
+    final = [doc for doc in DOCS if doc["_id"] not in (1, 3)] + [
+        {"_id": 6, "title": "Laptop sleeve", "category": ["Electronics"], "description": "Fits a 15 inch laptop"},
+        {"_id": 1, "title": "Gaming laptop", "category": ["Electronics", "Gaming"], "description": "Refurbished"},
+    ]
+    assert sorted(_ranking(_built(final), "laptop", "electronics")) == sorted(incremental)
+
+
+def test_delta_past_threshold_triggers_background_rebuild(monkeypatch):
+    docs = list(DOCS)
+    monkeypatch.setattr(bm25, "get_sync_db", lambda: {"items": FakeCollection(docs)})
+    monkeypatch.setattr(bm25, "BM25_MERGE_THRESHOLD", 2)
+    index = BM25Index()
+    index.load()
+    assert index.ready and index.stats()["builds"] == 1
+
+    for key in (6, 7, 8):
+        doc = {"_id": key, "title": f"Camera lens {key}", "category": ["Electronics"], "description": ""}
+        docs.append(doc)
+        index.upsert(doc)
+
+    deadline = time.monotonic() + 5
+    while index.stats()["builds"] < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert index.stats()["builds"] == 2
+    assert index.stats()["delta_items"] == 0
+    assert sorted(key for key, _ in index.search(["camera"])) == [5, 6, 7, 8]
+
+
+@pytest.mark.parametrize("terms", [[], ["nothingmatches"]])
+def test_search_without_hits_is_empty(terms):
+    assert _built(DOCS).search(terms) == []
@@ -0,0 +1,129 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import agents.agent_tools.item_cache as item_cache
+from agents.agent_tools.item_cache import ItemQueryCache
+from agents.agent_tools.item_changes import item_changes
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(item_cache, "time", SimpleNamespace(monotonic=lambda: now.value))
+    return now
+
+
+def _loader(results):
+    calls = []
+
+    def load():
+        calls.append(1)
+        return {"status": "success", "items": list(results), "call": len(calls)}
+    return load, calls
+
+
+def test_repeated_lookup_is_served_from_cache(clock):
+    cache = ItemQueryCache()
+    load, calls = _loader([1, 2])
+
+    first = cache.get_or_load("get_live_auctions", {"limit": 20}, load)
+    first["items"].append("mutated by caller")
+    second = cache.get_or_load("get_live_auctions", {"limit": 20}, load)
+
+    assert len(calls) == 1
+    assert second["items"] == [1, 2]
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_entries_expire_after_ttl_depending_on_change_feed(clock, monkeypatch):
+    cache = ItemQueryCache()
+    load, calls = _loader([])
+
+    monkeypatch.setattr(item_changes, "available", True)
+    cache.get_or_load("get_live_auctions", {}, load)
+    clock.value += item_cache.ITEM_CACHE_TTL - 1
+    cache.get_or_load("get_live_auctions", {}, load)
+    assert len(calls) == 1
+    clock.value += 2
+    cache.get_or_load("get_live_auctions", {}, load)
+    assert len(calls) == 2
+
+    # Without a change feed nothing invalidates entries, so they live much shorter
+    monkeypatch.setattr(item_changes, "available", False)
+    assert cache.stats()["ttl_seconds"] == item_cache.ITEM_CACHE_FALLBACK_TTL
+    cache.get_or_load("get_items_by_category", {"category": "audio"}, load)
+    clock.value += item_cache.ITEM_CACHE_FALLBACK_TTL + 1
+    cache.get_or_load("get_items_by_category", {"category": "audio"}, load)
+    assert len(calls) == 4
+
+
+def test_invalidate_clears_entries(clock):
+    cache = ItemQueryCache()
+    load, calls = _loader([])
+
+    cache.get_or_load("get_live_auctions", {}, load)
+    cache.invalidate({"operationType": "update"})
+    cache.get_or_load("get_live_auctions", {}, load)
+
+    assert len(calls) == 2
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_result_loaded_across_an_invalidation_is_not_stored(clock):
+    cache = ItemQueryCache()
+    calls = []
+
+    def load():
+        calls.append(1)
+        if len(calls) == 1:
+            # An item changes while the query is running: this result may be stale
+            cache.invalidate()
+        return {"status": "success", "items": []}
+
+    cache.get_or_load("get_live_auctions", {}, load)
+    cache.get_or_load("get_live_auctions", {}, load)
+    cache.get_or_load("get_live_auctions", {}, load)
+
+    assert len(calls) == 2
+    assert cache.stats()["stale_skipped"] == 1
+
+
+def test_errors_are_not_cached(clock):
+    cache = ItemQueryCache()
+    calls = []
+
+    def load():
+        calls.append(1)
+        return {"status": "error", "error": "boom"}
+
+    cache.get_or_load("get_live_auctions", {}, load)
+    cache.get_or_load("get_live_auctions", {}, load)
+    assert len(calls) == 2
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = ItemQueryCache(max_entries=2)
+    load, calls = _loader([])
+
+    for category in ("audio", "books", "audio", "toys", "audio", "books"):
+        cache.get_or_load("get_items_by_category", {"category": category}, load)
+
+    # audio stays hot; books was evicted by toys and loaded again
+    assert len(calls) == 4
+    assert cache.stats()["entries"] == 2
+
+
+def test_async_loader_shares_entries_with_sync_tools(clock):
+    cache = ItemQueryCache()
+    load, calls = _loader([1])
+
+    async def async_load():
+        return load()
+
+    cache.get_or_load("get_live_auctions", {"limit": 20}, load)
+    result = asyncio.run(cache.get_or_load_async("get_live_auctions", {"limit": 20}, async_load))
+
+    assert len(calls) == 1
+    assert result["items"] == [1]
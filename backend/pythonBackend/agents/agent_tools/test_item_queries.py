@@ -0,0 +1,109 @@
+import asyncio
+import sys
+
+from bson import ObjectId
+
+import agents.agent_tools  # noqa: F401  (registers the tool modules)
+import agents.agent_tools.text_search as text_search
+from agents.agent_tools.item_queries import category_listing, error_result, id_filter, page_result, ticket_cost_listing
+
+sync_tools = sys.modules["agents.agent_tools.query_database"]
+async_tools = sys.modules["agents.agent_tools.query_database_async"]
+
+TOOL_NAMES = [
+    "query_database", "get_item_by_id", "get_items_by_category", "get_database_stats",
+    "get_live_auctions", "get_auctions_by_ticket_cost", "get_high_ai_score_items",
+]
+
+
+def test_async_tools_describe_themselves_like_the_sync_ones():
+    for name in TOOL_NAMES:
+        sync_tool = getattr(sync_tools, name)
+        async_tool = getattr(async_tools, f"{name}_async")
+        assert async_tool.tool_name == sync_tool.tool_name == name
+        assert async_tool.tool_spec["description"] == sync_tool.tool_spec["description"]
+        assert async_tool.tool_spec["inputSchema"] == sync_tool.tool_spec["inputSchema"]
+
+
+def test_id_filter_uses_object_id_only_for_valid_ids():
+    oid = ObjectId()
+    assert id_filter(str(oid)) == {"_id": oid}
+    assert id_filter("item-42") == {"id": "item-42"}
+
+
+def test_page_result_echoes_listing_context():
+    listing = ticket_cost_listing(50, 200)
+    assert page_result(listing, [{"_id": ObjectId("5f1d7f3e9c8b4a2d1e0f1a2b")}], "abc") == {
+        "status": "success",
+        "ticket_range": "50-200",
+        "total_results": 1,
+        "items": [{"_id": "5f1d7f3e9c8b4a2d1e0f1a2b"}],
+        "next_cursor": "abc",
+    }
+    assert error_result(ValueError("boom"), **listing["context"]) == {
+        "status": "error", "error": "boom", "ticket_range": "50-200",
+    }
+
+
+def test_category_cache_key_ignores_case_and_spacing():
+    assert category_listing(" Electronics ")["cache_key"] == category_listing("electronics")["cache_key"]
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def __iter__(self):
+        return iter(self.docs)
+
+    def __aiter__(self):
+        async def docs():
+            for doc in self.docs:
+                yield doc
+        return docs()
+
+
+class FakeItems:
+    def __init__(self, docs):
+        self.docs = docs
+        self.fetched = []
+
+    def find(self, query, projection=None):
+        ids = set(query["_id"]["$in"])
+        self.fetched.append(len(ids))
+        return FakeCursor([doc for doc in self.docs if doc["_id"] in ids and doc["status"] == query["status"]])
+
+
+def _ranked_query(count, live_every):
+    docs = [{"_id": key, "status": "live" if key % live_every == 0 else "ended"} for key in range(count)]
+    ranking = [(key, float(count - key)) for key in range(count)]
+    return docs, {"filter": {"status": "live"}, "projection": None, "sort": None, "backend": "bm25", "ranking": ranking}
+
+
+def test_ranked_search_keeps_fetching_until_the_filter_fills_the_page(monkeypatch):
+    monkeypatch.setattr(text_search, "BM25_CANDIDATES", 10)
+    # Only every 7th hit is live, so the first slice of hits can't fill a page of 5
+    docs, query = _ranked_query(100, 7)
+    expected = [0, 7, 14, 21, 28]
+
+    collection = FakeItems(docs)
+    results, next_cursor = sync_tools._run_find(collection, query, 5, "card")
+    assert [doc["_id"] for doc in results] == expected
+    assert next_cursor is None
+    # Each round trip asks for one slice of ids; it stops once the page is full
+    assert collection.fetched == [10, 10, 10]
+
+    collection = FakeItems(docs)
+    results, _ = asyncio.run(async_tools._run_find(collection, query, 5, "card"))
+    assert [doc["_id"] for doc in results] == expected
+    assert collection.fetched == [10, 10, 10]
+
+
+def test_ranked_search_returns_every_match_when_there_are_fewer_than_limit(monkeypatch):
+    monkeypatch.setattr(text_search, "BM25_CANDIDATES", 10)
+    docs, query = _ranked_query(25, 7)
+    collection = FakeItems(docs)
+
+    results, _ = sync_tools._run_find(collection, query, 5, "card")
+    assert [doc["_id"] for doc in results] == [0, 7, 14, 21]
+    assert collection.fetched == [10, 10, 5]
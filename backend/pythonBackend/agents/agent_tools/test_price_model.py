@@ -0,0 +1,60 @@
+import sys
+
+import pytest
+
+import agents.agent_tools  # noqa: F401  (registers the tool modules)
+from agents.agent_tools.price_model import _PIPELINE, PRICE_MODEL_MIN_SAMPLES, PriceModel
+
+price_tool = sys.modules["agents.agent_tools.price_tool"]
+
+
+def _model(rows):
+    model = PriceModel()
+    model._rows = lambda: iter(rows)
+    model.refresh()
+    return model
+
+
+def _row(category, condition, goal, cost=5, sold=50):
+    return {"category": category, "condition": condition, "ticketGoal": goal, "ticketCost": cost, "ticketsSold": sold}
+
+
+def test_empty_collection_builds_an_empty_model():
+    model = _model([])
+    assert model.ready
+    assert model.stats()["groups"] == 0
+    assert model.estimate("Electronics", "used") is None
+
+
+def test_only_finished_listings_are_aggregated():
+    # Live listings haven't sold their tickets yet; cancelled ones never will
+    assert _PIPELINE[0]["$match"]["status"] == {"$in": ["goal_met", "not_met"]}
+
+
+def test_recommend_price_falls_back_when_there_are_no_listings(monkeypatch):
+    monkeypatch.setattr(price_tool, "price_model", _model([]))
+    result = price_tool.recommend_price("MacBook Pro laptop", "Used")
+    assert result["status"] == "success"
+    assert result["fallback"] is True
+    assert result["recommended_ticket_goal"] == price_tool.FALLBACK_TICKET_GOAL * 0.7
+
+
+def test_recommend_price_errors_before_the_first_build(monkeypatch):
+    monkeypatch.setattr(price_tool, "price_model", PriceModel())
+    assert price_tool.recommend_price("MacBook Pro laptop", "used")["status"] == "error"
+
+
+def test_sparse_groups_fall_back_to_broader_ones():
+    rows = [_row("electronics", "used", 100 + i) for i in range(PRICE_MODEL_MIN_SAMPLES)]
+    rows += [_row("electronics", "new", 1000)]
+    rows += [_row("books", "new", 10 + i) for i in range(PRICE_MODEL_MIN_SAMPLES)]
+    model = _model(rows)
+
+    assert model.estimate("Electronics", "used")["basis"] == {"category": "electronics", "condition": "used"}
+    # One "new" electronics listing isn't enough; the whole category is used instead
+    estimate = model.estimate("electronics", "new")
+    assert estimate["basis"] == {"category": "electronics", "condition": None}
+    assert estimate["sample_size"] == PRICE_MODEL_MIN_SAMPLES + 1
+    assert model.estimate("toys", "new")["basis"] == {"category": None, "condition": "new"}
+    assert model.estimate("toys", "broken")["basis"] == {"category": None, "condition": None}
+    assert model.estimate("books", "new")["ticketGoal"]["p50"] == pytest.approx(12)
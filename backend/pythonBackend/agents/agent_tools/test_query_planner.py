@@ -0,0 +1,88 @@
+from agents.agent_tools.query_planner import category_values, plan_cache_stats, plan_query
+
+
+def test_keeps_every_constraint_of_the_request_example():
+    plan = plan_query("used laptop under 100 tickets with high AI score")
+    assert plan["filter"] == {
+        "ticketCost": {"$lt": 100},
+        "aiVerificationScore": {"$gte": 8},
+        "condition": {"$regex": "used", "$options": "i"},
+    }
+    assert plan["text_terms"] == ["laptop"]
+    assert plan["sort"] is None
+
+
+def test_product_nouns_stay_text_terms():
+    # Categories only hold the fixed tag list, so "laptop" must not become a category filter
+    plan = plan_query("laptop under 100 tickets")
+    assert "category" not in plan["filter"]
+    assert plan["filter"] == {"ticketCost": {"$lt": 100}}
+    assert plan["text_terms"] == ["laptop"]
+
+    plan = plan_query("iPhone under 100 tickets")
+    assert plan["text_terms"] == ["iphone"]
+
+
+def test_tag_keywords_become_category_filter():
+    plan = plan_query("live electronics auctions")
+    assert plan["filter"] == {"status": "live", "category": {"$in": ["Electronics"]}}
+    assert plan["text_terms"] == []
+
+    plan = plan_query("audio or gaming headphones")
+    assert plan["filter"]["category"] == {"$in": ["Audio", "Gaming"]}
+    assert plan["text_terms"] == ["headphones"]
+
+
+def test_ranges_statuses_and_sorts():
+    plan = plan_query("cheapest camera between 50 and 200 tickets, goal met or not met")
+    assert plan["filter"]["ticketCost"] == {"$gte": 50, "$lte": 200}
+    assert plan["filter"]["status"] == {"$in": ["goal_met", "not_met"]}
+    assert plan["sort"] == [("ticketCost", 1)]
+    assert plan["text_terms"] == ["camera"]
+
+    plan = plan_query("most popular items ai score over 7.5")
+    assert plan["filter"] == {"aiVerificationScore": {"$gt": 7.5}, "ticketsSold": {"$gt": 10}}
+    assert plan["sort"] == [("ticketsSold", -1)]
+
+
+def test_plans_are_cached_and_private_copies():
+    prompt = "vintage watch over 20 tickets"
+    first = plan_query(prompt)
+    hits = plan_cache_stats()["hits"]
+    first["filter"]["ticketCost"]["$gt"] = 0
+    first["text_terms"].append("mutated")
+
+    second = plan_query("  Vintage   WATCH over 20 tickets ")
+    assert plan_cache_stats()["hits"] == hits + 1
+    assert second["filter"] == {"ticketCost": {"$gt": 20}}
+    assert second["text_terms"] == ["vintage", "watch"]
+
+
+def test_category_values():
+    assert category_values("Audio") == ["Audio"]
+    assert category_values("arts & crafts") == ["Arts & Crafts"]
+    assert category_values("books") == ["Books"]
+    assert "Laptop" in category_values("laptop") and "laptops" in category_values("laptop")
+
+
+def test_keywords_inside_other_words_stay_text_terms():
+    plan = plan_query("liverpool jersey")
+    assert plan["filter"] == {}
+    assert plan["text_terms"] == ["liverpool", "jersey"]
+
+    plan = plan_query("activewear leggings")
+    assert plan["filter"] == {}
+    assert plan["text_terms"] == ["activewear", "leggings"]
+
+    plan = plan_query("popularity contest trophy")
+    assert plan["filter"] == {}
+    assert plan["text_terms"] == ["popularity", "contest", "trophy"]
+
+    plan = plan_query("unfailed newestate cheapestly")
+    assert plan["filter"] == {} and plan["sort"] is None
+
+
+def test_most_popular_sorts_and_filters_by_tickets_sold():
+    plan = plan_query("most popular gaming auctions")
+    assert plan["sort"] == [("ticketsSold", -1)]
+    assert plan["filter"] == {"category": {"$in": ["Gaming"]}, "ticketsSold": {"$gt": 10}}
@@ -0,0 +1,101 @@
+import time
+
+import numpy as np
+import pytest
+
+import agents.agent_tools.similar_items as similar_items
+from agents.agent_tools.similar_items import SimilarityIndex
+
+DOCS = [
+    {"_id": 1, "title": "Wireless gaming headset", "category": ["Audio"], "description": "Surround sound", "status": "live"},
+    {"_id": 2, "title": "Wireless earbuds", "category": ["Audio"], "description": "Noise cancelling", "status": "ended"},
+    {"_id": 3, "title": "Oak dining table", "category": ["Furniture"], "description": "Seats six", "status": "live"},
+    {"_id": 4, "title": "Vintage film camera", "category": ["Collectibles"], "description": "Works well", "status": "live"},
+    {"_id": 5, "title": "Used laptop", "category": ["Electronics"], "description": "Wireless keyboard included", "status": "live"},
+]
+
+
+class FakeCollection:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, query, projection=None):
+        return iter(list(self.docs))
+
+
+@pytest.fixture
+def index(monkeypatch):
+    docs = [dict(doc) for doc in DOCS]
+    monkeypatch.setattr(similar_items, "get_sync_db", lambda: {"items": FakeCollection(docs)})
+    index = SimilarityIndex()
+    index.load()
+    index.docs = docs
+    return index
+
+
+def _ids(results):
+    return [int(result["item_id"]) for result in results]
+
+
+def test_query_without_known_tokens_returns_nothing(index):
+    assert index.similar("macbook air") == []
+    assert index.similar("") == []
+
+
+def _dense(index, terms):
+    vector = np.zeros(index.buckets)
+    vector[terms[0]] = index._weights(terms)
+    return vector
+
+
+def test_scores_are_exact_cosine_similarities(index):
+    text = "oak dining table seats six"
+    query = _dense(index, similar_items._as_terms(similar_items.Counter(
+        similar_items._bucket(token) for token in similar_items._tokens(text))))
+    results = index.similar(text)
+
+    assert _ids(results) == [3]
+    expected = query @ _dense(index, similar_items._item_terms(DOCS[2]))
+    assert results[0]["similarity"] == pytest.approx(expected, abs=1e-4)
+
+    results = index.similar("wireless")
+    assert sorted(_ids(results)) == [1, 2, 5]
+    assert all(0 < result["similarity"] < 1 for result in results)
+
+
+def test_item_query_excludes_the_item_and_honours_live_only(index):
+    assert 2 not in _ids(index.similar(item_id="2"))
+    assert _ids(index.similar(item_id="2"))[0] == 1
+    assert 2 not in _ids(index.similar("wireless earbuds", live_only=True))
+    with pytest.raises(KeyError):
+        index.similar(item_id="99")
+
+
+def test_upsert_and_remove_before_a_rebuild(index):
+    index.upsert({"_id": 3, "title": "Wireless speaker", "category": ["Audio"], "description": "", "status": "live"})
+    index.remove("4")
+
+    assert 3 in _ids(index.similar("wireless speaker"))
+    assert index.similar("dining table") == []
+    assert index.similar("vintage film camera") == []
+    assert index.stats()["delta_items"] == 1
+    assert index.stats()["items"] == len(DOCS) - 1
+
+
+def test_rebuild_recomputes_idf_and_matches_incremental_ranking(index, monkeypatch):
+    update = {"_id": 6, "title": "Wireless mouse", "category": ["Electronics"], "description": "", "status": "live"}
+    index.docs.append(update)
+    index.upsert(update)
+    idf_before = index._idf.copy()
+    incremental = _ids(index.similar("wireless mouse"))
+
+    monkeypatch.setattr(similar_items, "SIMILARITY_REBUILD_AFTER", 0)
+    index.upsert(update)
+    deadline = time.monotonic() + 5
+    while index.stats()["loads"] < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert index.stats()["loads"] == 2
+    assert index.stats()["delta_items"] == 0
+    assert not np.array_equal(index._idf, idf_before)
+    assert _ids(index.similar("wireless mouse"))[0] == incremental[0] == 6
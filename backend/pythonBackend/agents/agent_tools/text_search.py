@@ -0,0 +1,177 @@
+# tools/text_search.py
+"""
+Free-text search over items.
+
+Item searches are ranked by the in-process BM25 index (bm25_index.py) once it
+has been built: it picks the best-matching item ids and MongoDB only applies
+the structured filter to them. Before that, and for other collections, a
+weighted MongoDB text index is used. Either way, title matches weigh most, then
+category, then description, and results are sorted by relevance. Collections
+without the text index fall back to an escaped, case-insensitive regex match,
+which scans. The text index itself is declared in indexes.py.
+"""
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from pymongo.errors import OperationFailure
+
+from .bm25_index import bm25_index
+
+TEXT_INDEX_NAME = "items_text"
+TEXT_INDEX_KEYS = [("title", "text"), ("category", "text"), ("description", "text")]
+TEXT_INDEX_WEIGHTS = {"title": 10, "category": 5, "description": 1}
+# How long to trust a "this collection has a text index" lookup
+TEXT_INDEX_CHECK_TTL = 300
+# Ranked ids handed to MongoDB per round trip when the prompt also has structured constraints
+BM25_CANDIDATES = int(os.getenv("BM25_CANDIDATES", "1000"))
+
+SCORE_PROJECTION = {"score": {"$meta": "textScore"}}
+SCORE_SORT = [("score", {"$meta": "textScore"})]
+
+_index_lock = threading.Lock()
+_has_index: Dict[str, Tuple[float, bool]] = {}
+
+
+def has_text_index(collection) -> bool:
+    """True if the collection has any text index (cached for TEXT_INDEX_CHECK_TTL)."""
+    now = time.monotonic()
+    with _index_lock:
+        cached = _has_index.get(collection.full_name)
+    if cached is not None and now - cached[0] < TEXT_INDEX_CHECK_TTL:
+        return cached[1]
+
+    try:
+        found = any(
+            "text" in [kind for _, kind in index["key"]]
+            for index in collection.index_information().values()
+        )
+    except OperationFailure:
+        found = False
+    with _index_lock:
+        _has_index[collection.full_name] = (now, found)
+    return found
+
+
+async def has_text_index_async(collection) -> bool:
+    """has_text_index for a Motor collection."""
+    now = time.monotonic()
+    with _index_lock:
+        cached = _has_index.get(collection.full_name)
+    if cached is not None and now - cached[0] < TEXT_INDEX_CHECK_TTL:
+        return cached[1]
+
+    try:
+        indexes = await collection.index_information()
+        found = any("text" in [kind for _, kind in index["key"]] for index in indexes.values())
+    except OperationFailure:
+        found = False
+    with _index_lock:
+        _has_index[collection.full_name] = (now, found)
+    return found
+
+
+def forget_text_index(collection):
+    """Drop the cached lookup, e.g. after a query reports the index is gone."""
+    with _index_lock:
+        _has_index.pop(collection.full_name, None)
+
+
+def regex_filter(terms: List[str]) -> Dict[str, Any]:
+    """Case-insensitive match of any term against title, description or category."""
+    pattern = '|'.join(re.escape(term) for term in terms)
+    return {
+        '$or': [
+            {'title': {'$regex': pattern, '$options': 'i'}},
+            {'description': {'$regex': pattern, '$options': 'i'}},
+            {'category': {'$regex': pattern, '$options': 'i'}}
+        ]
+    }
+
+
+def build_text_query(collection, terms: List[str], query_filter: Dict[str, Any],
+                     sort: Optional[List[Tuple[str, Any]]] = None,
+                     use_text_index: Optional[bool] = None) -> Dict[str, Any]:
+    """
+    Combine structured constraints with free-text terms.
+
+    Args:
+        collection: pymongo or motor collection being searched
+        terms: Keywords to search for (may be empty)
+        query_filter: Structured filter; not modified
+        sort: Explicit ordering requested by the caller, if any
+        use_text_index: Skip the index lookup when the caller already knows
+            (async callers use has_text_index_async)
+
+    Returns:
+        Dict with "filter", "projection", "sort" and "backend" ("bm25", "text",
+        "regex" or None when there were no terms). BM25 queries also carry
+        "ranking": [(_id, score)] for every hit, best first; see ranked_filter()
+        and ranked_batches().
+    """
+    query_filter = dict(query_filter)
+    if not terms:
+        return {"filter": query_filter, "projection": None, "sort": sort, "backend": None}
+
+    if bm25_index.ready and collection.name == "items":
+        return {
+            "filter": query_filter,
+            "projection": None,
+            "sort": sort,
+            "backend": "bm25",
+            "ranking": bm25_index.search(terms, None),
+        }
+
+    if use_text_index is None:
+        use_text_index = has_text_index(collection)
+    if use_text_index:
+        query_filter["$text"] = {"$search": " ".join(terms)}
+        return {
+            "filter": query_filter,
+            "projection": dict(SCORE_PROJECTION),
+            # An explicit order ("cheapest") wins; otherwise most relevant first
+            "sort": sort or list(SCORE_SORT),
+            "backend": "text",
+        }
+
+    query_filter.update(regex_filter(terms))
+    return {"filter": query_filter, "projection": None, "sort": sort, "backend": "regex"}
+
+
+def ranked_filter(query: Dict[str, Any]) -> Dict[str, Any]:
+    """The query's filter restricted to all of its BM25 hits (for explicitly sorted pages)."""
+    query_filter = dict(query["filter"])
+    query_filter["_id"] = {"$in": [key for key, _ in query["ranking"]]}
+    return query_filter
+
+
+def ranked_batches(query: Dict[str, Any], limit: int) -> Iterator[Dict[str, Any]]:
+    """
+    The query's filter restricted to successive slices of its BM25 hits, best first.
+
+    The structured filter may reject any number of the best hits, so callers
+    fetch slice after slice until they have `limit` documents; everything in a
+    slice outranks everything in the next one. Slices hold BM25_CANDIDATES ids,
+    or just `limit` when there is no filter to reject any.
+    """
+    ranking = query["ranking"]
+    size = max(limit, BM25_CANDIDATES) if query["filter"] else limit
+    for start in range(0, len(ranking), size):
+        query_filter = dict(query["filter"])
+        query_filter["_id"] = {"$in": [key for key, _ in ranking[start:start + size]]}
+        yield query_filter
+
+
+def order_by_rank(docs: List[Dict[str, Any]], query: Dict[str, Any], limit: int) -> List[Dict[str, Any]]:
+    """Sort fetched BM25 hits best first, attach their score and keep the top `limit`."""
+    scores = {str(key): score for key, score in query["ranking"]}
+    for doc in docs:
+        doc["score"] = round(scores.get(str(doc["_id"]), 0.0), 4)
+    docs.sort(key=lambda doc: -doc["score"])
+    return docs[:limit]
+
+
+def is_missing_text_index(error: Exception) -> bool:
+    return isinstance(error, OperationFailure) and "text index required" in str(error)
@@ -0,0 +1,273 @@
+"""
+Asynchronous image-analysis jobs.
+
+POST /agent/analyze_images/jobs uploads the images, records a job in the
+MongoDB "analysis_jobs" collection and returns its id right away. A bounded
+pool of in-process workers runs the analysis and stores the result on the job
+document, which GET /agent/jobs/{job_id} returns.
+
+Running jobs send a heartbeat. Jobs whose heartbeat stopped (their process
+crashed or was redeployed) are re-queued by a periodic sweep in any live
+process, and all unfinished jobs are re-queued on startup, so a worker restart
+doesn't lose work: the images already live in S3 and are downloaded again if
+their bytes are no longer in memory.
+"""
+import asyncio
+import os
+import sys
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from fastapi.encoders import jsonable_encoder
+
+# Add parent directory to path for imports
+current_dir = Path(__file__).parent
+parent_dir = current_dir.parent
+sys.path.append(str(parent_dir))
+
+from aws_clients import download_bytes
+from db_connection import get_async_db
+from agents.agent_tools.blob_registry import blob_registry
+from agents.image_analysis import run_analysis
+
+ANALYSIS_JOB_COLLECTION = "analysis_jobs"
+ANALYSIS_JOB_WORKERS = int(os.getenv("ANALYSIS_JOB_WORKERS", "2"))
+ANALYSIS_JOB_QUEUE_SIZE = int(os.getenv("ANALYSIS_JOB_QUEUE_SIZE", "100"))
+ANALYSIS_JOB_MAX_ATTEMPTS = int(os.getenv("ANALYSIS_JOB_MAX_ATTEMPTS", "3"))
+# Running jobs refresh heartbeatAt this often...
+ANALYSIS_JOB_HEARTBEAT = int(os.getenv("ANALYSIS_JOB_HEARTBEAT", "30"))
+# ...and one silent for longer than this is assumed to belong to a dead worker
+ANALYSIS_JOB_STALE_AFTER = int(os.getenv("ANALYSIS_JOB_STALE_AFTER", "120"))
+# How often every process looks for such jobs
+ANALYSIS_JOB_SWEEP_INTERVAL = int(os.getenv("ANALYSIS_JOB_SWEEP_INTERVAL", "60"))
+
+
+class QueueFullError(Exception):
+    pass
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def _storable(value: Any) -> Any:
+    # Same encoding FastAPI applies to the /agent/analyze_images return value,
+    # so a finished job returns the same body (AgentResults included)
+    return jsonable_encoder(value)
+
+
+class AnalysisJobQueue:
+    def __init__(self, workers: int = ANALYSIS_JOB_WORKERS, max_queued: int = ANALYSIS_JOB_QUEUE_SIZE):
+        self.workers = workers
+        self.max_queued = max_queued
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._enqueued_at: Dict[str, float] = {}
+        self._held_blobs: Dict[str, List[str]] = {}
+        self._running = 0
+        self._waits = deque(maxlen=200)
+        self._stats = {"submitted": 0, "succeeded": 0, "failed": 0, "recovered": 0}
+
+    @property
+    def collection(self):
+        return get_async_db()[ANALYSIS_JOB_COLLECTION]
+
+    async def start(self):
+        """Start the workers and re-queue jobs left unfinished by a previous process."""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queued)
+        await self.collection.create_index([("status", 1), ("createdAt", 1)])
+        await self._recover(startup=True)
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._sweep()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _recover(self, startup: bool = False):
+        """
+        Re-queue jobs nobody is working on: running jobs whose heartbeat stopped,
+        and queued jobs left behind by a dead process (at startup every queued
+        job; later only ones that have waited longer than the stale limit).
+        """
+        stale = _now() - timedelta(seconds=ANALYSIS_JOB_STALE_AFTER)
+        cursor = self.collection.find(
+            {"$or": [
+                {"status": "queued"} if startup else {"status": "queued", "queuedAt": {"$lt": stale}},
+                {"status": "running", "heartbeatAt": {"$lt": stale}},
+            ]},
+            {"_id": 1, "status": 1, "attempts": 1},
+        ).sort("createdAt", 1)
+
+        async for job in cursor:
+            if job["_id"] in self._enqueued_at:
+                continue  # already waiting in this process's queue
+            # Only touch the job if nobody else re-queued or claimed it meanwhile
+            current = {"_id": job["_id"], "status": job["status"], "attempts": job.get("attempts", 0)}
+            if job.get("attempts", 0) >= ANALYSIS_JOB_MAX_ATTEMPTS:
+                await self.collection.update_one(
+                    current,
+                    {"$set": {"status": "failed", "error": "Gave up after repeated interruptions", "finishedAt": _now()}},
+                )
+                continue
+            if self._queue.full():
+                break  # the rest are picked up by a later sweep
+            requeued = await self.collection.update_one(current, {"$set": {"status": "queued", "queuedAt": _now()}})
+            if not requeued.modified_count:
+                continue
+            self._enqueue(job["_id"])
+            self._stats["recovered"] += 1
+
+    async def _sweep(self):
+        while True:
+            await asyncio.sleep(ANALYSIS_JOB_SWEEP_INTERVAL)
+            try:
+                await self._recover()
+            except Exception as e:
+                print(f"Analysis job sweep failed: {e}")
+
+    async def _heartbeat(self, job_id: str):
+        while True:
+            await asyncio.sleep(ANALYSIS_JOB_HEARTBEAT)
+            try:
+                await self.collection.update_one(
+                    {"_id": job_id, "status": "running"}, {"$set": {"heartbeatAt": _now()}}
+                )
+            except Exception as e:
+                print(f"Analysis job {job_id} heartbeat failed: {e}")
+
+    def _enqueue(self, job_id: str):
+        self._enqueued_at[job_id] = time.monotonic()
+        self._queue.put_nowait(job_id)
+
+    async def submit(self, uploaded_images: List[Dict[str, Any]], failed_uploads: List[Dict[str, Any]],
+                     blobs: Dict[str, bytes], options: Dict[str, Any]) -> str:
+        """Persist a job and queue it. Raises QueueFullError when the queue is at capacity."""
+        if self._queue is None or self._queue.full():
+            raise QueueFullError("Analysis queue is full, try again later")
+
+        job_id = uuid.uuid4().hex
+        await self.collection.insert_one({
+            "_id": job_id,
+            "status": "queued",
+            "images": uploaded_images,
+            "failedUploads": failed_uploads,
+            "options": options,
+            "attempts": 0,
+            "createdAt": _now(),
+            "queuedAt": _now(),
+        })
+        # Keep the bytes in memory until the job runs so it skips the S3 round-trip
+        self._held_blobs[job_id] = [url for url, data in blobs.items() if blob_registry.register(url, data)]
+        try:
+            self._enqueue(job_id)
+        except asyncio.QueueFull:
+            self._release(job_id)
+            await self.collection.delete_one({"_id": job_id})
+            raise QueueFullError("Analysis queue is full, try again later")
+        self._stats["submitted"] += 1
+        return job_id
+
+    def _release(self, job_id: str):
+        for url in self._held_blobs.pop(job_id, []):
+            blob_registry.release(url)
+
+    async def _load_blobs(self, images: List[Dict[str, Any]]) -> Dict[str, bytes]:
+        blobs = {}
+        for img in images:
+            data = blob_registry.resolve(img["url"])
+            if data is None:
+                # Bytes were lost with a previous process; fetch them back from S3
+                data = await asyncio.to_thread(download_bytes, img["url"])
+            blobs[img["url"]] = data
+        return blobs
+
+    async def _worker(self, index: int):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except Exception as e:
+                print(f"Analysis job {job_id} crashed: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str):
+        enqueued = self._enqueued_at.pop(job_id, None)
+        if enqueued is not None:
+            self._waits.append(time.monotonic() - enqueued)
+
+        # Claim atomically so two processes never run the same job
+        job = await self.collection.find_one_and_update(
+            {"_id": job_id, "status": "queued"},
+            {"$set": {"status": "running", "startedAt": _now(), "heartbeatAt": _now()}, "$inc": {"attempts": 1}},
+        )
+        if job is None:
+            self._release(job_id)
+            return
+
+        self._running += 1
+        heartbeat = asyncio.create_task(self._heartbeat(job_id))
+        try:
+            blobs = await self._load_blobs(job["images"])
+            result = await run_analysis(job["images"], blobs, failed_uploads=job.get("failedUploads"), **job["options"])
+            await self.collection.update_one(
+                {"_id": job_id},
+                {"$set": {"status": "succeeded", "result": _storable(result), "finishedAt": _now()}},
+            )
+            self._stats["succeeded"] += 1
+        except Exception as e:
+            await self.collection.update_one(
+                {"_id": job_id},
+                {"$set": {"status": "failed", "error": str(e), "finishedAt": _now()}},
+            )
+            self._stats["failed"] += 1
+        finally:
+            heartbeat.cancel()
+            self._running -= 1
+            self._release(job_id)
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = await self.collection.find_one({"_id": job_id})
+        if job is None:
+            return None
+        response = {
+            "job_id": job["_id"],
+            "status": job["status"],
+            "created_at": job.get("createdAt"),
+            "started_at": job.get("startedAt"),
+            "finished_at": job.get("finishedAt"),
+            "attempts": job.get("attempts", 0),
+        }
+        if job["status"] == "succeeded":
+            response["result"] = job.get("result")
+        elif job["status"] == "failed":
+            response["error"] = job.get("error")
+        elif job["status"] == "queued":
+            response["queue_depth"] = self._queue.qsize() if self._queue else None
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        waits = list(self._waits)
+        return {
+            "workers": self.workers,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "max_queued": self.max_queued,
+            "running": self._running,
+            "oldest_queued_seconds": round(now - min(self._enqueued_at.values()), 2) if self._enqueued_at else 0,
+            "avg_wait_seconds": round(sum(waits) / len(waits), 2) if waits else 0,
+            "max_wait_seconds": round(max(waits), 2) if waits else 0,
+            **self._stats,
+        }
+
+
+analysis_jobs = AnalysisJobQueue()
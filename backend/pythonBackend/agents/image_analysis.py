@@ -0,0 +1,244 @@
+"""
+Image analysis orchestration for /agent/analyze_images.
+
+Uploads the images, builds the verifier prompts and runs the analysis: one
+multi-image Bedrock call (batch), one fresh agent for the whole set (agent), or
+per-image analyses run concurrently with a parallelism cap and per-image timeout.
+"""
+import asyncio
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from agents.agent import create_fresh_agent
+from agents.agent_tools.analyze_image import analyze_images_batch
+from agents.agent_tools.blob_registry import blob_registry
+from agents.agent_tools.s3_tools import upload_many_to_s3_async
+
+ANALYSIS_MAX_CONCURRENCY = int(os.getenv("ANALYSIS_MAX_CONCURRENCY", "4"))
+ANALYSIS_IMAGE_TIMEOUT = float(os.getenv("ANALYSIS_IMAGE_TIMEOUT", "90"))
+
+
+def build_combined_prompt(uploaded_images: List[Dict[str, Any]], description: str = "") -> str:
+    image_urls = [img["url"] for img in uploaded_images]
+    image_filenames = [img["filename"] for img in uploaded_images]
+
+    prompt = f"""Be a balanced auction verifier. Analyze these {len(uploaded_images)} product images using `analyze_image` to detect authenticity — start cautiously (the seller *might* use stock/AI images) but remain fair and evidence-driven.
+            Check EXIF, lighting, background, watermarks, and editing artifacts; to confirm uniqueness(This is an important step). Compare with similar items (DB + web) to suggest a reasonable price range, lowering estimates for used or suspicious listings.
+            Rate auction quality (0–100) for authenticity, clarity, and technical quality, and provide a short justification and recommended action (accept/manual_review/reject/request_better_images).
+
+
+            If the images look too polished or reused, recommend manual review or reject.
+
+            Image URLs: {', '.join(image_urls)}
+            Image filenames: {', '.join(image_filenames)}
+            """
+    if description:
+        prompt += f"Additional context: {description}. "
+    prompt += "Use the analyze_image tool to get detailed analysis for each image."
+    return prompt
+
+
+def build_individual_prompt(img: Dict[str, Any], description: str = "") -> str:
+    prompt = f"""Be a balanced auction verifier. Analyze this product image using `analyze_image` to detect authenticity — start cautiously (the seller *might* use stock/AI images) but remain fair and evidence-driven.
+                    Check EXIF, lighting, background, watermarks, and editing artifacts. Compare with similar items (DB + web) to suggest a reasonable price range, lowering estimates for used or suspicious listings.
+                    Rate auction quality (0–10) for authenticity, clarity, and technical quality, and provide a short justification and recommended action (accept/manual_review/reject/request_better_images).
+
+
+                    If the images look too polished or reused, recommend manual review or reject.
+
+                    Image URL: {img['url']}
+                    Image filename: {img['filename']}
+                    """
+    if description:
+        prompt += f"Additional context: {description}. "
+    prompt += f"Use the analyze_image tool to get detailed analysis."
+    return prompt
+
+
+async def _analyze_one(img: Dict[str, Any], description: str, slots: asyncio.Semaphore, timeout: float) -> Dict[str, Any]:
+    result = {"filename": img["filename"], "url": img["url"]}
+    async with slots:
+        started = time.monotonic()
+        try:
+            # Fresh agent per image prevents context contamination; the pool
+            # usually has one ready, otherwise it's built off the event loop
+            fresh_agent = await asyncio.to_thread(create_fresh_agent)
+            if not fresh_agent:
+                raise Exception("Failed to initialize AI agent")
+
+            prompt = build_individual_prompt(img, description)
+            analysis = await asyncio.wait_for(fresh_agent.invoke_async(prompt), timeout=timeout)
+
+            # IMPORTANT: Clear the agent reference to allow garbage collection
+            del fresh_agent
+
+            result.update({"analysis": analysis, "status": "success"})
+        except asyncio.TimeoutError:
+            result.update({
+                "analysis": {"error": f"Analysis timed out after {timeout:g}s"},
+                "status": "timeout",
+            })
+        except Exception as e:
+            result.update({"analysis": {"error": str(e)}, "status": "failed"})
+        result["elapsed_seconds"] = round(time.monotonic() - started, 2)
+    return result
+
+
+async def analyze_individually(
+    uploaded_images: List[Dict[str, Any]],
+    description: str = "",
+    max_concurrency: Optional[int] = None,
+    timeout: Optional[float] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Analyze each image on its own fresh agent, concurrently.
+
+    Args:
+        uploaded_images: Dicts with at least "filename" and "url"
+        description: Optional context shared by every image
+        max_concurrency: Max analyses in flight (default ANALYSIS_MAX_CONCURRENCY)
+        timeout: Per-image timeout in seconds (default ANALYSIS_IMAGE_TIMEOUT)
+
+    Returns:
+        One result per image, in input order. A failed or timed-out image gets
+        status "failed"/"timeout" and never holds up the others.
+    """
+    max_concurrency = max(1, max_concurrency or ANALYSIS_MAX_CONCURRENCY)
+    timeout = timeout or ANALYSIS_IMAGE_TIMEOUT
+    slots = asyncio.Semaphore(max_concurrency)
+
+    return await asyncio.gather(*[
+        _analyze_one(img, description, slots, timeout) for img in uploaded_images
+    ])
+
+
+def summarize_status(results: List[Dict[str, Any]]) -> str:
+    """Overall status for a batch of per-image results."""
+    succeeded = sum(1 for r in results if r.get("status") == "success")
+    if succeeded == len(results):
+        return "success"
+    return "partial" if succeeded else "failed"
+
+
+async def upload_images(files: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], Dict[str, bytes]]:
+    """
+    Upload image files to S3 concurrently.
+
+    Args:
+        files: Dicts with "filename", "data" (bytes) and "content_type"
+
+    Returns:
+        (uploaded_images, failed_uploads, blobs) where blobs maps each uploaded
+        URL to the bytes that were stored there.
+    """
+    upload_results = await upload_many_to_s3_async(files)
+    uploaded_images = [
+        {"filename": r["filename"], "url": r["url"], "content_type": r["content_type"], "sha256": r["sha256"]}
+        for r in upload_results if r["status"] == "uploaded"
+    ]
+    failed_uploads = [
+        {"filename": r["filename"], "error": r["error"]}
+        for r in upload_results if r["status"] == "failed"
+    ]
+    blobs = {
+        r["url"]: f["data"]
+        for f, r in zip(files, upload_results) if r["status"] == "uploaded"
+    }
+    return uploaded_images, failed_uploads, blobs
+
+
+async def run_analysis(
+    uploaded_images: List[Dict[str, Any]],
+    blobs: Dict[str, bytes],
+    failed_uploads: Optional[List[Dict[str, Any]]] = None,
+    title: str = "",
+    description: str = "",
+    condition: str = "",
+    analyze_together: bool = True,
+    combined_mode: str = "agent",
+    max_concurrency: Optional[int] = None,
+    image_timeout: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Analyze uploaded images and build the /agent/analyze_images response.
+
+    Args:
+        uploaded_images: Dicts with "filename", "url", "content_type" and "sha256"
+        blobs: Image bytes keyed by URL (every uploaded image must be present)
+        failed_uploads: Files that could not be uploaded, echoed in the response
+        Remaining arguments mirror the endpoint's form fields.
+    """
+    failed_uploads = failed_uploads or []
+
+    # Hand the bytes we already have to analyze_image so it skips the S3 download;
+    # the URLs remain the persistent reference returned to the client
+    with blob_registry.scope(blobs):
+        # Create analysis prompt based on analyze_together flag
+        if analyze_together and combined_mode == "batch":
+            # One multi-image Bedrock request for the whole listing
+            batch = await asyncio.to_thread(
+                analyze_images_batch,
+                [blobs[img["url"]] for img in uploaded_images],
+                [img["filename"] for img in uploaded_images],
+                title,
+                description,
+                condition,
+            )
+            return {
+                "analysis_type": "combined",
+                "analysis_mode": "batch",
+                "images": uploaded_images,
+                "total_images": len(uploaded_images),
+                "failed_uploads": failed_uploads,
+                "analysis": batch["analysis"],
+                "analysis_cached": batch["cached"],
+                "preprocessing": batch["preprocessing"],
+                "status": batch["status"]
+            }
+        
+        elif analyze_together:
+            # Create a fresh agent instance to prevent context overflow
+            fresh_agent = await asyncio.to_thread(create_fresh_agent)
+            if not fresh_agent:
+                raise RuntimeError("Failed to initialize AI agent")
+        
+            # Analyze all images together as a set
+            prompt = build_combined_prompt(uploaded_images, description)
+        
+            # Use the fresh agent to analyze all images together
+            response = await fresh_agent.invoke_async(prompt)
+        
+            # IMPORTANT: Clear the agent reference to allow garbage collection
+            # This ensures the agent's context/memory is freed and prevents:
+            # 1. Context window overflow from accumulated history
+            # 2. Cross-contamination between different product analyses
+            del fresh_agent
+        
+            return {
+                "analysis_type": "combined",
+                "analysis_mode": "agent",
+                "images": uploaded_images,
+                "total_images": len(uploaded_images),
+                "failed_uploads": failed_uploads,
+                "analysis": response,
+                "status": "success"
+            }
+    
+        else:
+            # Analyze each image separately with fresh agent instances, concurrently
+            individual_analyses = await analyze_individually(
+                uploaded_images,
+                description,
+                max_concurrency=max_concurrency,
+                timeout=image_timeout,
+            )
+        
+            return {
+                "analysis_type": "individual",
+                "images": uploaded_images,
+                "total_images": len(uploaded_images),
+                "failed_uploads": failed_uploads,
+                "individual_analyses": individual_analyses,
+                "status": summarize_status(individual_analyses)
+            }
@@ -0,0 +1,55 @@
+"""
+Translate Strands agent events into Server-Sent Events for the chat widget.
+
+Event types sent to the client:
+    session    - {"session_id"} sent first so the client can continue the chat
+    text       - {"delta"} incremental model text
+    tool_start - {"tool_use_id", "name"} the model started calling a tool
+    tool_end   - {"tool_use_id", "status"} the tool finished and returned a result
+    done       - {"stop_reason", "response"} the turn completed
+    error      - {"error"} the turn failed; the stream ends after this
+"""
+import json
+from typing import Any, AsyncIterator, Dict
+
+
+def _sse(event: str, data: Dict[str, Any]) -> Dict[str, str]:
+    return {"event": event, "data": json.dumps(data, default=str)}
+
+
+async def agent_events_to_sse(session_id: str, events: AsyncIterator[Dict[str, Any]]):
+    """Map raw agent events to SSE payloads understood by sse-starlette."""
+    yield _sse("session", {"session_id": session_id})
+
+    started_tools = set()
+    try:
+        async for event in events:
+            if "data" in event and isinstance(event["data"], str):
+                yield _sse("text", {"delta": event["data"]})
+
+            elif "current_tool_use" in event:
+                tool_use = event["current_tool_use"] or {}
+                tool_use_id = tool_use.get("toolUseId")
+                if tool_use_id and tool_use_id not in started_tools:
+                    started_tools.add(tool_use_id)
+                    yield _sse("tool_start", {"tool_use_id": tool_use_id, "name": tool_use.get("name")})
+
+            elif "message" in event:
+                # Tool results come back as a user-role message of toolResult blocks
+                message = event["message"] or {}
+                for block in message.get("content", []):
+                    tool_result = block.get("toolResult") if isinstance(block, dict) else None
+                    if tool_result:
+                        yield _sse("tool_end", {
+                            "tool_use_id": tool_result.get("toolUseId"),
+                            "status": tool_result.get("status", "success"),
+                        })
+
+            elif "result" in event:
+                result = event["result"]
+                yield _sse("done", {
+                    "stop_reason": getattr(result, "stop_reason", None),
+                    "response": str(result),
+                })
+    except Exception as e:
+        yield _sse("error", {"error": str(e)})
@@ -0,0 +1,174 @@
+"""
+Shared AWS and HTTP client registry
+Long-lived, thread-safe clients reused by the agents, analyze_image and s3_tools
+so TLS handshakes, credential resolution and client setup are paid once per process
+"""
+import os
+import threading
+from contextlib import contextmanager
+
+import boto3
+import requests
+from botocore.config import Config
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Load environment variables
+load_dotenv()
+
+AWS_REGION = os.getenv("AWS_DEFAULT_REGION", "us-west-2")
+# Where the agents' Bedrock model runs; independent of AWS_DEFAULT_REGION, which
+# is also the S3 bucket's region
+BEDROCK_REGION = os.getenv("BEDROCK_REGION", "us-west-2")
+AWS_MAX_POOL_CONNECTIONS = int(os.getenv("AWS_MAX_POOL_CONNECTIONS", "32"))
+AWS_MAX_ATTEMPTS = int(os.getenv("AWS_MAX_ATTEMPTS", "4"))
+# Bedrock throttling is handled by bedrock_limiter's breaker, so botocore only
+# retries once instead of hammering a throttled endpoint on every caller
+BEDROCK_MAX_ATTEMPTS = int(os.getenv("BEDROCK_MAX_ATTEMPTS", "2"))
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "16"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+DOWNLOAD_MAX_BYTES = int(os.getenv("DOWNLOAD_MAX_BYTES", str(20 * 1024 * 1024)))
+
+# Adaptive retries add client-side rate limiting on top of exponential backoff
+BEDROCK_CLIENT_CONFIG = Config(
+    max_pool_connections=AWS_MAX_POOL_CONNECTIONS,
+    retries={"mode": "adaptive", "max_attempts": BEDROCK_MAX_ATTEMPTS},
+    connect_timeout=10,
+    read_timeout=120,
+    tcp_keepalive=True,
+)
+
+S3_CLIENT_CONFIG = Config(
+    max_pool_connections=AWS_MAX_POOL_CONNECTIONS,
+    retries={"mode": "adaptive", "max_attempts": AWS_MAX_ATTEMPTS},
+    tcp_keepalive=True,
+)
+
+# boto3 sessions are not thread-safe; hold this while creating clients from one
+boto_session_lock = threading.Lock()
+
+_boto_sessions = {}
+_clients = {}
+_http_session = None
+_http_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {
+    "clients_created": 0,
+    "downloads": 0,
+    "download_bytes": 0,
+    "downloads_rejected": 0,
+    "in_flight": {},
+    "peak_in_flight": {},
+}
+
+
+def get_boto_session(region_name: str = AWS_REGION):
+    """Get the shared boto3 session for a region (credentials are resolved once per session)"""
+    with boto_session_lock:
+        session = _boto_sessions.get(region_name)
+        if session is None:
+            session = boto3.Session(region_name=region_name)
+            _boto_sessions[region_name] = session
+        return session
+
+
+def _get_client(service_name: str, config: Config):
+    client = _clients.get(service_name)
+    if client is not None:
+        return client
+    session = get_boto_session()
+    with boto_session_lock:
+        client = _clients.get(service_name)
+        if client is None:
+            client = session.client(service_name, config=config)
+            _clients[service_name] = client
+            with _stats_lock:
+                _stats["clients_created"] += 1
+        return client
+
+
+def get_bedrock_runtime():
+    """Get the shared bedrock-runtime client"""
+    return _get_client("bedrock-runtime", BEDROCK_CLIENT_CONFIG)
+
+
+def get_s3_client():
+    """Get the shared S3 client"""
+    return _get_client("s3", S3_CLIENT_CONFIG)
+
+
+def get_http_session():
+    """Get the shared keep-alive HTTP session for image downloads"""
+    global _http_session
+    with _http_lock:
+        if _http_session is None:
+            session = requests.Session()
+            retry = Retry(
+                total=3,
+                backoff_factor=0.3,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=frozenset({"GET", "HEAD"}),
+            )
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE, max_retries=retry)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _http_session = session
+        return _http_session
+
+
+@contextmanager
+def track(pool_name: str):
+    """Count in-flight calls against a pool so saturation shows up in client_stats()"""
+    with _stats_lock:
+        current = _stats["in_flight"].get(pool_name, 0) + 1
+        _stats["in_flight"][pool_name] = current
+        if current > _stats["peak_in_flight"].get(pool_name, 0):
+            _stats["peak_in_flight"][pool_name] = current
+    try:
+        yield
+    finally:
+        with _stats_lock:
+            _stats["in_flight"][pool_name] -= 1
+
+
+def download_bytes(url: str, max_bytes: int = DOWNLOAD_MAX_BYTES) -> bytes:
+    """
+    Download a URL over the shared session, streaming with a size cap.
+    Raises ValueError if the body is larger than max_bytes.
+    """
+    with track("http"):
+        with get_http_session().get(url, stream=True, timeout=(HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)) as response:
+            response.raise_for_status()
+            declared = response.headers.get("Content-Length")
+            if declared and declared.isdigit() and int(declared) > max_bytes:
+                with _stats_lock:
+                    _stats["downloads_rejected"] += 1
+                raise ValueError(f"Download too large: {declared} bytes (limit {max_bytes})")
+
+            chunks = []
+            received = 0
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                received += len(chunk)
+                if received > max_bytes:
+                    with _stats_lock:
+                        _stats["downloads_rejected"] += 1
+                    raise ValueError(f"Download exceeded {max_bytes} bytes")
+                chunks.append(chunk)
+
+    with _stats_lock:
+        _stats["downloads"] += 1
+        _stats["download_bytes"] += received
+    return b"".join(chunks)
+
+
+def client_stats():
+    """Counters for client reuse and pool usage"""
+    with _stats_lock:
+        return {
+            "clients": sorted(_clients),
+            "aws_max_pool_connections": AWS_MAX_POOL_CONNECTIONS,
+            "http_pool_size": HTTP_POOL_SIZE,
+            **{k: (dict(v) if isinstance(v, dict) else v) for k, v in _stats.items()},
+        }
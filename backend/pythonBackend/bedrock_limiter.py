@@ -0,0 +1,255 @@
+"""
+Process-wide Bedrock rate limiter and circuit breaker
+Shared by the chat agents, the fresh analysis agents and analyze_image's direct
+invoke_model calls, so all Bedrock traffic from this process is paced together
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+BEDROCK_REQUESTS_PER_MINUTE = float(os.getenv("BEDROCK_REQUESTS_PER_MINUTE", "50"))
+BEDROCK_TOKENS_PER_MINUTE = float(os.getenv("BEDROCK_TOKENS_PER_MINUTE", "200000"))
+# Callers that would have to queue longer than this fail fast instead
+BEDROCK_MAX_WAIT = float(os.getenv("BEDROCK_MAX_WAIT", "30"))
+BEDROCK_BREAKER_THRESHOLD = int(os.getenv("BEDROCK_BREAKER_THRESHOLD", "5"))
+BEDROCK_BREAKER_WINDOW = float(os.getenv("BEDROCK_BREAKER_WINDOW", "30"))
+BEDROCK_BREAKER_COOLDOWN = float(os.getenv("BEDROCK_BREAKER_COOLDOWN", "20"))
+
+_THROTTLE_CODES = {"ThrottlingException", "TooManyRequestsException", "ServiceUnavailableException"}
+
+
+class BedrockUnavailableError(Exception):
+    """Raised instead of calling Bedrock while it is throttling us or the queue is too long"""
+
+
+def is_throttle(exc: BaseException) -> bool:
+    """True for Bedrock throttling errors, from boto3 or from Strands"""
+    if type(exc).__name__ == "ModelThrottledException":
+        return True
+    response = getattr(exc, "response", None)
+    if isinstance(response, dict):
+        return response.get("Error", {}).get("Code") in _THROTTLE_CODES
+    return False
+
+
+def estimate_image_tokens(width: int = 1092, height: int = 1092) -> int:
+    """Anthropic's rule of thumb: about width * height / 750 tokens per image"""
+    return max(1, (width * height) // 750)
+
+
+def estimate_text_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def estimate_content_tokens(content, expected_output: int = 1500) -> int:
+    """
+    Rough token count for a request body: messages/content blocks in either the
+    Anthropic or the Converse shape, plus the reply we expect back
+    """
+    total = expected_output
+    stack = [content]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, str):
+            total += estimate_text_tokens(node)
+        elif isinstance(node, dict):
+            if node.get("type") == "image" or "image" in node:
+                total += estimate_image_tokens()
+            elif "json" in node:
+                total += estimate_text_tokens(json.dumps(node["json"], default=str))
+            else:
+                stack.extend(v for v in node.values() if isinstance(v, (str, dict, list)))
+        elif isinstance(node, list):
+            stack.extend(node)
+    return total
+
+
+class TokenBucket:
+    """Refills continuously at rate per second up to capacity; callers reserve ahead"""
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60.0
+        self.capacity = per_minute
+        self._tokens = per_minute
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        """Take amount tokens and return how long to wait before using them"""
+        amount = min(amount, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= amount
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def refund(self, amount: float):
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + min(amount, self.capacity))
+
+    def available(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            return min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` throttles within `window` seconds and rejects calls
+    for `cooldown` seconds; then lets one probe through (half-open) and closes
+    again if it succeeds
+    """
+
+    def __init__(self, threshold: int, window: float, cooldown: float):
+        self.threshold = threshold
+        self.window = window
+        self.cooldown = cooldown
+        self.state = "closed"
+        self._throttles = []
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        self.times_opened = 0
+
+    def before_call(self):
+        with self._lock:
+            if self.state == "open":
+                if time.monotonic() - self._opened_at < self.cooldown:
+                    raise BedrockUnavailableError("Bedrock is throttling requests; try again shortly")
+                self.state = "half_open"
+                self._probe_in_flight = False
+            if self.state == "half_open":
+                if self._probe_in_flight:
+                    raise BedrockUnavailableError("Bedrock is recovering from throttling; try again shortly")
+                self._probe_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            if self.state == "half_open":
+                self.state = "closed"
+                self._throttles = []
+            self._probe_in_flight = False
+
+    def record_throttle(self):
+        with self._lock:
+            now = time.monotonic()
+            self._throttles = [t for t in self._throttles if now - t < self.window] + [now]
+            if self.state == "half_open" or len(self._throttles) >= self.threshold:
+                if self.state != "open":
+                    self.times_opened += 1
+                self.state = "open"
+                self._opened_at = now
+            self._probe_in_flight = False
+
+    def record_other(self):
+        # Non-throttle failures say nothing about capacity; just free the probe slot
+        with self._lock:
+            self._probe_in_flight = False
+
+
+class BedrockGuard:
+    def __init__(self):
+        self.requests = TokenBucket(BEDROCK_REQUESTS_PER_MINUTE)
+        self.tokens = TokenBucket(BEDROCK_TOKENS_PER_MINUTE)
+        self.breaker = CircuitBreaker(BEDROCK_BREAKER_THRESHOLD, BEDROCK_BREAKER_WINDOW, BEDROCK_BREAKER_COOLDOWN)
+        self.max_wait = BEDROCK_MAX_WAIT
+        self._stats_lock = threading.Lock()
+        self._stats = {"calls": 0, "throttled": 0, "rejected": 0, "waited_seconds": 0.0}
+
+    def _count(self, key: str, amount=1):
+        with self._stats_lock:
+            self._stats[key] += amount
+
+    def _reserve(self, estimated_tokens: int) -> float:
+        try:
+            self.breaker.before_call()
+        except BedrockUnavailableError:
+            self._count("rejected")
+            raise
+        wait = max(self.requests.reserve(1), self.tokens.reserve(estimated_tokens))
+        if wait > self.max_wait:
+            self._release(estimated_tokens)
+            self._count("rejected")
+            raise BedrockUnavailableError(f"Bedrock rate limit queue is {wait:.0f}s deep; try again shortly")
+        self._count("calls")
+        self._count("waited_seconds", wait)
+        return wait
+
+    def _release(self, estimated_tokens: int):
+        """Undo a reservation that was never used (queue too deep, or the caller gave up waiting)"""
+        self.requests.refund(1)
+        self.tokens.refund(estimated_tokens)
+        self.breaker.record_other()
+
+    def _record(self, exc: BaseException = None):
+        if exc is None:
+            self.breaker.record_success()
+        elif is_throttle(exc):
+            self._count("throttled")
+            self.breaker.record_throttle()
+        else:
+            self.breaker.record_other()
+
+    @contextmanager
+    def call(self, estimated_tokens: int):
+        """Wrap a blocking Bedrock call"""
+        wait = self._reserve(estimated_tokens)
+        try:
+            if wait:
+                time.sleep(wait)
+        except BaseException:
+            self._release(estimated_tokens)
+            raise
+        try:
+            yield
+        except BaseException as e:
+            self._record(e)
+            raise
+        self._record()
+
+    @asynccontextmanager
+    async def call_async(self, estimated_tokens: int):
+        """Wrap a Bedrock call made from async code"""
+        wait = self._reserve(estimated_tokens)
+        try:
+            if wait:
+                await asyncio.sleep(wait)
+        except BaseException:
+            # Cancelled while queued (wait_for timeout, client disconnect): the
+            # tokens and, when half-open, the probe slot must not leak
+            self._release(estimated_tokens)
+            raise
+        try:
+            yield
+        except BaseException as e:
+            self._record(e)
+            raise
+        self._record()
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["waited_seconds"] = round(stats["waited_seconds"], 2)
+        return {
+            "breaker_state": self.breaker.state,
+            "breaker_opened": self.breaker.times_opened,
+            "requests_available": round(self.requests.available(), 1),
+            "tokens_available": round(self.tokens.available()),
+            "requests_per_minute": BEDROCK_REQUESTS_PER_MINUTE,
+            "tokens_per_minute": BEDROCK_TOKENS_PER_MINUTE,
+            **stats,
+        }
+
+
+bedrock_guard = BedrockGuard()
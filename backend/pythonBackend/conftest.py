@@ -0,0 +1,8 @@
+"""
+Shared pytest setup. Unit tests cover pure logic only, so point the MongoDB
+clients (created at import time by db_connection) at a local URI instead of
+the Atlas SRV record; nothing connects unless a test actually queries.
+"""
+import os
+
+os.environ.setdefault("CONNECTION_URI", "mongodb://localhost:27017")
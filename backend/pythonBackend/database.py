@@ -1,7 +1,10 @@
+from typing import Optional
 from fastapi import FastAPI, HTTPException
 from db_connection import get_async_client, get_async_db
+from pagination import InvalidCursorError, fetch_page_async, next_cursor_header
+from serialization import BSONJSONResponse
 
-app = FastAPI()
+app = FastAPI(default_response_class=BSONJSONResponse)
 
 # Use shared database connection
 client = get_async_client()
@@ -21,9 +24,16 @@ async def read_root():
     return {"message": "MongoDB connection successful!"}
 
 @app.get("/users")
-async def get_users():
-    users = await db["users"].find().to_list(100)
-    return users
+async def get_users(limit: int = 100, cursor: Optional[str] = None):
+    """
+    One page of users (without password hashes) in _id order, as a list.
+    When more users follow, the X-Next-Cursor header holds the cursor to pass back for the next page.
+    """
+    try:
+        users, next_cursor = await fetch_page_async(db["users"], {}, {"password": 0}, limit=limit, cursor=cursor)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return BSONJSONResponse(users, headers=next_cursor_header(next_cursor))
 
 @app.post("/users")
 async def add_user(user: dict):
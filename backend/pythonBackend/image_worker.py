@@ -0,0 +1,116 @@
+"""
+Image decode / downscale / re-encode worker for image_preprocess.
+Runs inside spawned worker processes, so it deliberately lives outside the
+agents package: importing it must not pull in strands, MongoDB, S3 or any other
+app module, only Pillow.
+"""
+from io import BytesIO
+from typing import Any, Dict
+
+from PIL import Image, ImageOps
+
+SUPPORTED_MEDIA_TYPES = {
+    "JPEG": "image/jpeg",
+    "PNG": "image/png",
+    "WEBP": "image/webp",
+    "GIF": "image/gif",
+}
+
+# EXIF tags worth keeping as authenticity signals before metadata is stripped
+_EXIF_TAGS = {271: "make", 272: "model", 305: "software", 306: "datetime"}
+_EXIF_IFD = 0x8769
+_GPS_IFD = 0x8825
+_DATETIME_ORIGINAL = 36867
+
+
+def _exif_signals(image: Image.Image) -> Dict[str, Any]:
+    try:
+        exif = image.getexif()
+    except Exception:
+        return {"present": False}
+    if not exif:
+        return {"present": False}
+
+    signals: Dict[str, Any] = {"present": True}
+    for tag, name in _EXIF_TAGS.items():
+        value = exif.get(tag)
+        if value:
+            signals[name] = str(value).strip("\x00 ")
+    try:
+        original = exif.get_ifd(_EXIF_IFD).get(_DATETIME_ORIGINAL)
+        if original:
+            signals["datetime_original"] = str(original).strip("\x00 ")
+    except Exception:
+        pass
+    signals["has_gps"] = _GPS_IFD in exif
+    return signals
+
+
+def _encode(image: Image.Image, max_bytes: int):
+    """Re-encode without metadata, lowering quality until under the byte budget."""
+    keep_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+    if keep_alpha:
+        out = BytesIO()
+        image.save(out, format="PNG", optimize=True)
+        if out.tell() <= max_bytes:
+            return out.getvalue(), "image/png"
+        # Too big as PNG: flatten onto white and fall through to JPEG
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image.convert("RGBA"), mask=image.convert("RGBA").split()[-1])
+        image = background
+
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+
+    for quality in (85, 75, 65, 55):
+        out = BytesIO()
+        image.save(out, format="JPEG", quality=quality, optimize=True)
+        if out.tell() <= max_bytes:
+            return out.getvalue(), "image/jpeg"
+
+    # Still too large at low quality: shrink and retry
+    image = image.resize((max(1, image.width * 3 // 4), max(1, image.height * 3 // 4)), Image.LANCZOS)
+    return _encode(image, max_bytes)
+
+
+def preprocess(data: bytes, max_edge: int, max_bytes: int) -> Dict[str, Any]:
+    """Runs in a worker process; must stay a picklable top-level function."""
+    image = Image.open(BytesIO(data))
+    fmt = image.format
+    original_size = image.size
+    exif = _exif_signals(image)
+
+    needs_resize = max(image.size) > max_edge
+    has_metadata = exif["present"] or "xmp" in image.info or "comment" in image.info
+    media_type = SUPPORTED_MEDIA_TYPES.get(fmt)
+
+    if media_type and not needs_resize and not has_metadata and len(data) <= max_bytes:
+        processed, out_type = data, media_type
+        size = original_size
+    else:
+        image.load()
+        # Apply the EXIF orientation before the tag is stripped
+        image = ImageOps.exif_transpose(image)
+        if needs_resize:
+            image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+        processed, out_type = _encode(image, max_bytes)
+        size = image.size
+
+    return {
+        "data": processed,
+        "media_type": out_type,
+        "source_format": fmt,
+        "original_width": original_size[0],
+        "original_height": original_size[1],
+        "width": size[0],
+        "height": size[1],
+        "original_bytes": len(data),
+        "processed_bytes": len(processed),
+        "bytes_saved": len(data) - len(processed),
+        "exif": exif,
+    }
+
+
+def warm() -> bool:
+    """No-op task used to start a worker process ahead of the first request."""
+    return True
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+MongoDB index registry
+Declares the indexes the agent tools rely on, creates them at startup, and can
+verify with explain() that each tool's representative query (built by the
+tools' own query helpers) is served by the index registered for it.
+
+Usage:
+    python indexes.py ensure    # create any missing indexes
+    python indexes.py verify    # exit 1 if any canonical query misses its index
+"""
+import sys
+from typing import Any, Dict, List
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+from db_connection import get_sync_db
+from pagination import page_query
+from agents.agent_tools.item_queries import (
+    category_listing, find_spec, high_ai_score_listing, live_listing, ticket_cost_listing
+)
+from agents.agent_tools.query_planner import plan_query
+from agents.agent_tools.text_search import TEXT_INDEX_KEYS, TEXT_INDEX_NAME, TEXT_INDEX_WEIGHTS, build_text_query
+
+# collection -> indexes; each names the queries it exists for
+INDEXES: Dict[str, List[Dict[str, Any]]] = {
+    "items": [
+        {
+            "name": "status_endDate_id",
+            "keys": [("status", ASCENDING), ("endDate", ASCENDING), ("_id", ASCENDING)],
+            "serves": "get_live_auctions (status filter, ending soonest first)",
+        },
+        {
+            # Equality, then the default _id order, then the ticket cost range,
+            # which is checked on the index keys without fetching misses
+            "name": "status_id_ticketCost",
+            "keys": [("status", ASCENDING), ("_id", ASCENDING), ("ticketCost", ASCENDING)],
+            "serves": "query_database status + ticket cost prompts",
+        },
+        {
+            "name": "ticketCost_id",
+            "keys": [("ticketCost", ASCENDING), ("_id", ASCENDING)],
+            "serves": "get_auctions_by_ticket_cost (range filter and sort)",
+        },
+        {
+            "name": "aiVerificationScore_id",
+            "keys": [("aiVerificationScore", DESCENDING), ("_id", DESCENDING)],
+            "serves": "get_high_ai_score_items (range filter, best first)",
+        },
+        {
+            "name": "category_id",
+            "keys": [("category", ASCENDING), ("_id", ASCENDING)],
+            "serves": "get_items_by_category and category prompts",
+        },
+        {
+            "name": TEXT_INDEX_NAME,
+            "keys": TEXT_INDEX_KEYS,
+            "options": {"weights": TEXT_INDEX_WEIGHTS, "default_language": "english"},
+            "serves": "query_database free-text keywords",
+        },
+    ],
+}
+
+# Sample arguments for each tool's representative query. The filter and sort
+# themselves come from the tools' own helpers (see canonical_queries)
+SAMPLE_CATEGORY = "electronics"
+SAMPLE_TICKET_RANGE = (50, 200)
+SAMPLE_MIN_SCORE = 8.0
+SAMPLE_PROMPT = "live auctions under 100 tickets"
+SAMPLE_KEYWORDS = "iphone"
+
+
+def _tool_query(tool: str, collection, query: Dict[str, Any], index: str) -> Dict[str, Any]:
+    """The find() a tool issues for a query (first page, default card profile) and the index meant to serve it."""
+    mode, query_filter, projection, sort = find_spec(query, 20, "card")
+    if mode == "page":
+        # Paged tools sort with an _id tie-breaker, so the indexes end in _id
+        # to serve the whole sort without an in-memory SORT stage
+        query_filter, sort = page_query(query_filter, sort)
+    return {"tool": tool, "collection": collection.name, "filter": query_filter,
+            "projection": projection, "sort": sort, "index": index, "paged": mode == "page"}
+
+
+def _listing_query(tool: str, collection, listing: Dict[str, Any], index: str) -> Dict[str, Any]:
+    query = {"filter": listing["filter"], "projection": None, "sort": listing["sort"], "backend": None}
+    return _tool_query(tool, collection, query, index)
+
+
+def _prompt_query(tool: str, collection, prompt: str, index: str) -> Dict[str, Any]:
+    plan = plan_query(prompt)
+    # Keywords are checked against the text index; in a process where the BM25
+    # index is loaded this is the _id lookup of its hits instead
+    query = build_text_query(collection, plan["text_terms"], plan["filter"], plan["sort"], use_text_index=True)
+    return _tool_query(tool, collection, query, index)
+
+
+def canonical_queries(db=None) -> List[Dict[str, Any]]:
+    """
+    Representative query for each tool, built by the same planner, listing and
+    paging helpers the tools use, so it always matches what they send.
+    """
+    db = db if db is not None else get_sync_db()
+    items = db["items"]
+    return [
+        _listing_query("get_live_auctions", items, live_listing(), "status_endDate_id"),
+        _listing_query("get_auctions_by_ticket_cost", items, ticket_cost_listing(*SAMPLE_TICKET_RANGE), "ticketCost_id"),
+        _listing_query("get_high_ai_score_items", items, high_ai_score_listing(SAMPLE_MIN_SCORE),
+                       "aiVerificationScore_id"),
+        _listing_query("get_items_by_category", items, category_listing(SAMPLE_CATEGORY), "category_id"),
+        _prompt_query(f"query_database ({SAMPLE_PROMPT})", items, SAMPLE_PROMPT, "status_id_ticketCost"),
+        _prompt_query("query_database (keywords)", items, SAMPLE_KEYWORDS, TEXT_INDEX_NAME),
+    ]
+
+
+def ensure_indexes(db=None) -> Dict[str, List[str]]:
+    """
+    Create every registered index that is missing. Existing indexes are left
+    alone; an index that conflicts with one already present is reported and skipped.
+
+    Returns:
+        Index names created or confirmed, per collection
+    """
+    db = db if db is not None else get_sync_db()
+    ensured = {}
+    for collection_name, specs in INDEXES.items():
+        collection = db[collection_name]
+        ensured[collection_name] = []
+        for spec in specs:
+            model = IndexModel(spec["keys"], name=spec["name"], **spec.get("options", {}))
+            try:
+                ensured[collection_name].extend(collection.create_indexes([model]))
+            except OperationFailure as e:
+                print(f"❌ Index {collection_name}.{spec['name']} not created: {e}")
+    return ensured
+
+
+def _plan_values(plan: Any, field: str):
+    """Every value of `field` in an explain() plan tree (classic or slot-based engine)."""
+    if isinstance(plan, dict):
+        if field in plan:
+            yield plan[field]
+        for value in plan.values():
+            yield from _plan_values(value, field)
+    elif isinstance(plan, list):
+        for value in plan:
+            yield from _plan_values(value, field)
+
+
+def verify_indexes(db=None) -> List[Dict[str, Any]]:
+    """
+    Explain each canonical query and check that the winning plan uses the
+    index registered for it, and that paged queries don't sort in memory.
+
+    Returns:
+        One entry per query with "tool", "stages", "indexes" (used by the
+        winning plan), "examined" (keys, docs and returned, from the trial
+        run), "ok" and, when not ok, "problems"
+    """
+    db = db if db is not None else get_sync_db()
+    report = []
+    for query in canonical_queries(db):
+        cursor = db[query["collection"]].find(query["filter"], query["projection"])
+        if query.get("sort"):
+            cursor = cursor.sort(query["sort"])
+        try:
+            explain = cursor.limit(20).explain()
+        except OperationFailure as e:
+            report.append({"tool": query["tool"], "stages": [], "ok": False, "problems": [str(e)]})
+            continue
+        plan = explain.get("queryPlanner", {}).get("winningPlan", {})
+        stages = list(_plan_values(plan, "stage"))
+        used = sorted(set(_plan_values(plan, "indexName")))
+        problems = []
+        if query["index"] not in used:
+            problems.append(f"expected {query['index']}, used {', '.join(used) or 'no index'}")
+        if query["paged"] and "SORT" in stages:
+            problems.append("sorts in memory")
+        stats = explain.get("executionStats", {})
+        report.append({
+            "tool": query["tool"],
+            "stages": stages,
+            "indexes": used,
+            "examined": {
+                "keys": stats.get("totalKeysExamined"),
+                "docs": stats.get("totalDocsExamined"),
+                "returned": stats.get("nReturned"),
+            },
+            "ok": not problems,
+            "problems": problems,
+        })
+    return report
+
+
+def main(argv: List[str]) -> int:
+    command = argv[1] if len(argv) > 1 else "verify"
+    if command == "ensure":
+        for collection_name, names in ensure_indexes().items():
+            print(f"✅ {collection_name}: {', '.join(names)}")
+        return 0
+    if command == "verify":
+        report = verify_indexes()
+        for entry in report:
+            mark = "✅" if entry["ok"] else "❌"
+            detail = " > ".join(entry["stages"])
+            examined = entry.get("examined")
+            if examined and examined["returned"] is not None:
+                detail += f" ({examined['keys']} keys, {examined['docs']} docs examined for {examined['returned']} returned)"
+            if entry["problems"]:
+                detail = "; ".join(entry["problems"]) + (f" [{detail}]" if detail else "")
+            print(f"{mark} {entry['tool']}: {detail}")
+        return 0 if all(entry["ok"] for entry in report) else 1
+    print(__doc__)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -1,4 +1,5 @@
-from typing import Union, List
+from typing import Union, List, Optional
+import asyncio
 import os
 import smtplib
 from email.message import EmailMessage
@@ -7,14 +8,30 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from pydantic import BaseModel
 from dotenv import load_dotenv
-from strands import agent
+from sse_starlette.sse import EventSourceResponse
 from db_connection import get_sync_client
+from aws_clients import client_stats
+from bedrock_limiter import bedrock_guard
+from indexes import ensure_indexes
+from serialization import BSONJSONResponse
 
-from agents.agent import create_agent, create_fresh_agent, initialize_default_agent
-from agents.agent_tools.s3_tools import upload_to_s3
+from agents.agent import create_agent, fresh_agent_pool, prewarm_fresh_agents
+from agents.agent_pool import create_session_pool
+from agents.streaming import agent_events_to_sse
+from agents.image_analysis import upload_images, run_analysis
+from agents.analysis_jobs import analysis_jobs, QueueFullError
+from agents.agent_tools.analysis_cache import analysis_cache
+from agents.agent_tools.analyze_image import ANALYSIS_CACHE_VERSION, BATCH_ANALYSIS_VERSION
+from agents.agent_tools.image_preprocess import prewarm_pool, preprocess_stats
+from agents.agent_tools.item_cache import item_query_cache
+from agents.agent_tools.item_changes import item_changes
+from agents.agent_tools.similar_items import similarity_index
+from agents.agent_tools.bm25_index import bm25_index
+from agents.agent_tools.price_model import price_model
 
 class AgentRequest(BaseModel):
     prompt: str
+    session_id: Optional[str] = None  # omit to start a new conversation
 
 class EmailRequest(BaseModel):
     user_email: str
@@ -35,7 +52,7 @@ class RaffleWinnerRequest(BaseModel):
 # Load environment variables
 load_dotenv()
 
-app = FastAPI()
+app = FastAPI(default_response_class=BSONJSONResponse)
 
 # Get frontend URL from environment variables
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:5173")
@@ -51,7 +68,9 @@ app.add_middleware(
 
 # Use shared database connection
 client = get_sync_client()
-agent = initialize_default_agent()
+
+# One agent per chat session, bounded LRU with idle eviction (see agents/agent_pool.py)
+session_pool = create_session_pool(create_agent)
 
 # Test MongoDB connection
 try:
@@ -62,6 +81,38 @@ except Exception as e:
     print(f"❌ MongoDB connection failed: {e}")
     db_status = "Failed"
 
+@app.on_event("startup")
+async def startup_agents():
+    prewarm_fresh_agents()
+    # Spawn the image preprocessing workers now rather than on the first upload
+    await asyncio.to_thread(prewarm_pool)
+    # Analyses from an older model/prompt can never be hit again; drop them
+    await asyncio.to_thread(analysis_cache.purge_other_versions, ANALYSIS_CACHE_VERSION, BATCH_ANALYSIS_VERSION)
+    # Indexes behind the agent query tools (see indexes.py)
+    try:
+        await asyncio.to_thread(ensure_indexes)
+    except Exception as e:
+        print(f"❌ Index setup failed: {e}")
+    # Follow item changes so the query caches and indexes stay current
+    item_changes.start()
+    # Builds in the background; find_similar_items reports "loading" until then
+    similarity_index.start()
+    # query_database ranks keyword searches with it once built (text index until then)
+    bm25_index.start()
+    # Percentile tables behind recommend_price, refreshed periodically
+    price_model.start()
+    # Start analysis job workers and re-queue jobs a previous process didn't finish
+    try:
+        await analysis_jobs.start()
+    except Exception as e:
+        print(f"❌ Analysis job queue failed to start: {e}")
+
+@app.on_event("shutdown")
+async def shutdown_agents():
+    item_changes.stop()
+    price_model.stop()
+    await analysis_jobs.stop()
+
 @app.get("/")
 def read_root():
     return {
@@ -85,12 +136,107 @@ def health_check():
 
 # agent API endpoint
 @app.post("/agent/chats")
-def prompt_agent(request: AgentRequest):
+async def prompt_agent(request: AgentRequest):
+    session_id = request.session_id or session_pool.new_session_id()
     try:
-        response = agent(request.prompt)
-        return {"response": response}
+        response = await session_pool.run(session_id, request.prompt)
+        return {"response": response, "session_id": session_id}
     except Exception as e:
-        return {"error": str(e)}
+        return {"error": str(e), "session_id": session_id}
+
+@app.post("/agent/chats/stream")
+async def stream_agent(request: AgentRequest):
+    """
+    Streaming variant of /agent/chats.
+
+    Sends text deltas and tool start/finish events over Server-Sent Events as the
+    agent produces them, instead of waiting for the whole turn to complete.
+    """
+    session_id = request.session_id or session_pool.new_session_id()
+    events = session_pool.stream(session_id, request.prompt)
+    return EventSourceResponse(agent_events_to_sse(session_id, events), ping=15)
+
+@app.delete("/agent/chats/{session_id}")
+def reset_chat_session(session_id: str):
+    """Forget a chat session so its next message starts a fresh conversation"""
+    return {"session_id": session_id, "reset": session_pool.reset(session_id)}
+
+@app.get("/agent/pool/stats")
+def agent_pool_stats():
+    return {
+        "sessions": session_pool.stats(),
+        "fresh_agents": fresh_agent_pool.stats(),
+    }
+
+@app.get("/agent/clients/stats")
+def aws_client_stats():
+    return client_stats()
+
+@app.get("/agent/bedrock/stats")
+def bedrock_limiter_stats():
+    """Shared Bedrock rate limiter and circuit breaker state"""
+    return bedrock_guard.stats()
+
+@app.get("/agent/item_cache/stats")
+def item_cache_stats():
+    """Hit/miss counters for the live-auction and category tool cache"""
+    return item_query_cache.stats()
+
+@app.get("/agent/similarity/stats")
+def similarity_index_stats():
+    """Size and query latency of the in-memory similar-items index"""
+    return similarity_index.stats()
+
+@app.get("/agent/search/stats")
+def search_index_stats():
+    """Size and query latency of the BM25 item search index"""
+    return bm25_index.stats()
+
+@app.get("/agent/price_model/stats")
+def price_model_stats():
+    """Freshness of the recommend_price percentile tables"""
+    return price_model.stats()
+
+@app.get("/agent/analysis_cache/stats")
+def analysis_cache_stats():
+    return {
+        "version": ANALYSIS_CACHE_VERSION,
+        **analysis_cache.stats(),
+        "preprocessing": preprocess_stats(),
+    }
+
+@app.delete("/agent/analysis_cache")
+def invalidate_analysis_cache(image_hash: Optional[str] = None):
+    """Drop cached image analyses (all of them, or just one image's)"""
+    return {"deleted": analysis_cache.invalidate(image_hash=image_hash)}
+
+async def receive_images(images: List[UploadFile], combined_mode: str):
+    """
+    Validate an analyze_images upload and store the files in S3.
+    Shared by the synchronous and the job endpoint so their limits stay identical.
+
+    Returns:
+        (uploaded_images, failed_uploads, blobs), see upload_images
+    """
+    if not images:
+        raise HTTPException(status_code=400, detail="At least one image is required")
+    
+    if len(images) > 10:
+        raise HTTPException(status_code=400, detail="Maximum 10 images allowed per request")
+    
+    if combined_mode not in ("batch", "agent"):
+        raise HTTPException(status_code=400, detail="combined_mode must be 'batch' or 'agent'")
+    
+    # Upload all images to S3 concurrently, off the event loop
+    files = [
+        {"filename": image.filename, "data": await image.read(), "content_type": image.content_type}
+        for image in images
+    ]
+    uploaded_images, failed_uploads, blobs = await upload_images(files)
+    
+    if not uploaded_images:
+        raise HTTPException(status_code=500, detail="Failed to upload any images")
+    return uploaded_images, failed_uploads, blobs
 
 @app.post("/agent/analyze_images")
 async def analyze_images(
@@ -98,7 +244,10 @@ async def analyze_images(
     title: str = Form(""),
     description: str = Form(""),
     condition: str = Form(""),
-    analyze_together: bool = Form(True)
+    analyze_together: bool = Form(True),
+    combined_mode: str = Form("agent"),
+    max_concurrency: Optional[int] = Form(None),
+    image_timeout: Optional[float] = Form(None)
 ):
     """
     Analyze single or multiple product images for auction quality rating.
@@ -112,6 +261,13 @@ async def analyze_images(
         images: List of image files to analyze (can be just one image)
         description: Optional description for all images
         analyze_together: If True, analyze all images together; if False, analyze each separately
+        combined_mode: For combined analysis, "agent" (default) lets a fresh agent call
+            analyze_image per image and reason over the results, returning the agent result;
+            "batch" (opt-in) sends every image in one Bedrock request and returns its parsed
+            JSON verdict as "analysis"
+        max_concurrency: Max per-image analyses in flight when analyze_together is False
+        image_timeout: Per-image timeout in seconds when analyze_together is False;
+            slow or failed images are reported individually and the rest still return
         
     Memory Management:
         - Fresh agent instances are created for each request
@@ -119,129 +275,80 @@ async def analyze_images(
         - This prevents context window overflow and ensures accurate, independent analyses
     """
     try:
-        if not images:
-            raise HTTPException(status_code=400, detail="At least one image is required")
-        
-        if len(images) > 10:
-            raise HTTPException(status_code=400, detail="Maximum 10 images allowed per request")
+        uploaded_images, failed_uploads, blobs = await receive_images(images, combined_mode)
         
-        # Upload all images to S3
-        uploaded_images = []
-        for image in images:
-            try:
-                image_url = upload_to_s3(image.file, image.filename)
-                uploaded_images.append({
-                    "filename": image.filename,
-                    "url": image_url,
-                    "content_type": image.content_type
-                })
-            except Exception as e:
-                print(f"Failed to upload {image.filename}: {e}")
-                continue
-        
-        if not uploaded_images:
-            raise HTTPException(status_code=500, detail="Failed to upload any images")
-        
-        # Create analysis prompt based on analyze_together flag
-        if analyze_together:
-            # Create a fresh agent instance to prevent context overflow
-            fresh_agent = create_fresh_agent()
-            if not fresh_agent:
-                raise HTTPException(status_code=500, detail="Failed to initialize AI agent")
-            
-            # Analyze all images together as a set
-            image_urls = [img["url"] for img in uploaded_images]
-            image_filenames = [img["filename"] for img in uploaded_images]
-            
-            prompt = f"""Be a balanced auction verifier. Analyze these {len(uploaded_images)} product images using `analyze_image` to detect authenticity — start cautiously (the seller *might* use stock/AI images) but remain fair and evidence-driven. 
-            Check EXIF, lighting, background, watermarks, and editing artifacts; to confirm uniqueness(This is an important step). Compare with similar items (DB + web) to suggest a reasonable price range, lowering estimates for used or suspicious listings. 
-            Rate auction quality (0–100) for authenticity, clarity, and technical quality, and provide a short justification and recommended action (accept/manual_review/reject/request_better_images).
-
-            
-            If the images look too polished or reused, recommend manual review or reject.
-            
-            Image URLs: {', '.join(image_urls)}
-            Image filenames: {', '.join(image_filenames)}
-            """
-            if description:
-                prompt += f"Additional context: {description}. "
-            prompt += "Use the analyze_image tool to get detailed analysis for each image."
-            
-            # Use the fresh agent to analyze all images together
-            response = fresh_agent(prompt)
-            
-            # IMPORTANT: Clear the agent reference to allow garbage collection
-            # This ensures the agent's context/memory is freed and prevents:
-            # 1. Context window overflow from accumulated history
-            # 2. Cross-contamination between different product analyses
-            del fresh_agent
-            
-            return {
-                "analysis_type": "combined",
-                "images": uploaded_images,
-                "total_images": len(uploaded_images),
-                "analysis": response,
-                "status": "success"
-            }
-        
-        else:
-            # Analyze each image separately with fresh agent instances
-            individual_analyses = []
-            
-            for img in uploaded_images:
-                try:
-                    # Create a fresh agent instance for each image to prevent context contamination
-                    fresh_agent = create_fresh_agent()
-                    if not fresh_agent:
-                        raise Exception("Failed to initialize AI agent")
-                    
-                    prompt = f"""Be a balanced auction verifier. Analyze this product image using `analyze_image` to detect authenticity — start cautiously (the seller *might* use stock/AI images) but remain fair and evidence-driven. 
-                    Check EXIF, lighting, background, watermarks, and editing artifacts. Compare with similar items (DB + web) to suggest a reasonable price range, lowering estimates for used or suspicious listings. 
-                    Rate auction quality (0–10) for authenticity, clarity, and technical quality, and provide a short justification and recommended action (accept/manual_review/reject/request_better_images).
-
-                    
-                    If the images look too polished or reused, recommend manual review or reject.
-                    
-                    Image URL: {img['url']}
-                    Image filename: {img['filename']}
-                    """
-                    if description:
-                        prompt += f"Additional context: {description}. "
-                    prompt += f"Use the analyze_image tool to get detailed analysis."
-                    
-                    analysis = fresh_agent(prompt)
-                    
-                    # IMPORTANT: Clear the agent reference to allow garbage collection
-                    # Each image gets its own fresh agent to prevent context contamination
-                    del fresh_agent
-                    
-                    individual_analyses.append({
-                        "filename": img["filename"],
-                        "url": img["url"],
-                        "analysis": analysis
-                    })
-                    
-                except Exception as e:
-                    individual_analyses.append({
-                        "filename": img["filename"],
-                        "url": img["url"],
-                        "analysis": {"error": str(e)},
-                        "status": "failed"
-                    })
-            
-            return {
-                "analysis_type": "individual",
-                "images": uploaded_images,
-                "total_images": len(uploaded_images),
-                "individual_analyses": individual_analyses,
-                "status": "success"
-            }
+        return await run_analysis(
+            uploaded_images,
+            blobs,
+            failed_uploads=failed_uploads,
+            title=title,
+            description=description,
+            condition=condition,
+            analyze_together=analyze_together,
+            combined_mode=combined_mode,
+            max_concurrency=max_concurrency,
+            image_timeout=image_timeout,
+        )
 
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/agent/analyze_images/jobs", status_code=202)
+async def submit_analysis_job(
+    images: List[UploadFile] = File(...),
+    title: str = Form(""),
+    description: str = Form(""),
+    condition: str = Form(""),
+    analyze_together: bool = Form(True),
+    combined_mode: str = Form("agent"),
+    max_concurrency: Optional[int] = Form(None),
+    image_timeout: Optional[float] = Form(None)
+):
+    """
+    Queue an image analysis and return a job id immediately.
+    
+    Takes the same fields as /agent/analyze_images. Images are uploaded before
+    returning; the analysis runs on a background worker. Poll
+    GET /agent/jobs/{job_id} for the status and, once finished, the same
+    response body /agent/analyze_images would have returned.
+    """
+    uploaded_images, failed_uploads, blobs = await receive_images(images, combined_mode)
+    
+    options = {
+        "title": title,
+        "description": description,
+        "condition": condition,
+        "analyze_together": analyze_together,
+        "combined_mode": combined_mode,
+        "max_concurrency": max_concurrency,
+        "image_timeout": image_timeout,
+    }
+    try:
+        job_id = await analysis_jobs.submit(uploaded_images, failed_uploads, blobs, options)
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    return {
+        "job_id": job_id,
+        "status": "queued",
+        "status_url": f"/agent/jobs/{job_id}",
+        "images": uploaded_images,
+        "failed_uploads": failed_uploads
+    }
+
+@app.get("/agent/jobs/stats")
+def analysis_job_stats():
+    return analysis_jobs.stats()
+
+@app.get("/agent/jobs/{job_id}")
+async def get_analysis_job(job_id: str):
+    job = await analysis_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
 def send_winner_email(user_email: str, username: str, item_name: str, message: str):
     """
     Send winner notification email using Gmail SMTP
@@ -410,11 +517,11 @@ def test_mongodb():
         # Clean up
         collection.delete_one({"_id": result.inserted_id})
         
-        return {
+        return BSONJSONResponse({
             "status": "success",
             "message": "MongoDB operations working correctly",
             "test_document": doc
-        }
+        })
     except Exception as e:
         return {
             "status": "error",
@@ -0,0 +1,151 @@
+"""
+Keyset (cursor) pagination for MongoDB queries
+Instead of skip/offset, each page continues from the sort key of the last
+document returned, so page 1000 costs the same index seek as page 1.
+Cursors are opaque URL-safe strings; clients just pass back `next_cursor`.
+"""
+import base64
+import json
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from bson import json_util
+
+MAX_PAGE_SIZE = 200
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+Sort = List[Tuple[str, int]]
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def keyset_sort(sort: Optional[Sequence[Tuple[str, int]]] = None) -> Sort:
+    """The sort plus an _id tie-breaker (same direction as the last key) so the order is total."""
+    sort = [(field, direction) for field, direction in (sort or [])]
+    if not sort or sort[-1][0] != "_id":
+        sort.append(("_id", sort[-1][1] if sort else 1))
+    return sort
+
+
+def _get(doc: Dict[str, Any], field: str) -> Any:
+    value = doc
+    for part in field.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def encode_cursor(doc: Dict[str, Any], sort: Sort) -> str:
+    payload = {"s": [[field, direction] for field, direction in sort], "v": [_get(doc, field) for field, _ in sort]}
+    raw = json_util.dumps(payload, json_options=json_util.CANONICAL_JSON_OPTIONS)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: Sort) -> List[Any]:
+    """
+    Sort-key values stored in a cursor.
+
+    Raises:
+        InvalidCursorError: Malformed cursor, or one issued for a different sort
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json_util.loads(raw.decode())
+    except (ValueError, TypeError, json.JSONDecodeError) as e:
+        raise InvalidCursorError(f"Invalid cursor: {e}")
+    if not isinstance(payload, dict) or [list(s) for s in payload.get("s", [])] != [[f, d] for f, d in sort]:
+        raise InvalidCursorError("Cursor does not belong to this query")
+    return payload["v"]
+
+
+def _after(field: str, direction: int, value: Any) -> Optional[Dict[str, Any]]:
+    # Missing/null sorts before every other value
+    if value is None:
+        return {field: {"$ne": None}} if direction == 1 else None
+    if direction == 1:
+        return {field: {"$gt": value}}
+    return {"$or": [{field: {"$lt": value}}, {field: None}]}
+
+
+def keyset_filter(sort: Sort, values: List[Any]) -> Dict[str, Any]:
+    """Filter for documents strictly after `values` in `sort` order."""
+    branches = []
+    for i, (field, direction) in enumerate(sort):
+        condition = _after(field, direction, values[i])
+        if condition is None:
+            continue
+        prefix = [{f: values[j]} for j, (f, _) in enumerate(sort[:i])]
+        branches.append({"$and": prefix + [condition]} if prefix else condition)
+    return {"$or": branches} if branches else {"_id": {"$exists": False}}
+
+
+def page_query(query_filter: Dict[str, Any], sort: Optional[Sequence[Tuple[str, int]]] = None,
+               cursor: Optional[str] = None) -> Tuple[Dict[str, Any], Sort]:
+    """
+    Filter and sort for one page.
+
+    Args:
+        query_filter: The caller's filter; not modified
+        sort: The caller's sort (an _id tie-breaker is added)
+        cursor: `next_cursor` from the previous page, or None for the first page
+
+    Returns:
+        (filter, sort) to pass to find()
+    """
+    sort = keyset_sort(sort)
+    if not cursor:
+        return query_filter, sort
+    after = keyset_filter(sort, decode_cursor(cursor, sort))
+    return ({"$and": [query_filter, after]} if query_filter else after), sort
+
+
+def finish_page(docs: List[Dict[str, Any]], sort: Sort, limit: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Trim a page fetched with limit + 1 and build the cursor for the next one.
+
+    Returns:
+        (docs, next_cursor) where next_cursor is None on the last page
+    """
+    if len(docs) <= limit:
+        return docs, None
+    docs = docs[:limit]
+    return docs, encode_cursor(docs[-1], sort)
+
+
+def next_cursor_header(next_cursor: Optional[str]) -> Optional[Dict[str, str]]:
+    """Response headers for endpoints that return a bare list: X-Next-Cursor, set only when a next page exists."""
+    return {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+
+
+def clamp_limit(limit: int) -> int:
+    return max(1, min(int(limit), MAX_PAGE_SIZE))
+
+
+def fetch_page(collection, query_filter: Dict[str, Any], projection: Optional[Dict[str, Any]] = None,
+               sort: Optional[Sequence[Tuple[str, int]]] = None, limit: int = 20,
+               cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Run one page of a pymongo query.
+
+    The projection must keep the sort fields, since the next cursor is built
+    from the last document.
+
+    Returns:
+        (docs, next_cursor)
+    """
+    limit = clamp_limit(limit)
+    page_filter, sort = page_query(query_filter, sort, cursor)
+    docs = list(collection.find(page_filter, projection).sort(sort).limit(limit + 1))
+    return finish_page(docs, sort, limit)
+
+
+async def fetch_page_async(collection, query_filter: Dict[str, Any], projection: Optional[Dict[str, Any]] = None,
+                           sort: Optional[Sequence[Tuple[str, int]]] = None, limit: int = 20,
+                           cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """fetch_page for a Motor collection."""
+    limit = clamp_limit(limit)
+    page_filter, sort = page_query(query_filter, sort, cursor)
+    docs = [doc async for doc in collection.find(page_filter, projection).sort(sort).limit(limit + 1)]
+    return finish_page(docs, sort, limit)
@@ -1,12 +1,25 @@
-from fastapi import APIRouter
+from typing import Optional
+from fastapi import APIRouter, HTTPException
 from models.Users import User
 from config.database import collection
-from schemas.Users import user_default_data, list_user_data
+from schemas.Users import user_default_data, list_user_data, list_user_public_data
 from bson import ObjectId
+from pagination import InvalidCursorError, fetch_page, next_cursor_header
+from serialization import BSONJSONResponse
 
 router = APIRouter()
 
+# Password hashes never leave the database
+USER_PROJECTION = {"password": 0}
+
 @router.get("/")
-async def get_users():
-    users = list_user_data(collection.find())
-    return users
\ No newline at end of file
+def get_users(limit: int = 100, cursor: Optional[str] = None):
+    """
+    One page of users (without password hashes) in _id order, as a list.
+    When more users follow, the X-Next-Cursor header holds the cursor for the next page.
+    """
+    try:
+        users, next_cursor = fetch_page(collection, {}, USER_PROJECTION, limit=limit, cursor=cursor)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return BSONJSONResponse(list_user_public_data(users), headers=next_cursor_header(next_cursor))
\ No newline at end of file
@@ -12,4 +12,10 @@ def user_default_data(user) -> dict:
         "updatedAt": user["updatedAt"]  
     }
 def list_user_data(users) -> list:
-    return [user_default_data(user) for user in users]
\ No newline at end of file
+    return [user_default_data(user) for user in users]
+def user_public_data(user) -> dict:
+    data = user_default_data({**user, "password": None})
+    del data["password"]
+    return data
+def list_user_public_data(users) -> list:
+    return [user_public_data(user) for user in users]
\ No newline at end of file
@@ -0,0 +1,65 @@
+"""
+BSON-aware JSON serialization
+MongoDB documents carry ObjectId, datetime and Decimal128 values (including
+nested ones like sellerId, winnerId and participants.userId) that neither
+json nor FastAPI's jsonable_encoder handle well. This module converts them in
+a single pass: orjson for HTTP responses, to_jsonable() for tool results.
+"""
+from datetime import date, datetime, timezone
+from typing import Any
+
+import orjson
+from bson import Decimal128, ObjectId
+from fastapi.responses import JSONResponse
+
+_ORJSON_OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _bson_default(value: Any) -> Any:
+    # orjson handles dict/list/str/number/datetime natively and only calls this for the rest
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, Decimal128):
+        return float(value.to_decimal())
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    if isinstance(value, bytes):
+        return value.decode("utf-8", errors="replace")
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(value: Any) -> bytes:
+    """Serialize to JSON bytes, converting BSON types on the fly."""
+    return orjson.dumps(value, default=_bson_default, option=_ORJSON_OPTIONS)
+
+
+def to_jsonable(value: Any) -> Any:
+    """
+    Copy of value with BSON types replaced by JSON-friendly ones: ObjectId -> str,
+    datetime -> ISO 8601 (naive values are UTC), Decimal128 -> float. One walk
+    over the structure; plain values are returned as-is.
+    """
+    if isinstance(value, dict):
+        return {key: to_jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(item) for item in value]
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return (value if value.tzinfo else value.replace(tzinfo=timezone.utc)).isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Decimal128):
+        return float(value.to_decimal())
+    return value
+
+
+class BSONJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered with orjson and BSON support. Used as the apps'
+    default response class; endpoints that hand back raw MongoDB documents
+    return it directly so FastAPI's generic encoder is skipped entirely.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,68 @@
+import asyncio
+import time
+
+import pytest
+
+from bedrock_limiter import BedrockGuard, BedrockUnavailableError
+
+
+def _half_open_guard() -> BedrockGuard:
+    guard = BedrockGuard()
+    guard.max_wait = 60
+    guard.breaker.state = "open"
+    guard.breaker._opened_at = time.monotonic() - guard.breaker.cooldown - 1
+    # Empty request bucket, so the probe has to queue for a second or so
+    guard.requests._tokens = 0
+    return guard
+
+
+def test_cancelled_wait_refunds_and_frees_probe():
+    guard = _half_open_guard()
+
+    async def probe():
+        async with guard.call_async(1000):
+            pass
+
+    async def main():
+        task = asyncio.create_task(probe())
+        await asyncio.sleep(0.05)
+        assert guard.breaker._probe_in_flight
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    tokens_before = guard.tokens.available()
+    asyncio.run(main())
+
+    assert not guard.breaker._probe_in_flight
+    assert guard.breaker.state == "half_open"
+    assert guard.tokens.available() >= tokens_before
+    assert guard.requests.available() >= 0
+    # The next caller gets the probe slot instead of being rejected forever
+    guard.requests._tokens = guard.requests.capacity
+    with guard.call(1000):
+        pass
+    assert guard.breaker.state == "closed"
+
+
+def test_interrupted_sync_wait_frees_probe(monkeypatch):
+    guard = _half_open_guard()
+
+    def interrupted(seconds):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(time, "sleep", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        with guard.call(1000):
+            pass
+    assert not guard.breaker._probe_in_flight
+
+
+def test_deep_queue_is_rejected_without_leaking():
+    guard = _half_open_guard()
+    guard.max_wait = 0.01
+    with pytest.raises(BedrockUnavailableError):
+        with guard.call(1000):
+            pass
+    assert not guard.breaker._probe_in_flight
+    assert guard.stats()["rejected"] == 1
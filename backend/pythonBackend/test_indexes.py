@@ -0,0 +1,107 @@
+from pymongo.errors import OperationFailure
+
+import indexes
+
+
+class FakeCursor:
+    def __init__(self, plan):
+        self.plan = plan
+
+    def sort(self, sort):
+        return self
+
+    def limit(self, n):
+        return self
+
+    def explain(self):
+        return {
+            "queryPlanner": {"winningPlan": self.plan},
+            "executionStats": {"totalKeysExamined": 20, "totalDocsExamined": 20, "nReturned": 20},
+        }
+
+
+def _ixscan(index, sort_in_memory=False):
+    plan = {"stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": index}}
+    return {"stage": "SORT", "inputStage": plan} if sort_in_memory else plan
+
+
+class FakeCollection:
+    def __init__(self, name, existing, refuse=(), plans=None):
+        self.name = name
+        self.indexes = set(existing)
+        self.refuse = set(refuse)
+        # sorted filter fields -> winning plan
+        self.plans = plans or {}
+
+    def create_indexes(self, models):
+        names = [model.document["name"] for model in models]
+        for name in names:
+            if name in self.refuse:
+                raise OperationFailure(f"conflict on {name}")
+        self.indexes.update(names)
+        return names
+
+    def find(self, query, projection=None):
+        return FakeCursor(self.plans.get(tuple(sorted(query)), {"stage": "COLLSCAN"}))
+
+    def index_information(self):
+        return {name: {} for name in self.indexes}
+
+
+class FakeDb(dict):
+    def __missing__(self, name):
+        self[name] = FakeCollection(name, ["_id_"])
+        return self[name]
+
+
+def test_ensure_skips_conflicting_index_and_creates_the_rest():
+    db = FakeDb()
+    db["items"] = FakeCollection("items", ["_id_"], refuse=["status_endDate_id"])
+
+    ensured = indexes.ensure_indexes(db)
+
+    names = [spec["name"] for spec in indexes.INDEXES["items"]]
+    assert ensured["items"] == [name for name in names if name != "status_endDate_id"]
+    assert "status_endDate_id" not in db["items"].indexes
+
+
+def test_canonical_queries_follow_the_tools_sorts():
+    queries = {query["tool"]: query for query in indexes.canonical_queries(FakeDb())}
+
+    # Shaped by the tools' own listing and paging helpers, _id tie-breaker included
+    assert queries["get_live_auctions"]["filter"] == {"status": "live"}
+    assert queries["get_live_auctions"]["sort"] == [("endDate", 1), ("_id", 1)]
+    assert queries["get_items_by_category"]["filter"] == {"category": {"$in": ["Electronics"]}}
+
+    registered = [spec["keys"] for spec in indexes.INDEXES["items"]]
+    for tool in ("get_live_auctions", "get_auctions_by_ticket_cost", "get_high_ai_score_items"):
+        sort = queries[tool]["sort"]
+        assert any(keys[-len(sort):] == sort for keys in registered), tool
+
+
+def test_verify_checks_each_query_uses_its_registered_index():
+    plans = {
+        ("status",): _ixscan("status_endDate_id"),
+        ("ticketCost",): _ixscan("ticketCost_id"),
+        # Served, but by another index than the one registered for it
+        ("aiVerificationScore",): _ixscan("_id_"),
+        ("category",): _ixscan("category_id"),
+        # Right index, but the _id order is sorted in memory
+        ("status", "ticketCost"): _ixscan("status_id_ticketCost", sort_in_memory=True),
+        ("$text",): {"stage": "SORT", "inputStage": {"stage": "TEXT_MATCH", "inputStage": {
+            "stage": "IXSCAN", "indexName": indexes.TEXT_INDEX_NAME}}},
+    }
+    db = FakeDb()
+    db["items"] = FakeCollection("items", ["_id_"], plans=plans)
+
+    report = {entry["tool"]: entry for entry in indexes.verify_indexes(db)}
+
+    assert report["get_live_auctions"]["ok"]
+    assert report["get_live_auctions"]["examined"] == {"keys": 20, "docs": 20, "returned": 20}
+    assert report["get_high_ai_score_items"]["problems"] == ["expected aiVerificationScore_id, used _id_"]
+    assert report[f"query_database ({indexes.SAMPLE_PROMPT})"]["problems"] == ["sorts in memory"]
+    # Relevance order is never an index order, so the text query may sort
+    assert report["query_database (keywords)"]["ok"]
+    assert [tool for tool, entry in report.items() if not entry["ok"]] == [
+        "get_high_ai_score_items", f"query_database ({indexes.SAMPLE_PROMPT})",
+    ]
@@ -0,0 +1,142 @@
+from functools import cmp_to_key
+
+import pytest
+from bson import ObjectId
+
+from pagination import (
+    InvalidCursorError, _after, decode_cursor, encode_cursor, fetch_page, keyset_filter, keyset_sort, page_query
+)
+
+
+# Minimal stand-in for a pymongo collection: enough of the query language for
+# keyset filters, and MongoDB's ordering where missing/null sorts first
+def _matches(doc, query):
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(_matches(doc, branch) for branch in condition):
+                return False
+        elif key == "$and":
+            if not all(_matches(doc, branch) for branch in condition):
+                return False
+        elif isinstance(condition, dict) and any(op.startswith("$") for op in condition):
+            value = doc.get(key)
+            for op, operand in condition.items():
+                if op == "$ne" and value == operand:
+                    return False
+                if op == "$gt" and (value is None or not value > operand):
+                    return False
+                if op == "$lt" and (value is None or not value < operand):
+                    return False
+                if op == "$exists" and (key in doc) != operand:
+                    return False
+        elif doc.get(key) != condition:
+            return False
+    return True
+
+
+def _compare(sort):
+    def compare(a, b):
+        for field, direction in sort:
+            x, y = a.get(field), b.get(field)
+            if x == y:
+                continue
+            if x is None or (y is not None and x < y):
+                return -direction
+            return direction
+        return 0
+    return cmp_to_key(compare)
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, sort):
+        return FakeCursor(sorted(self.docs, key=_compare(sort)))
+
+    def limit(self, n):
+        return FakeCursor(self.docs[:n])
+
+    def __iter__(self):
+        return iter(self.docs)
+
+
+class FakeCollection:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, query, projection=None):
+        return FakeCursor([doc for doc in self.docs if _matches(doc, query)])
+
+
+def _walk(collection, query_filter, sort, limit):
+    pages, cursor = [], None
+    while True:
+        docs, cursor = fetch_page(collection, query_filter, None, sort, limit, cursor)
+        pages.append(docs)
+        if cursor is None:
+            return pages
+
+
+@pytest.fixture
+def items():
+    # Repeated and missing endDates, so the _id tie-breaker and null handling matter
+    end_dates = [3, 1, None, 2, 3, None, 1, 3, 2, None, 5]
+    docs = [{"_id": ObjectId(), "status": "live", "endDate": end} for end in end_dates]
+    docs.append({"_id": ObjectId(), "status": "live"})  # endDate missing entirely
+    docs.append({"_id": ObjectId(), "status": "ended", "endDate": 1})
+    return docs
+
+
+def test_keyset_sort_adds_id_tie_breaker_in_last_direction():
+    assert keyset_sort(None) == [("_id", 1)]
+    assert keyset_sort([("endDate", 1)]) == [("endDate", 1), ("_id", 1)]
+    assert keyset_sort([("score", -1)]) == [("score", -1), ("_id", -1)]
+    assert keyset_sort([("ticketCost", 1), ("_id", -1)]) == [("ticketCost", 1), ("_id", -1)]
+
+
+def test_after_handles_nulls_in_both_directions():
+    # Ascending: null sorts first, so everything non-null comes after it
+    assert _after("endDate", 1, None) == {"endDate": {"$ne": None}}
+    assert _after("endDate", 1, 5) == {"endDate": {"$gt": 5}}
+    # Descending: null sorts last, so nothing on this field comes after it
+    assert _after("endDate", -1, None) is None
+    assert _after("endDate", -1, 5) == {"$or": [{"endDate": {"$lt": 5}}, {"endDate": None}]}
+
+
+def test_cursor_round_trip_keeps_bson_types_and_nulls():
+    oid = ObjectId()
+    sort = keyset_sort([("endDate", 1)])
+    cursor = encode_cursor({"_id": oid, "endDate": None}, sort)
+    assert decode_cursor(cursor, sort) == [None, oid]
+
+
+def test_cursor_is_rejected_for_another_sort_or_when_mangled():
+    sort = keyset_sort([("endDate", 1)])
+    cursor = encode_cursor({"_id": ObjectId(), "endDate": 1}, sort)
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor, keyset_sort([("endDate", -1)]))
+    with pytest.raises(InvalidCursorError):
+        decode_cursor("not a cursor!", sort)
+
+
+def test_keyset_filter_after_last_possible_key_matches_nothing():
+    assert keyset_filter([("endDate", -1), ("_id", -1)], [None, None]) == {"_id": {"$exists": False}}
+
+
+def test_first_page_uses_the_callers_filter_unchanged():
+    query_filter = {"status": "live"}
+    assert page_query(query_filter, [("endDate", 1)]) == (query_filter, [("endDate", 1), ("_id", 1)])
+
+
+@pytest.mark.parametrize("sort", [[("endDate", 1)], [("endDate", -1)], None])
+@pytest.mark.parametrize("limit", [1, 2, 5])
+def test_pages_cover_every_document_once_in_order(items, sort, limit):
+    collection = FakeCollection(items)
+    expected = [doc for doc in sorted(items, key=_compare(keyset_sort(sort))) if doc["status"] == "live"]
+
+    pages = _walk(collection, {"status": "live"}, sort, limit)
+
+    assert [doc for page in pages for doc in page] == expected
+    assert all(len(page) == limit for page in pages[:-1])
+    assert 0 < len(pages[-1]) <= limit
@@ -40,6 +40,8 @@ export default function AIChatWidget({ isOpen, onClose }: AIChatWidgetProps) {
   const [inputValue, setInputValue] = useState('');
   const [isLoading, setIsLoading] = useState(false); // Use a more descriptive name
   const chatEndRef = useRef<HTMLDivElement>(null);
+  // Backend keeps one agent per chat session; reuse the id it hands back
+  const sessionIdRef = useRef<string | null>(null);
 
   useEffect(() => {
     if (isOpen) {
@@ -64,7 +66,7 @@ export default function AIChatWidget({ isOpen, onClose }: AIChatWidgetProps) {
       const response = await fetch('http://127.0.0.1:8000/agent/chats', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ prompt: currentInput }),
+        body: JSON.stringify({ prompt: currentInput, session_id: sessionIdRef.current }),
       });
 
       if (!response.ok) {
@@ -72,6 +74,9 @@ export default function AIChatWidget({ isOpen, onClose }: AIChatWidgetProps) {
       }
 
       const data = await response.json();
+      if (data.session_id) {
+        sessionIdRef.current = data.session_id;
+      }
       let botMessage: Message;
 
       // Create the bot's response message based on the type from the API